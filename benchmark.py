@@ -0,0 +1,277 @@
+"""
+Benchmark suite for AI Text Summarizer API
+Measures latency percentiles, throughput, memory high-water mark and event-loop
+lag across concurrency levels and payload sizes, and writes the results as JSON
+so runs can be compared between releases.
+
+By default the app runs in-process on the fake model backend (no API key or
+network). Use --url to benchmark a running server over HTTP instead; memory and
+event-loop lag are then reported as null, since this process is only the client.
+
+Usage:
+    python benchmark.py [--levels 1,4,16] [--sizes 500,5000,50000] [--requests 50]
+                        [--endpoints summarize,context,keypoints] [--latency-ms 200]
+                        [--url http://localhost:8000] [--output bench_results.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+os.environ.setdefault("MODEL_BACKEND", "fake")
+os.environ.setdefault("GEMINI_RPM", "1000000")
+
+import sample_texts
+
+ENDPOINT_PATHS = {
+    "summarize": "/summarize",
+    "context": "/summarize/context",
+    "keypoints": "/summarize/keypoints",
+}
+
+
+def load_corpus() -> list:
+    """Texts from sample_texts.py plus request bodies from requests.jsonl when present"""
+    texts = []
+    for name in dir(sample_texts):
+        value = getattr(sample_texts, name)
+        if name.endswith("_EXAMPLES") and isinstance(value, dict):
+            texts.extend(" ".join(text.split()) for text in value.values())
+
+    requests_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requests.jsonl")
+    if os.path.exists(requests_path):
+        with open(requests_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    texts.append(f"{entry.get('title', '')}. {entry.get('body', '')}".strip())
+    return texts
+
+
+def build_text(corpus: list, size: int, index: int) -> str:
+    """Concatenate corpus texts (starting at a rotating offset) up to `size` characters"""
+    parts, length = [], 0
+    for text in itertools.islice(itertools.cycle(corpus), index % len(corpus), None):
+        parts.append(text)
+        length += len(text) + 2
+        if length >= size:
+            break
+    return "\n\n".join(parts)[:size]
+
+
+def build_payload(endpoint: str, text: str, nonce: str) -> dict:
+    """Request body for an endpoint; the nonce keeps the cache and coalescing out of the way"""
+    text = f"[{nonce}] {text}"
+    if endpoint == "context":
+        return {"text": text, "context": "executive summary"}
+    if endpoint == "keypoints":
+        return {"text": text, "num_points": 5}
+    return {"text": text, "style": "concise"}
+
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class InProcessClient:
+    """Sends requests straight into the ASGI app"""
+
+    # The app shares this process, so its memory and event loop can be measured here
+    in_process = True
+
+    def __init__(self, latency_ms: float):
+        import main
+        from load_test import call_app
+        from services.backends import FakeBackend
+
+        if os.environ["MODEL_BACKEND"] == "fake":
+            main.get_summarizer().backend = FakeBackend(
+                latency_ms=latency_ms,
+                distribution=os.getenv("FAKE_LATENCY_DISTRIBUTION", "lognormal"),
+                seed=42
+            )
+        self._call = call_app
+        self.description = f"in-process ({main.get_summarizer().model_name} backend)"
+
+    async def post(self, path: str, payload: dict) -> int:
+        status, _ = await self._call("POST", path, payload)
+        return status
+
+
+class HTTPClient:
+    """Sends requests to a running server; each request runs on a worker thread"""
+
+    in_process = False
+
+    def __init__(self, base_url: str, api_key: str = None):
+        self.base_url = base_url.rstrip("/")
+        self.description = f"http ({self.base_url})"
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["X-API-Key"] = api_key
+
+    def _post(self, path: str, payload: dict) -> int:
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers=self.headers,
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    async def post(self, path: str, payload: dict) -> int:
+        return await asyncio.get_running_loop().run_in_executor(None, self._post, path, payload)
+
+
+async def monitor_loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    """Record how late a periodic 10 ms timer fires; lateness means a blocked event loop"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run_scenario(client, corpus: list, endpoints: list, concurrency: int,
+                       size: int, total: int, run_id: str) -> dict:
+    """
+    Fire `total` requests with `concurrency` in flight and collect statistics
+
+    event_loop_lag_ms and max_rss_mb describe the server, so they are None
+    when it runs in another process.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], {}
+    lag_samples = []
+    stop = asyncio.Event()
+
+    async def one(index: int):
+        endpoint = endpoints[index % len(endpoints)]
+        payload = build_payload(endpoint, build_text(corpus, size, index), f"{run_id}-{concurrency}-{size}-{index}")
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status = await client.post(ENDPOINT_PATHS[endpoint], payload)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    return {
+        "concurrency": concurrency,
+        "payload_chars": size,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(total / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+        },
+        "event_loop_lag_ms": {
+            "p99": round(percentile(lag_samples, 0.99) * 1000, 2),
+            "max": round(max(lag_samples, default=0.0) * 1000, 2),
+        } if client.in_process else None,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        if client.in_process else None,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+async def run_benchmark(args) -> dict:
+    corpus = load_corpus()
+    client = HTTPClient(args.url, args.api_key) if args.url else InProcessClient(args.latency_ms)
+    endpoints = args.endpoints.split(",")
+    levels = [int(level) for level in args.levels.split(",")]
+    sizes = [int(size) for size in args.sizes.split(",")]
+    run_id = str(int(time.time()))
+
+    print("\n" + "=" * 78)
+    print(f"📈 BENCHMARK - {client.description}, corpus of {len(corpus)} texts")
+    print("=" * 78)
+    print(f"{'in-flight':>9} {'chars':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'lag ms':>8} {'rss MB':>8} {'errors':>7}")
+
+    scenarios = []
+    for size in sizes:
+        for level in levels:
+            result = await run_scenario(client, corpus, endpoints, level, size, args.requests, run_id)
+            scenarios.append(result)
+            latency = result["latency_ms"]
+            lag = result["event_loop_lag_ms"]["max"] if result["event_loop_lag_ms"] else "-"
+            rss = result["max_rss_mb"] if result["max_rss_mb"] is not None else "-"
+            print(f"{level:>9} {size:>8} {result['requests_per_second']:>9} {latency['p50']:>9} "
+                  f"{latency['p95']:>9} {latency['p99']:>9} {lag:>8} "
+                  f"{rss:>8} {sum(result['errors'].values()):>7}")
+    print("=" * 78 + "\n")
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "target": client.description,
+        "config": {
+            "endpoints": endpoints,
+            "levels": levels,
+            "sizes": sizes,
+            "requests_per_scenario": args.requests,
+            "fake_latency_ms": None if args.url else args.latency_ms,
+        },
+        "scenarios": scenarios,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmark for the summarizer API")
+    parser.add_argument("--levels", default="1,4,16", help="Comma-separated in-flight request levels")
+    parser.add_argument("--sizes", default="500,5000,50000", help="Comma-separated payload sizes in characters")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario")
+    parser.add_argument("--endpoints", default="summarize,context,keypoints", help="Endpoints to rotate through")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mean fake backend latency (in-process only)")
+    parser.add_argument("--url", default=None, help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--api-key", default=None, help="Tenant API key sent with --url requests")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
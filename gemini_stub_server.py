@@ -0,0 +1,139 @@
+"""
+Local stand-in for the Gemini REST API
+Serves generateContent, streamGenerateContent (SSE), cachedContents and model
+metadata with HTTP/1.1 keep-alive, so the connection pool, context caching and
+the REST backend can be tested without network access or quota. GET /stub/stats
+reports how many TCP connections the server accepted versus how many requests
+it served.
+
+Usage:
+    python gemini_stub_server.py [--port 8099] [--latency-ms 50] [--error-rate 0]
+
+    GEMINI_TRANSPORT=rest GEMINI_API_BASE=http://127.0.0.1:8099 GEMINI_API_KEY=test GEMINI_MODEL=stub \
+        python main.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 50, error_rate: float = 0.0):
+        super().__init__(address, StubHandler)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.connections = 0
+        self.requests = 0
+        self.cached_contents = {}
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"connections": self.connections, "requests": self.requests,
+                    "cached_contents": len(self.cached_contents)}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self) -> None:
+        with self.server._lock:
+            self.server.requests += 1
+
+    def do_GET(self):
+        if self.path == "/stub/stats":
+            self._send_json(200, self.server.stats())
+            return
+        self._count()
+        name = self.path.split("?")[0][len("/v1beta/"):]
+        self._send_json(200, {"name": name, "inputTokenLimit": 1048576, "outputTokenLimit": 8192})
+
+    def do_POST(self):
+        self._count()
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.startswith("/v1beta/cachedContents"):
+            with self.server._lock:
+                name = f"cachedContents/stub-{len(self.server.cached_contents) + 1}"
+                self.server.cached_contents[name] = request.get("contents", [])
+            self._send_json(200, {"name": name, "model": request.get("model")})
+            return
+        cached = []
+        if request.get("cachedContent"):
+            cached = self.server.cached_contents.get(request["cachedContent"])
+            if cached is None:
+                self._send_json(404, {"error": {"code": 404, "message": "Cached content not found",
+                                                "status": "NOT_FOUND"}})
+                return
+        time.sleep(self.server.latency_ms / 1000.0)
+        if random.random() < self.server.error_rate:
+            self._send_json(503, {"error": {"code": 503, "message": "The model is overloaded (stub)",
+                                            "status": "UNAVAILABLE"}})
+            return
+
+        cached_text = "".join(part.get("text", "") for content in cached for part in content.get("parts", []))
+        prompt = cached_text + "".join(part.get("text", "") for content in request.get("contents", [])
+                                       for part in content.get("parts", []))
+        config = request.get("generationConfig", {})
+        words = max(5, min(config.get("maxOutputTokens", 60), 60))
+        text = " ".join(["Stub summary of", str(len(prompt)), "prompt characters."] + ["lorem"] * (words - 5))
+        schema = config.get("responseSchema")
+        if schema:
+            text = json.dumps({
+                name: [text] * 3 if spec.get("type") == "ARRAY" else text
+                for name, spec in schema.get("properties", {}).items()
+            })
+        usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                 "cachedContentTokenCount": len(cached_text) // 4}
+
+        if ":streamGenerateContent" not in self.path:
+            self._send_json(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}],
+                "usageMetadata": usage,
+            })
+            return
+
+        # Chunked server-sent events, one event per few words
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        tokens = text.split(" ")
+        for i in range(0, len(tokens), 8):
+            chunk = {"candidates": [{"content": {"parts": [{"text": " ".join(tokens[i:i + 8]) + " "}]}}]}
+            event = f"data: {json.dumps(chunk)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini REST API")
+    parser.add_argument("--port", type=int, default=8099, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Delay before each generation response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of generations that fail with 503")
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), latency_ms=args.latency_ms, error_rate=args.error_rate)
+    print(f"Gemini stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
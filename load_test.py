@@ -0,0 +1,151 @@
+"""
+Load test for AI Text Summarizer API
+Drives the FastAPI app in-process against the fake model backend, so no API key or
+network is needed. Shows that throughput grows with in-flight requests and that
+/health stays responsive while upstream calls are pending.
+
+Usage:
+    python load_test.py [--latency 0.2] [--requests 32] [--levels 1,2,4,8,16]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("MODEL_BACKEND", "fake")
+# The fake model has no quota; keep the client-side limiter out of the measurement
+os.environ.setdefault("GEMINI_RPM", "1000000")
+
+import main
+from services.backends import FakeBackend
+
+
+async def call_app(method: str, path: str, payload: dict = None) -> tuple:
+    """
+    Send one HTTP request straight into the ASGI app
+
+    Returns:
+        tuple: (status code, decoded JSON body)
+    """
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = None
+    chunks = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return status, json.loads(b"".join(chunks) or b"null")
+
+
+def unique_payload(index: int) -> dict:
+    """Distinct text per request so the cache and request coalescing stay out of the way"""
+    return {
+        "text": f"Load test document {index} {time.perf_counter_ns()}. " + "Summarize me. " * 20,
+        "style": "concise"
+    }
+
+
+async def run_level(concurrency: int, total: int) -> dict:
+    """Fire `total` /summarize requests with `concurrency` in flight at once"""
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one(index: int):
+        nonlocal failures
+        async with semaphore:
+            status, _ = await call_app("POST", "/summarize", unique_payload(index))
+            if status != 200:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 2),
+    }
+
+
+async def health_while_busy(latency: float) -> float:
+    """Measure /health latency while a batch of upstream calls is pending"""
+    pending = [
+        asyncio.create_task(call_app("POST", "/summarize", unique_payload(index)))
+        for index in range(main.get_summarizer().max_concurrency)
+    ]
+    await asyncio.sleep(latency / 4)
+    start = time.perf_counter()
+    await call_app("GET", "/health")
+    elapsed = time.perf_counter() - start
+    await asyncio.gather(*pending)
+    return elapsed
+
+
+async def run_load_test(latency: float, total: int, levels: list):
+    """Run every concurrency level and print a throughput table"""
+    main.get_summarizer().backend = FakeBackend(latency_ms=latency * 1000)
+
+    print("\n" + "=" * 70)
+    print(f"⚡ LOAD TEST - fake model latency {latency * 1000:.0f} ms, "
+          f"worker pool size {main.get_summarizer().max_concurrency}")
+    print("=" * 70)
+    print(f"{'in-flight':>10} {'requests':>10} {'failures':>10} {'seconds':>10} {'req/s':>10}")
+
+    for level in levels:
+        result = await run_level(level, total)
+        print(f"{result['concurrency']:>10} {result['requests']:>10} {result['failures']:>10} "
+              f"{result['seconds']:>10} {result['requests_per_second']:>10}")
+
+    health_latency = await health_while_busy(latency)
+    print("-" * 70)
+    print(f"/health latency with upstream busy: {health_latency * 1000:.1f} ms")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process load test with a fake model")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake upstream latency in seconds")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated in-flight levels")
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(
+        latency=args.latency,
+        total=args.requests,
+        levels=[int(level) for level in args.levels.split(",")]
+    ))
+    main.get_summarizer().shutdown()
@@ -3,32 +3,201 @@ AI Text Summarizer API
 A FastAPI application that provides text summarization using Google Gemini
 """
 
+# Startup profile first, so its timings cover the whole application import
+from services.startup import PROFILE as startup
+
 # Fix for Python 3.14 compatibility (only needed for Python 3.14+)
 import sys
 if sys.version_info >= (3, 14):
     import py314_fix
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
+import asyncio
+import json
+import math
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Path, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Discriminator, Field, Tag
+from typing import Annotated, List, Optional, Literal, Union
 from services.summarize_service import SummarizeService
+from services.jobs import JobDeferred, JobQueue, TransientJobError
+from services.admission import Overloaded, create_admission_controller_from_env
+from services.rate_limit import RateLimitExceeded
+from services.retry import is_transient_error
+from services.shared_state import call_store
+from services.tenants import current_tenant
+from services.metrics import REGISTRY, MetricsMiddleware
+from services.compression import CompressionMiddleware
 import uvicorn
 
+# Summarization service, built by the lifespan hook (or on first use) rather
+# than at import, so importing the app stays cheap on scale-from-zero cold starts
+_summarizer: Optional[SummarizeService] = None
+
+
+def get_summarizer() -> SummarizeService:
+    """The summarization service, created on first call"""
+    global _summarizer
+    if _summarizer is None:
+        with startup.phase("service_init"):
+            _summarizer = SummarizeService()
+    return _summarizer
+
+# Largest accepted input text, in characters (rejected with 422 before any work)
+MAX_INPUT_CHARS = int(os.getenv("MAX_INPUT_CHARS", "2000000"))
+
+# Largest accepted summarization context (audience or style), in characters
+MAX_CONTEXT_CHARS = int(os.getenv("MAX_CONTEXT_CHARS", "1000"))
+
+# Global cap on batch items executing at once, shared by every batch request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+batch_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_CONCURRENCY", "8")))
+
+# Admission control for the summarization endpoints: bounded in-flight work,
+# batch requests shed with 503 once queueing delay stands above target (None when disabled)
+admission = create_admission_controller_from_env()
+
+
+async def warm_up():
+    """Import the model SDK and open upstream connections off the request path"""
+    with startup.phase("warmup"):
+        startup.warmup = await asyncio.get_running_loop().run_in_executor(None, get_summarizer().warm_up)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build the service and start the job workers; release resources on shutdown
+    
+    With STARTUP_WARMUP (default true) the model is warmed up in the background:
+    the server accepts requests (and passes health checks) immediately, and the
+    first model call waits only for whatever warm-up has not finished yet.
+    """
+    get_summarizer()
+    await get_job_queue().start()
+    warmup = None
+    if os.getenv("STARTUP_WARMUP", "true").lower() == "true":
+        warmup = asyncio.create_task(warm_up())
+    startup.mark("ready")
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    await get_job_queue().stop()
+    get_summarizer().shutdown()
+
+
+# Endpoints open without an API key (load balancer health checks, metrics scrapers)
+PUBLIC_PATHS = {"/", "/health", "/metrics"}
+
+
+async def authenticate(request: Request):
+    """
+    Resolve the caller's tenant and admit its request
+    
+    The API key comes from X-API-Key or 'Authorization: Bearer <key>' (not
+    needed when no tenants are configured). Requests that submit work (POST)
+    are turned away with 429 while the tenant's quota is used up; reads such
+    as job polling and /usage are always answered. The tenant is set for the
+    rest of the request, so its upstream calls are charged and scheduled as its own.
+    """
+    if request.url.path in PUBLIC_PATHS:
+        return
+    api_key = request.headers.get("x-api-key")
+    authorization = request.headers.get("authorization", "")
+    if not api_key and authorization.lower().startswith("bearer "):
+        api_key = authorization[len("bearer "):].strip()
+    
+    tenants = get_summarizer().tenants
+    tenant = tenants.authenticate(api_key)
+    if tenant is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Missing or invalid API key",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if request.method == "POST":
+        try:
+            await call_store(tenants.blocking, tenants.admit, tenant)
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(math.ceil(e.retry_after))}
+            )
+    current_tenant.set(tenant.id)
+
+
+def request_priority(request: Request) -> str:
+    """
+    Admission priority of a request
+    
+    The tenant's ('interactive' unless configured as 'batch'); callers can
+    lower their own with 'X-Priority: batch'.
+    """
+    tenant = get_summarizer().tenants.tenants.get(current_tenant.get())
+    priority = tenant.priority if tenant is not None else "interactive"
+    if request.headers.get("x-priority", "").lower() == "batch":
+        priority = "batch"
+    return priority
+
+
+@asynccontextmanager
+async def admitted(priority: str):
+    """
+    Hold an admission slot (no-op when admission control is off)
+    
+    Raises:
+        Overloaded: If the work is shed
+    """
+    if admission is None:
+        yield
+        return
+    await admission.acquire(priority)
+    try:
+        yield
+    finally:
+        admission.release()
+
+
+async def admission_slot(request: Request):
+    """
+    Hold an admission slot while the request runs
+    
+    For streaming responses the slot is held until the stream ends. Shed
+    requests get 503 with Retry-After.
+    """
+    async with AsyncExitStack() as stack:
+        try:
+            await stack.enter_async_context(admitted(request_priority(request)))
+        except Overloaded as e:
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(math.ceil(e.retry_after))}
+            )
+        yield
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Text Summarizer API",
     description="Summarize text using Google Gemini with various styles and options",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    dependencies=[Depends(authenticate)]
 )
-
-# Initialize summarization service
-summarizer = SummarizeService()
+app.add_middleware(
+    CompressionMiddleware,
+    max_body_bytes=int(os.getenv("MAX_REQUEST_BYTES", str(16 * 1024 * 1024))),
+    min_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+)
+app.add_middleware(MetricsMiddleware)
 
 
 # Request Models
-class SummarizeRequest(BaseModel):
-    """Request model for basic text summarization"""
-    text: str = Field(..., min_length=10, description="The text to summarize (minimum 10 characters)")
+class SummarizeOptions(BaseModel):
+    """Options for basic text summarization (query parameters of /summarize/text)"""
     style: Literal["concise", "detailed", "bullet"] = Field(
         default="concise",
         description="Summarization style: concise (2-3 sentences), detailed (comprehensive), or bullet (key points)"
@@ -45,27 +214,190 @@ class SummarizeRequest(BaseModel):
         le=2.0,
         description="Creativity level (0.0-2.0, lower = more focused)"
     )
+    mode: Literal["auto", "single", "hierarchical"] = Field(
+        default="auto",
+        description="single prompt, hierarchical map-reduce over chunks, or auto (hierarchical for long texts)"
+    )
+    engine: Literal["llm", "extractive"] = Field(
+        default="llm",
+        description="llm (Gemini) or extractive (local sentence ranking, milliseconds, no model call)"
+    )
+
+
+class SummarizeRequest(SummarizeOptions):
+    """Request model for basic text summarization"""
+    text: str = Field(
+        ...,
+        min_length=10,
+        max_length=MAX_INPUT_CHARS,
+        description="The text to summarize (minimum 10 characters, at most MAX_INPUT_CHARS)"
+    )
 
 
 class ContextSummarizeRequest(BaseModel):
     """Request model for context-aware summarization"""
-    text: str = Field(..., min_length=10)
+    text: str = Field(..., min_length=10, max_length=MAX_INPUT_CHARS)
     context: str = Field(
         ...,
-        description="Context for summarization (e.g., 'for a 5-year-old', 'technical audience', 'executive summary')"
+        min_length=1,
+        max_length=MAX_CONTEXT_CHARS,
+        description="Context for summarization (e.g., 'for a 5-year-old', 'technical audience', 'executive summary'), "
+                    "at most MAX_CONTEXT_CHARS"
     )
     max_tokens: int = Field(default=200, ge=50, le=1000)
 
 
 class KeyPointsRequest(BaseModel):
     """Request model for extracting key points"""
-    text: str = Field(..., min_length=10)
+    text: str = Field(..., min_length=10, max_length=MAX_INPUT_CHARS)
     num_points: int = Field(
         default=5,
         ge=1,
         le=10,
         description="Number of key points to extract (1-10)"
     )
+    engine: Literal["llm", "extractive"] = Field(
+        default="llm",
+        description="llm (Gemini) or extractive (local sentence ranking, milliseconds, no model call)"
+    )
+
+
+class MultiSummaryRequest(BaseModel):
+    """Request model for several summary styles from one model call"""
+    text: str = Field(..., min_length=10, max_length=MAX_INPUT_CHARS)
+    outputs: List[Literal["concise", "detailed", "bullet", "key_points"]] = Field(
+        default=["concise", "bullet", "key_points"],
+        min_length=1,
+        description="Outputs to produce from a single upstream call"
+    )
+    num_points: int = Field(default=5, ge=1, le=10, description="Number of key points (1-10)")
+    max_tokens: int = Field(
+        default=600,
+        ge=100,
+        le=2000,
+        description="Output token budget shared by all outputs (100-2000)"
+    )
+    temperature: float = Field(default=0.5, ge=0.0, le=2.0)
+    engine: Literal["llm", "extractive"] = Field(
+        default="llm",
+        description="llm (Gemini) or extractive (local sentence ranking, milliseconds, no model call)"
+    )
+
+
+class DocumentSummarizeRequest(BaseModel):
+    """Request model for summarizing a version of a stored document"""
+    version: int = Field(..., ge=0, description="Document version; must not go backwards")
+    text: str = Field(
+        ...,
+        min_length=10,
+        max_length=MAX_INPUT_CHARS,
+        description="Full text of this version"
+    )
+    style: Literal["concise", "detailed", "bullet"] = Field(default="concise")
+    max_tokens: int = Field(default=150, ge=50, le=1000)
+    temperature: float = Field(default=0.7, ge=0.0, le=2.0)
+
+
+# Batch Models
+class BatchSummarizeItem(SummarizeRequest):
+    """Batch item for basic summarization"""
+    type: Literal["summarize"] = "summarize"
+    id: Optional[str] = Field(default=None, description="Caller-supplied identifier echoed in the result")
+
+
+class BatchContextItem(ContextSummarizeRequest):
+    """Batch item for context-aware summarization"""
+    type: Literal["context"]
+    id: Optional[str] = Field(default=None, description="Caller-supplied identifier echoed in the result")
+
+
+class BatchKeyPointsItem(KeyPointsRequest):
+    """Batch item for key point extraction"""
+    type: Literal["keypoints"]
+    id: Optional[str] = Field(default=None, description="Caller-supplied identifier echoed in the result")
+
+
+def _batch_item_type(value) -> str:
+    """Items without a 'type' are plain summarize requests"""
+    if isinstance(value, dict):
+        return value.get("type", "summarize")
+    return getattr(value, "type", "summarize")
+
+
+BatchItem = Annotated[
+    Union[
+        Annotated[BatchSummarizeItem, Tag("summarize")],
+        Annotated[BatchContextItem, Tag("context")],
+        Annotated[BatchKeyPointsItem, Tag("keypoints")]
+    ],
+    Discriminator(_batch_item_type)
+]
+
+
+class BatchRequest(BaseModel):
+    """Request model for batch summarization"""
+    items: List[BatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_ITEMS,
+        description="Items to process; each has its own type ('summarize', 'context' or 'keypoints') and options"
+    )
+
+
+class JobRequest(BatchRequest):
+    """Request model for queued (asynchronous) summarization jobs"""
+    priority: Literal["interactive", "batch"] = Field(
+        default="batch",
+        description="'interactive' jobs are always picked before 'batch' jobs"
+    )
+    callback_url: Optional[str] = Field(
+        default=None,
+        max_length=2048,
+        description="http(s) webhook that receives the finished job as a JSON POST; must be a public "
+                    "address, or a host listed in JOB_CALLBACK_ALLOWED_HOSTS"
+    )
+
+
+def raise_for_failure(result: dict, message: str):
+    """
+    Turn a failed service result into an HTTP error
+    
+    Upstream throttling and local quota saturation become 429 with Retry-After,
+    a missed deadline becomes 504, a prompt too large for the model's context
+    becomes 413, a stale document version becomes 409, anything else is a 500.
+    """
+    if result.get("success"):
+        return
+    
+    if result.get("error_type") == "rate_limited":
+        raise HTTPException(
+            status_code=429,
+            detail=f"{message}: {result.get('error')}",
+            headers={"Retry-After": str(math.ceil(result.get("retry_after", 1)))}
+        )
+    
+    if result.get("error_type") == "deadline_exceeded":
+        raise HTTPException(
+            status_code=504,
+            detail=f"{message}: {result.get('error')}"
+        )
+    
+    if result.get("error_type") == "context_exceeded":
+        raise HTTPException(
+            status_code=413,
+            detail=f"{message}: {result.get('error')}"
+        )
+    
+    if result.get("error_type") == "version_conflict":
+        raise HTTPException(
+            status_code=409,
+            detail=f"{message}: {result.get('error')}"
+        )
+    
+    raise HTTPException(
+        status_code=500,
+        detail=f"{message}: {result.get('error')}"
+    )
 
 
 # API Endpoints
@@ -77,9 +409,22 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /summarize": "Basic text summarization with style options",
+            "POST /summarize/text": "Summarize a raw text/plain body (options as query parameters)",
             "POST /summarize/context": "Context-aware summarization",
             "POST /summarize/keypoints": "Extract key points from text",
-            "GET /health": "Health check endpoint"
+            "POST /summarize/multi": "Several styles (concise, bullet, key points...) from one model call",
+            "POST /documents/{id}/summarize": "Summarize a new document version, re-summarizing only changed sections",
+            "GET /documents/{id}": "Latest summary of a document",
+            "DELETE /documents/{id}": "Forget a document's stored sections",
+            "POST /summarize/batch": "Process many summarize/context/keypoints items concurrently",
+            "POST /jobs": "Queue summarization work; poll GET /jobs/{id} or use a webhook",
+            "GET /jobs": "Job queue depth and stats",
+            "GET /usage": "Quotas and usage of the calling tenant",
+            "POST /summarize/stream": "Streaming summarization over Server-Sent Events",
+            "POST /summarize/context/stream": "Streaming context-aware summarization (SSE)",
+            "POST /summarize/keypoints/stream": "Streaming key points extraction (SSE)",
+            "GET /health": "Health check endpoint",
+            "GET /metrics": "Prometheus metrics"
         },
         "documentation": "/docs"
     }
@@ -87,14 +432,69 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """
+    Health check endpoint
+    
+    Never queued behind admission control. Reports 'degraded' (still 200, so
+    the instance is not taken out of rotation) while requests are being shed.
+    """
+    if admission is not None and admission.shedding:
+        return {
+            "status": "degraded",
+            "service": "AI Text Summarizer API",
+            "admission": admission.stats()
+        }
     return {
         "status": "healthy",
         "service": "AI Text Summarizer API"
     }
 
 
-@app.post("/summarize")
+def collect_component_stats() -> list:
+    """
+    Expose service and job queue stats as gauges on every scrape
+    
+    Numeric fields become summarizer_<component>_<field>; nested dicts
+    (e.g. queued_by_priority) become one labelled series per key.
+    """
+    components = dict(get_summarizer().stats())
+    components["jobs"] = get_job_queue().stats()
+    components["startup"] = startup.stats()
+    if admission is not None:
+        components["admission"] = admission.stats()
+    
+    families = []
+    for component, stats in components.items():
+        for field, value in stats.items():
+            name = f"summarizer_{component}_{field}"
+            if isinstance(value, dict):
+                values = {(("key", key),): v for key, v in value.items() if isinstance(v, (int, float))}
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                values = {(): value}
+            else:
+                continue
+            families.append((name, f"{component} {field.replace('_', ' ')}", values))
+    return families
+
+
+# `python main.py` imports this file twice (as __main__, then as 'main' through
+# uvicorn.run); only the copy that serves the app reports its components
+if __name__ != "__main__":
+    REGISTRY.register_collector(collect_component_stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Prometheus text-format metrics: latency histograms, token counts, errors and component stats
+    
+    Rendered in the default executor: component stats query SQLite in shared mode.
+    """
+    body = await asyncio.get_running_loop().run_in_executor(None, REGISTRY.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.post("/summarize", dependencies=[Depends(admission_slot)])
 async def summarize_text(request: SummarizeRequest):
     """
     Summarize text with specified style
@@ -103,25 +503,60 @@ async def summarize_text(request: SummarizeRequest):
     - **style**: 'concise' (2-3 sentences), 'detailed' (comprehensive), or 'bullet' (key points)
     - **max_tokens**: Maximum length of summary (50-1000 tokens)
     - **temperature**: Creativity level (0.0 = focused, 2.0 = creative)
+    - **mode**: 'single', 'hierarchical' (chunked map-reduce) or 'auto'
+    - **engine**: 'llm' (default) or 'extractive' (local sentence ranking)
     """
     
-    result = summarizer.summarize_text(
+    result = await get_summarizer().summarize_text(
         text=request.text,
         style=request.style,
         max_tokens=request.max_tokens,
-        temperature=request.temperature
+        temperature=request.temperature,
+        mode=request.mode,
+        engine=request.engine
     )
     
-    if not result.get("success"):
+    raise_for_failure(result, "Summarization failed")
+    
+    return result
+
+
+@app.post("/summarize/text", dependencies=[Depends(admission_slot)])
+async def summarize_plain_text(request: Request, options: Annotated[SummarizeOptions, Query()]):
+    """
+    Summarize a raw text/plain request body
+    
+    Same as /summarize, but the text is the request body itself (UTF-8) and the
+    options are query parameters, e.g. `/summarize/text?style=bullet`. Large
+    documents skip JSON escaping and parsing entirely; combine with
+    `Content-Encoding: gzip`, `br` or `zstd` for compressed uploads.
+    """
+    try:
+        text = (await request.body()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Request body must be UTF-8 text")
+    
+    if not 10 <= len(text) <= MAX_INPUT_CHARS:
         raise HTTPException(
-            status_code=500,
-            detail=f"Summarization failed: {result.get('error')}"
+            status_code=422,
+            detail=f"Text must be between 10 and {MAX_INPUT_CHARS} characters (got {len(text)})"
         )
     
+    result = await get_summarizer().summarize_text(
+        text=text,
+        style=options.style,
+        max_tokens=options.max_tokens,
+        temperature=options.temperature,
+        mode=options.mode,
+        engine=options.engine
+    )
+    
+    raise_for_failure(result, "Summarization failed")
+    
     return result
 
 
-@app.post("/summarize/context")
+@app.post("/summarize/context", dependencies=[Depends(admission_slot)])
 async def summarize_with_context(request: ContextSummarizeRequest):
     """
     Summarize text with specific context
@@ -137,59 +572,381 @@ async def summarize_with_context(request: ContextSummarizeRequest):
     - "social media post" - Short, engaging format
     """
     
-    result = summarizer.summarize_with_context(
+    result = await get_summarizer().summarize_with_context(
         text=request.text,
         context=request.context,
         max_tokens=request.max_tokens
     )
     
-    if not result.get("success"):
-        raise HTTPException(
-            status_code=500,
-            detail=f"Summarization failed: {result.get('error')}"
-        )
+    raise_for_failure(result, "Summarization failed")
     
     return result
 
 
-@app.post("/summarize/keypoints")
+@app.post("/summarize/keypoints", dependencies=[Depends(admission_slot)])
 async def extract_key_points(request: KeyPointsRequest):
     """
     Extract key points from text
     
     - **text**: The text to analyze
     - **num_points**: Number of key points to extract (1-10)
+    - **engine**: 'llm' (default) or 'extractive' (the text's most central sentences)
     
     Returns a numbered list of the most important points from the text
     """
     
-    result = summarizer.extract_key_points(
+    result = await get_summarizer().extract_key_points(
         text=request.text,
-        num_points=request.num_points
+        num_points=request.num_points,
+        engine=request.engine
     )
     
-    if not result.get("success"):
-        raise HTTPException(
-            status_code=500,
-            detail=f"Key point extraction failed: {result.get('error')}"
+    raise_for_failure(result, "Key point extraction failed")
+    
+    return result
+
+
+@app.post("/summarize/multi", dependencies=[Depends(admission_slot)])
+async def summarize_multi(request: MultiSummaryRequest):
+    """
+    Produce several summary styles of one text with a single model call
+    
+    - **text**: The text to summarize
+    - **outputs**: Any of 'concise', 'detailed', 'bullet', 'key_points'
+    - **num_points**: Number of key points (1-10)
+    - **max_tokens**: Output budget shared by all outputs
+    - **engine**: 'llm' (default) or 'extractive'
+    
+    The document is sent upstream once instead of once per style. Outputs the
+    model returns malformed are regenerated individually and listed in
+    `fallback_outputs`.
+    """
+    
+    result = await get_summarizer().summarize_multi(
+        text=request.text,
+        outputs=request.outputs,
+        num_points=request.num_points,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature,
+        engine=request.engine
+    )
+    
+    raise_for_failure(result, "Multi-output summarization failed")
+    
+    return result
+
+
+@app.post("/documents/{document_id}/summarize", dependencies=[Depends(admission_slot)])
+async def summarize_document(document_id: Annotated[str, Path(max_length=256)], request: DocumentSummarizeRequest):
+    """
+    Summarize a new version of a living document (wiki page, ticket...)
+    
+    - **version**: Increases with every edit; an older version is rejected with 409
+    - **text**: Full text of this version
+    - **style**, **max_tokens**, **temperature**: As for /summarize
+    
+    Sections unchanged since the previous version reuse their stored summaries;
+    only edited sections are sent to the model before the merge. The response
+    reports `sections_summarized`, `sections_reused` and paragraph changes.
+    """
+    
+    result = await get_summarizer().summarize_document(
+        document_id,
+        version=request.version,
+        text=request.text,
+        style=request.style,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature
+    )
+    
+    raise_for_failure(result, "Document summarization failed")
+    
+    return result
+
+
+@app.get("/documents/{document_id}")
+async def get_document(document_id: str):
+    """Latest summary of a document"""
+    result = await get_summarizer().get_document(document_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+    return result
+
+
+@app.delete("/documents/{document_id}")
+async def delete_document(document_id: str):
+    """Delete a document's stored version and section summaries"""
+    if not await get_summarizer().delete_document(document_id):
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+    return {"deleted": True, "document_id": document_id}
+
+
+def sse_response(events) -> StreamingResponse:
+    """
+    Wrap a service event stream as Server-Sent Events
+    
+    Each event dict becomes `event: <name>` plus a JSON `data:` line. When the
+    client disconnects, Starlette cancels this generator, which stops the
+    upstream stream in the service.
+    """
+    async def encode():
+        async for event in events:
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        encode(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/summarize/stream", dependencies=[Depends(admission_slot)])
+async def stream_summarize_text(request: SummarizeRequest):
+    """
+    Stream a summary as Server-Sent Events
+    
+    Emits `chunk` events ({"text": ...}) as the model generates, then one `done`
+    event with the response metadata, or an `error` event. Always single-prompt;
+    the `mode` field is ignored.
+    """
+    return sse_response(get_summarizer().stream_summarize_text(
+        text=request.text,
+        style=request.style,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature,
+        engine=request.engine
+    ))
+
+
+@app.post("/summarize/context/stream", dependencies=[Depends(admission_slot)])
+async def stream_summarize_with_context(request: ContextSummarizeRequest):
+    """Stream a context-aware summary as Server-Sent Events (see /summarize/stream)"""
+    return sse_response(get_summarizer().stream_summarize_with_context(
+        text=request.text,
+        context=request.context,
+        max_tokens=request.max_tokens
+    ))
+
+
+@app.post("/summarize/keypoints/stream", dependencies=[Depends(admission_slot)])
+async def stream_extract_key_points(request: KeyPointsRequest):
+    """Stream extracted key points as Server-Sent Events (see /summarize/stream)"""
+    return sse_response(get_summarizer().stream_extract_key_points(
+        text=request.text,
+        num_points=request.num_points,
+        engine=request.engine
+    ))
+
+
+async def run_batch_item(item) -> dict:
+    """Dispatch one batch item to the matching service method"""
+    if item.type == "context":
+        return await get_summarizer().summarize_with_context(
+            text=item.text,
+            context=item.context,
+            max_tokens=item.max_tokens
+        )
+    if item.type == "keypoints":
+        return await get_summarizer().extract_key_points(
+            text=item.text,
+            num_points=item.num_points,
+            engine=item.engine
         )
+    return await get_summarizer().summarize_text(
+        text=item.text,
+        style=item.style,
+        max_tokens=item.max_tokens,
+        temperature=item.temperature,
+        mode=item.mode,
+        engine=item.engine
+    )
+
+
+async def process_batch(items, priority: str) -> dict:
+    """
+    Run batch items concurrently under the global cap
+    
+    Each item takes its own admission slot with the given priority; a shed
+    item fails with error_type 'overloaded' and a retry_after hint.
+    
+    Returns:
+        dict: Totals plus one result entry per item, in input order
+    """
+    
+    async def run(index: int, item) -> dict:
+        async with batch_semaphore:
+            try:
+                async with admitted(priority):
+                    result = await run_batch_item(item)
+            except Overloaded as e:
+                result = {"success": False, "error": str(e), "error_type": "overloaded",
+                          "retry_after": e.retry_after, "transient": True}
+            except Exception as e:
+                result = {"success": False, "error": str(e), "transient": is_transient_error(e)}
+        
+        entry = {"index": index, "id": item.id, "type": item.type, "success": bool(result.get("success"))}
+        if entry["success"]:
+            entry["result"] = result
+        else:
+            entry["error"] = result.get("error")
+            if result.get("transient"):
+                entry["transient"] = True
+            if result.get("error_type"):
+                entry["error_type"] = result["error_type"]
+                entry["retry_after"] = result.get("retry_after")
+        return entry
+    
+    results = await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
+    succeeded = sum(1 for r in results if r["success"])
+    
+    return {
+        "success": succeeded == len(results),
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+@app.post("/summarize/batch")
+async def summarize_batch(request: BatchRequest, http_request: Request):
+    """
+    Process several summarization requests in one call
+    
+    - **items**: List of items; `type` selects 'summarize' (default), 'context' or 'keypoints'
+      and the remaining fields match the corresponding single-item endpoint
+    
+    Items run concurrently under a server-wide cap (BATCH_CONCURRENCY) and are
+    admitted one by one, so a large batch cannot bypass admission control. A
+    failing or shed item is reported in its own result and never fails the
+    whole batch.
+    """
+    return await process_batch(request.items, request_priority(http_request))
+
+
+async def run_job(payload: dict) -> dict:
+    """
+    Job queue handler: run the job's items as a batch
     
+    Raises TransientJobError when any item failed for a retryable reason, so the
+    queue retries the job. Items that already succeeded are served from the cache.
+    The job's upstream calls are charged to the tenant that submitted it, and
+    its items are admitted with the priority the job was submitted with. When
+    the only failures are items shed by admission control, JobDeferred puts the
+    job back in the queue until the overload has passed, without using up an attempt.
+    """
+    payload = dict(payload)
+    token = current_tenant.set(payload.pop("tenant", None))
+    priority = payload.pop("priority", "batch")
+    try:
+        request = BatchRequest(**payload)
+        result = await process_batch(request.items, priority)
+    finally:
+        current_tenant.reset(token)
+    failed = [r for r in result["results"] if not r["success"]]
+    shed = [r for r in failed if r.get("error_type") == "overloaded"]
+    if shed and len(shed) == len(failed):
+        raise JobDeferred(max(r["retry_after"] for r in shed), "server overloaded")
+    transient = [r["error"] for r in failed if r.get("transient")]
+    if transient:
+        raise TransientJobError(f"{len(transient)} item(s) hit a transient error: {transient[0]}")
     return result
 
 
+# Persistent job queue with an in-app worker pool, built by the lifespan hook
+# (or on first use) like the service, so importing the app opens no database
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """The job queue, created on first call"""
+    global _job_queue
+    if _job_queue is None:
+        with startup.phase("job_queue_init"):
+            _job_queue = JobQueue(
+                handler=run_job,
+                path=os.getenv("JOB_DB_PATH", "jobs.db"),
+                workers=int(os.getenv("JOB_WORKERS", "2")),
+                max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+                lease=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+                callback_allowed_hosts=[
+                    host.strip() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+                ]
+            )
+    return _job_queue
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest, http_request: Request):
+    """
+    Queue summarization work and return immediately
+    
+    - **items**: Same items as /summarize/batch
+    - **priority**: 'interactive' jobs run before 'batch' jobs (a batch-tier tenant's
+      jobs are always 'batch')
+    - **callback_url**: Optional http(s) URL that receives the finished job as a JSON POST
+      (public addresses only, or the hosts in JOB_CALLBACK_ALLOWED_HOSTS)
+    
+    Poll GET /jobs/{id} for status and results. Submitting only queues the job;
+    its items take admission slots when a worker runs them.
+    """
+    priority = "batch" if "batch" in (request.priority, request_priority(http_request)) else "interactive"
+    payload = {
+        "items": [item.model_dump() for item in request.items],
+        "tenant": current_tenant.get(),
+        "priority": priority
+    }
+    try:
+        return await get_job_queue().submit(payload, priority=priority, callback_url=request.callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/jobs")
+async def job_stats():
+    """Queue depth and worker counters"""
+    return await asyncio.get_running_loop().run_in_executor(None, get_job_queue().stats)
+
+
+@app.get("/usage")
+async def tenant_usage():
+    """Quotas, remaining balance and usage of the calling tenant"""
+    tenants = get_summarizer().tenants
+    return await call_store(tenants.blocking, tenants.usage, current_tenant.get())
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status; 'result' holds the batch response once the job has succeeded"""
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+startup.mark("import")
+
+
 # Run the application
 if __name__ == "__main__":
-    import os
-    
     # Use PORT from environment (Render sets this) or default to 8000 for local dev
     port = int(os.environ.get("PORT", 8000))
     
     # Disable reload in production (when PORT env var is set)
     is_production = "PORT" in os.environ
     
+    # Worker processes (one per core); with more than one, the cache, request
+    # coalescing and quota buckets are shared through SQLite so global limits hold
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        os.environ.setdefault("SHARED_STATE", "sqlite")
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
-        reload=not is_production  # Auto-reload only in development
+        workers=workers,
+        reload=not is_production and workers == 1,  # Auto-reload only in single-process development
+        timeout_graceful_shutdown=int(os.environ.get("GRACEFUL_SHUTDOWN_SECONDS", "30"))
     )
@@ -0,0 +1,197 @@
+"""
+Admission Control
+Bounded in-flight work with CoDel-style load shedding and priority reservation
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Optional
+
+PRIORITIES = ("interactive", "batch")
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    status = 503
+
+    def __init__(self, retry_after: float, reason: str = "overloaded"):
+        self.retry_after = max(1.0, retry_after)
+        super().__init__(f"Server overloaded (503, {reason}): retry after {self.retry_after:.0f}s")
+
+
+class AdmissionController:
+    """
+    Caps requests in flight and sheds load when the admission queue stands
+
+    Requests beyond max_in_flight wait in a queue, interactive before batch.
+    The top `reserved` slots are only ever given to interactive requests, so a
+    batch surge cannot take the last of the capacity.
+
+    Overload is detected as in CoDel: the queueing delay (sojourn time) of each
+    admitted request is measured, and once it has stayed above target_delay for
+    a whole interval the controller starts shedding. While shedding, batch
+    requests are rejected on arrival and batch requests already queued are
+    rejected when they reach the head, so the queue drains instead of growing.
+    Shedding stops once a request is admitted below target or the queue
+    empties. Requests of any priority are rejected when the queue is full or
+    after max_queue_delay.
+    """
+
+    def __init__(self, max_in_flight: int = 32, reserved: Optional[int] = None, max_queue: Optional[int] = None,
+                 target_delay: float = 0.5, interval: float = 2.0, max_queue_delay: float = 10.0):
+        self.max_in_flight = max_in_flight
+        self.reserved = min(max_in_flight - 1, reserved if reserved is not None else max(1, max_in_flight // 5))
+        self.max_queue = max_queue if max_queue is not None else 2 * max_in_flight
+        self.target_delay = target_delay
+        self.interval = interval
+        self.max_queue_delay = max_queue_delay
+
+        self.in_flight = 0
+        self._queues = {priority: deque() for priority in PRIORITIES}  # (future, enqueued_at)
+        self._first_above = None
+        self.dropping = False
+        self.queue_delay = 0.0
+        self._last_shed = float("-inf")
+
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.shed = {priority: 0 for priority in PRIORITIES}
+        self.shedding_episodes = 0
+
+    def _limit(self, priority: str) -> int:
+        return self.max_in_flight - (self.reserved if priority == "batch" else 0)
+
+    def _queued(self, priority: str) -> int:
+        queue = self._queues[priority]
+        while queue and queue[0][0].done():
+            queue.popleft()
+        return sum(1 for future, _ in queue if not future.done())
+
+    def _observe(self, sojourn: float, now: float) -> None:
+        """CoDel state update from one request's queueing delay"""
+        self.queue_delay = sojourn
+        if sojourn < self.target_delay:
+            self._first_above = None
+            self.dropping = False
+        elif self._first_above is None:
+            self._first_above = now + self.interval
+        elif now >= self._first_above and not self.dropping:
+            self.dropping = True
+            self.shedding_episodes += 1
+
+    def _reject(self, priority: str, reason: str) -> Overloaded:
+        self.shed[priority] += 1
+        self._last_shed = time.monotonic()
+        return Overloaded(retry_after=max(self.interval, self.queue_delay), reason=reason)
+
+    async def acquire(self, priority: str = "interactive") -> float:
+        """
+        Wait for an admission slot
+
+        Returns:
+            float: Seconds spent queued
+
+        Raises:
+            Overloaded: If the request is shed
+        """
+        now = time.monotonic()
+        queued_ahead = self._queued("interactive") + (self._queued("batch") if priority == "batch" else 0)
+        if self.in_flight < self._limit(priority) and not queued_ahead:
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            self._observe(0.0, now)
+            return 0.0
+
+        # A queue that stopped moving yields no sojourn samples; its head's age counts as one
+        oldest = [queue[0][1] for queue in self._queues.values() if queue]
+        if oldest and now - min(oldest) >= self.target_delay:
+            self._observe(now - min(oldest), now)
+        if priority == "batch" and self.dropping:
+            raise self._reject(priority, "shedding batch requests")
+        if self._queued("interactive") + self._queued("batch") >= self.max_queue:
+            raise self._reject(priority, "admission queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append((waiter, now))
+        try:
+            return await asyncio.wait_for(waiter, self.max_queue_delay)
+        except asyncio.TimeoutError:
+            raise self._reject(priority, f"queued over {self.max_queue_delay:g}s") from None
+        except BaseException:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # The slot was granted as we gave up; hand it to the next request
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._grant()
+
+    def _grant(self) -> None:
+        """Admit queued requests into free slots, shedding queued batch requests while overloaded"""
+        while True:
+            priority = next(
+                (p for p in PRIORITIES if self._queued(p) and self.in_flight < self._limit(p)),
+                None
+            )
+            if priority is None:
+                if not any(self._queued(p) for p in PRIORITIES):
+                    # As in CoDel, an empty queue ends the shedding state
+                    self._first_above = None
+                    self.dropping = False
+                return
+            waiter, enqueued_at = self._queues[priority].popleft()
+            now = time.monotonic()
+            self._observe(now - enqueued_at, now)
+            if priority == "batch" and self.dropping:
+                waiter.set_exception(self._reject(priority, "shedding batch requests"))
+                continue
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            waiter.set_result(now - enqueued_at)
+
+    @property
+    def shedding(self) -> bool:
+        """True while shedding, and for one interval after the last shed request"""
+        return self.dropping or time.monotonic() - self._last_shed < self.interval
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "reserved_interactive": self.reserved,
+            "in_flight": self.in_flight,
+            "queued": {priority: self._queued(priority) for priority in PRIORITIES},
+            "queue_delay_seconds": round(self.queue_delay, 4),
+            "shedding": int(self.shedding),
+            "shedding_episodes": self.shedding_episodes,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+        }
+
+
+def create_admission_controller_from_env() -> Optional[AdmissionController]:
+    """
+    Build the admission controller, or None when ADMISSION_CONTROL=false
+
+    ADMISSION_MAX_IN_FLIGHT: Requests processed at once (default 4 x GEMINI_MAX_CONCURRENCY)
+    ADMISSION_RESERVED: Slots only interactive requests may use (default a fifth)
+    ADMISSION_MAX_QUEUE: Requests that may wait for a slot (default 2 x max in flight)
+    ADMISSION_TARGET_DELAY_SECONDS / ADMISSION_INTERVAL_SECONDS: Shed batch requests once the
+        queueing delay has stayed above the target for an interval (default 0.5 / 2)
+    ADMISSION_MAX_QUEUE_DELAY_SECONDS: Longest any request waits before 503 (default 10)
+    """
+    if os.getenv("ADMISSION_CONTROL", "true").lower() != "true":
+        return None
+    max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", str(4 * int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")))))
+    reserved = os.getenv("ADMISSION_RESERVED")
+    max_queue = os.getenv("ADMISSION_MAX_QUEUE")
+    return AdmissionController(
+        max_in_flight=max_in_flight,
+        reserved=int(reserved) if reserved else None,
+        max_queue=int(max_queue) if max_queue else None,
+        target_delay=float(os.getenv("ADMISSION_TARGET_DELAY_SECONDS", "0.5")),
+        interval=float(os.getenv("ADMISSION_INTERVAL_SECONDS", "2")),
+        max_queue_delay=float(os.getenv("ADMISSION_MAX_QUEUE_DELAY_SECONDS", "10"))
+    )
@@ -0,0 +1,494 @@
+"""
+Model Backends
+Pluggable text generation backends behind SummarizeService
+"""
+
+import datetime
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Iterator, List, Optional
+
+
+class GenerationError(RuntimeError):
+    """An upstream call failed; status is the HTTP status the upstream answered with"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        self.status = status
+        super().__init__(message)
+
+
+class GenerationResult:
+    """
+    Text produced by a backend, with token usage when the backend reports it
+
+    model is filled in by SummarizeService with the name of the model that
+    actually served the call.
+    """
+
+    def __init__(self, text: str, input_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+                 model: Optional[str] = None):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.model = model
+
+
+class ModelBackend:
+    """
+    Interface for model backends
+
+    Methods are blocking; SummarizeService runs them on its worker pool.
+    source_text is the document being summarized, for backends that work on
+    the text itself rather than the prompt. response_schema asks for a JSON
+    response matching the schema; backends that cannot enforce it may ignore it,
+    so callers validate the output. prefix is the leading part of prompt shared
+    by many calls (template instructions and examples), which backends may cache
+    upstream; others just send the full prompt.
+    """
+
+    model_name = "unknown"
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float,
+                 timeout: Optional[float] = None, source_text: Optional[str] = None,
+                 response_schema: Optional[dict] = None, prefix: Optional[str] = None) -> GenerationResult:
+        raise NotImplementedError
+
+    def generate_stream(self, prompt: str, max_tokens: int, temperature: float,
+                        timeout: Optional[float] = None, source_text: Optional[str] = None) -> Iterator[str]:
+        """Yield text chunks. Backends without native streaming emit one chunk."""
+        yield self.generate(prompt, max_tokens, temperature, timeout, source_text).text
+
+    def warm_up(self) -> None:
+        """Load client libraries and open upstream connections ahead of the first request"""
+
+
+class GeminiBackend(ModelBackend):
+    """
+    Google Gemini through the google-generativeai SDK
+
+    The SDK takes most of a second to import, so it is imported and configured
+    on first use (or by warm_up) rather than when the backend is built, keeping
+    it off the process startup path.
+
+    With a context_cache, a prompt prefix large enough to cache is stored once
+    with caching.CachedContent, and later calls go through a model bound to it
+    (GenerativeModel.from_cached_content) with only the rest of the prompt.
+    """
+
+    def __init__(self, model_name: str, api_key: Optional[str] = None, context_cache=None):
+        self.model_name = model_name
+        self.context_cache = context_cache
+        self._api_key = api_key
+        self._genai = None
+        self._model = None
+        self._cached_models = {}  # prefix -> (cached content name, model bound to it)
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The SDK model object, importing and configuring the SDK on first access"""
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self._api_key)
+                self._genai = genai
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    @property
+    def _resource_name(self) -> str:
+        return self.model_name if self.model_name.startswith("models/") else f"models/{self.model_name}"
+
+    def warm_up(self) -> None:
+        """Import the SDK and open the upstream connection with a metadata call (no generation quota)"""
+        self.model
+        self._genai.get_model(self._resource_name, request_options={"timeout": 10})
+
+    def _config(self, max_tokens: int, temperature: float, response_schema: Optional[dict] = None):
+        structured = {"response_mime_type": "application/json", "response_schema": response_schema}
+        return self._genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+            **(structured if response_schema else {})
+        )
+
+    def _cached_model(self, prefix: Optional[str]):
+        """SDK model bound to the cached content holding prefix, creating it if due; None to send the full prompt"""
+        if self.context_cache is None or not prefix:
+            return None
+        name, create = self.context_cache.lookup(self.model_name, prefix)
+        if create:
+            try:
+                cached = self._genai.caching.CachedContent.create(
+                    model=self._resource_name,
+                    contents=[prefix],
+                    ttl=datetime.timedelta(seconds=self.context_cache.ttl)
+                )
+                name = cached.name
+            except Exception:
+                name = None
+            self.context_cache.store(self.model_name, prefix, name)
+        if name is None:
+            return None
+        with self._lock:
+            known = self._cached_models.get(prefix)
+        if known is not None and known[0] == name:
+            return known[1]
+        try:
+            model = self._genai.GenerativeModel.from_cached_content(name)
+        except Exception:
+            self.context_cache.invalidate(self.model_name, prefix)
+            return None
+        with self._lock:
+            self._cached_models[prefix] = (name, model)
+        return model
+
+    def generate(self, prompt, max_tokens, temperature, timeout=None, source_text=None, response_schema=None,
+                 prefix=None):
+        model = self.model
+        cached_model = self._cached_model(prefix) if prefix and prompt.startswith(prefix) else None
+
+        def call(model, text):
+            return model.generate_content(
+                text,
+                generation_config=self._config(max_tokens, temperature, response_schema),
+                request_options={"timeout": timeout} if timeout else None
+            )
+
+        if cached_model is None:
+            response = call(model, prompt)
+        else:
+            try:
+                response = call(cached_model, prompt[len(prefix):])
+            except Exception as e:
+                if getattr(e, "code", None) not in (400, 403, 404):
+                    raise
+                # The cached content expired or was deleted upstream: send the full prompt
+                self.context_cache.invalidate(self.model_name, prefix)
+                with self._lock:
+                    self._cached_models.pop(prefix, None)
+                response = call(model, prompt)
+        usage = getattr(response, "usage_metadata", None)
+        if self.context_cache is not None:
+            self.context_cache.record_usage(getattr(usage, "cached_content_token_count", None))
+        return GenerationResult(
+            response.text,
+            input_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None)
+        )
+
+    def generate_stream(self, prompt, max_tokens, temperature, timeout=None, source_text=None):
+        model = self.model
+        response = model.generate_content(
+            prompt,
+            generation_config=self._config(max_tokens, temperature),
+            stream=True,
+            request_options={"timeout": timeout} if timeout else None
+        )
+        for chunk in response:
+            yield chunk.text
+
+
+class GeminiRESTBackend(ModelBackend):
+    """
+    Google Gemini through its REST API over a shared keep-alive connection pool
+
+    Every model of the pool sends its calls through one ConnectionPool, so
+    requests reuse warm TCP/TLS connections instead of handshaking per call.
+    Upstream errors are raised as GenerationError carrying the HTTP status, with
+    the message in the SDK's '<code> <STATUS>: <message>' form.
+
+    With a context_cache, a prompt prefix large enough to cache is stored once
+    as a Gemini cached content and later calls send only the rest of the prompt,
+    paying the cached rate for the prefix tokens.
+    """
+
+    def __init__(self, model_name: str, pool, api_key: Optional[str] = None, prewarm: int = 0,
+                 context_cache=None):
+        self.model_name = model_name
+        self.pool = pool
+        self.prewarm = prewarm
+        self.context_cache = context_cache
+        self._path = "/v1beta/" + (model_name if model_name.startswith("models/") else f"models/{model_name}")
+        self._headers = {"Content-Type": "application/json", "x-goog-api-key": api_key or ""}
+
+    def warm_up(self) -> None:
+        """Open prewarm pooled connections, then check the model with a metadata call (no generation quota)"""
+        self.pool.prewarm(self.prewarm)
+        status, data = self.pool.request("GET", self._path, headers=self._headers, timeout=10)
+        if status != 200:
+            raise self._error(status, data)
+
+    def _body(self, prompt: str, max_tokens: int, temperature: float,
+              response_schema: Optional[dict] = None, cached_content: Optional[str] = None) -> bytes:
+        config = {"maxOutputTokens": max_tokens, "temperature": temperature}
+        if response_schema:
+            config.update(responseMimeType="application/json", responseSchema=response_schema)
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}], "generationConfig": config}
+        if cached_content:
+            body["cachedContent"] = cached_content
+        return json.dumps(body).encode("utf-8")
+
+    def _cached_prefix(self, prefix: Optional[str], timeout: Optional[float]) -> Optional[str]:
+        """Name of the cached content holding prefix, creating it if due; None to send the full prompt"""
+        if self.context_cache is None or not prefix:
+            return None
+        name, create = self.context_cache.lookup(self.model_name, prefix)
+        if not create:
+            return name
+        try:
+            status, data = self.pool.request(
+                "POST",
+                "/v1beta/cachedContents",
+                body=json.dumps({
+                    "model": self._path[len("/v1beta/"):],
+                    "contents": [{"role": "user", "parts": [{"text": prefix}]}],
+                    "ttl": f"{self.context_cache.ttl:g}s",
+                }).encode("utf-8"),
+                headers=self._headers,
+                timeout=timeout
+            )
+            name = json.loads(data).get("name") if status == 200 else None
+        except Exception:
+            name = None
+        self.context_cache.store(self.model_name, prefix, name)
+        return name
+
+    @staticmethod
+    def _text(response: dict) -> str:
+        candidates = response.get("candidates") or []
+        if not candidates:
+            reason = (response.get("promptFeedback") or {}).get("blockReason", "no candidates")
+            raise RuntimeError(f"Gemini returned no text ({reason})")
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    @staticmethod
+    def _error(status: int, data: bytes) -> GenerationError:
+        try:
+            error = json.loads(data)["error"]
+            return GenerationError(f"{status} {error.get('status', '')}: {error.get('message', '')}", status)
+        except (ValueError, KeyError, TypeError):
+            return GenerationError(f"{status} {data[:200].decode('utf-8', 'replace')}", status)
+
+    def generate(self, prompt, max_tokens, temperature, timeout=None, source_text=None, response_schema=None,
+                 prefix=None):
+        cached_content = self._cached_prefix(prefix, timeout) if prefix and prompt.startswith(prefix) else None
+
+        def call(cached_content):
+            text = prompt[len(prefix):] if cached_content else prompt
+            return self.pool.request(
+                "POST",
+                f"{self._path}:generateContent",
+                body=self._body(text, max_tokens, temperature, response_schema, cached_content),
+                headers=self._headers,
+                timeout=timeout
+            )
+
+        status, data = call(cached_content)
+        if cached_content and status in (400, 403, 404):
+            # The cached content expired or was deleted upstream: send the full prompt
+            self.context_cache.invalidate(self.model_name, prefix)
+            status, data = call(None)
+        if status != 200:
+            raise self._error(status, data)
+        response = json.loads(data)
+        usage = response.get("usageMetadata") or {}
+        if self.context_cache is not None:
+            self.context_cache.record_usage(usage.get("cachedContentTokenCount"))
+        return GenerationResult(
+            self._text(response),
+            input_tokens=usage.get("promptTokenCount"),
+            output_tokens=usage.get("candidatesTokenCount")
+        )
+
+    def generate_stream(self, prompt, max_tokens, temperature, timeout=None, source_text=None):
+        lines = self.pool.stream_lines(
+            "POST",
+            f"{self._path}:streamGenerateContent?alt=sse",
+            body=self._body(prompt, max_tokens, temperature),
+            headers=self._headers,
+            timeout=timeout
+        )
+        try:
+            status = int(next(lines))
+            if status != 200:
+                raise self._error(status, b"".join(lines))
+            for line in lines:
+                # Server-sent events: one 'data: <json>' line per response chunk
+                if line.startswith(b"data:"):
+                    text = self._text(json.loads(line[5:]))
+                    if text:
+                        yield text
+        finally:
+            lines.close()
+
+
+class FakeBackend(ModelBackend):
+    """
+    Deterministic local stand-in for benchmarking without network or quota
+
+    Latency is drawn from a configurable distribution around latency_ms:
+    'fixed', 'uniform' (0.5x-1.5x), 'exponential' or 'lognormal' (sigma 0.5,
+    heavy tail). A fraction error_rate of calls fail with error_message.
+    With a response_schema, the fake text fills every field of a JSON object.
+    Streaming splits the latency evenly across stream_chunks chunks. With a
+    seed, the sequence of latencies and failures is reproducible.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 200,
+        distribution: str = "fixed",
+        error_rate: float = 0.0,
+        error_message: str = "503 Service Unavailable (fake backend)",
+        stream_chunks: int = 8,
+        seed: Optional[int] = None,
+        model_name: str = "fake"
+    ):
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.error_message = error_message
+        self.stream_chunks = max(1, stream_chunks)
+        self.model_name = model_name
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self) -> tuple:
+        """Return (latency seconds, should fail) for one call"""
+        mean = self.latency_ms / 1000.0
+        with self._lock:
+            if self.distribution == "uniform":
+                latency = self._random.uniform(0.5 * mean, 1.5 * mean)
+            elif self.distribution == "exponential":
+                latency = self._random.expovariate(1.0 / mean) if mean > 0 else 0.0
+            elif self.distribution == "lognormal":
+                sigma = 0.5
+                latency = self._random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma) if mean > 0 else 0.0
+            else:
+                latency = mean
+            fail = self._random.random() < self.error_rate
+        return latency, fail
+
+    def _text(self, prompt: str, max_tokens: int) -> str:
+        words = max(5, min(max_tokens, 60))
+        return " ".join(["Fake summary of", str(len(prompt)), "prompt characters."] + ["lorem"] * (words - 5))
+
+    def _sleep(self, latency: float, timeout: Optional[float]) -> None:
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("504 Deadline Exceeded (fake backend)")
+        time.sleep(latency)
+
+    def generate(self, prompt, max_tokens, temperature, timeout=None, source_text=None, response_schema=None,
+                 prefix=None):
+        latency, fail = self._draw()
+        self._sleep(latency, timeout)
+        if fail:
+            raise RuntimeError(self.error_message)
+        text = self._text(prompt, max_tokens)
+        if response_schema:
+            text = json.dumps({
+                name: [text] * 3 if spec.get("type") == "ARRAY" else text
+                for name, spec in response_schema.get("properties", {}).items()
+            })
+        return GenerationResult(text, input_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+
+    def generate_stream(self, prompt, max_tokens, temperature, timeout=None, source_text=None):
+        latency, fail = self._draw()
+        words = self._text(prompt, max_tokens).split(" ")
+        per_chunk = max(1, math.ceil(len(words) / self.stream_chunks))
+        chunks = [" ".join(words[i:i + per_chunk]) + " " for i in range(0, len(words), per_chunk)]
+        for index, chunk in enumerate(chunks):
+            time.sleep(latency / len(chunks))
+            if fail and index == len(chunks) // 2:
+                raise RuntimeError(self.error_message)
+            yield chunk
+
+
+class ExtractiveBackend(ModelBackend):
+    """
+    Offline backend that returns the most central sentences of the source
+
+    Sentences are ranked with TF-IDF / TextRank (services.extractive) and
+    returned in document order until max_tokens is reached. It always answers
+    in plain text, so structured (response_schema) callers fall back per output.
+    """
+
+    model_name = "extractive"
+
+    def generate(self, prompt, max_tokens, temperature, timeout=None, source_text=None, response_schema=None,
+                 prefix=None):
+        from services import extractive
+
+        text = source_text or prompt
+        summary = extractive.summarize(text, style="detailed", max_tokens=max_tokens)
+        return GenerationResult(summary, input_tokens=len(text) // 4, output_tokens=len(summary) // 4)
+
+
+def _gemini_backend(model_name: str, http_pool=None, context_cache=None) -> ModelBackend:
+    """A Gemini backend on the shared connection pool, or on the SDK when no pool is given"""
+    if http_pool is None:
+        return GeminiBackend(
+            model_name=model_name,
+            api_key=os.getenv("GEMINI_API_KEY"),
+            context_cache=context_cache
+        )
+    return GeminiRESTBackend(
+        model_name=model_name,
+        pool=http_pool,
+        api_key=os.getenv("GEMINI_API_KEY"),
+        prewarm=int(os.getenv("GEMINI_POOL_PREWARM", "2")),
+        context_cache=context_cache
+    )
+
+
+def create_backend_from_env(http_pool=None, context_cache=None) -> ModelBackend:
+    """
+    Build the backend selected by MODEL_BACKEND
+
+    MODEL_BACKEND: 'gemini' (default), 'fake' or 'extractive'
+    GEMINI_API_KEY / GEMINI_MODEL: Gemini credentials and model
+    GEMINI_POOL_PREWARM: Connections the REST transport opens on warm-up (default 2)
+    FAKE_LATENCY_MS, FAKE_LATENCY_DISTRIBUTION, FAKE_ERROR_RATE, FAKE_ERROR_MESSAGE,
+    FAKE_STREAM_CHUNKS, FAKE_SEED: Fake backend behavior
+    """
+    backend = os.getenv("MODEL_BACKEND", "gemini").lower()
+
+    if backend == "fake":
+        seed = os.getenv("FAKE_SEED")
+        return FakeBackend(
+            latency_ms=float(os.getenv("FAKE_LATENCY_MS", "200")),
+            distribution=os.getenv("FAKE_LATENCY_DISTRIBUTION", "fixed"),
+            error_rate=float(os.getenv("FAKE_ERROR_RATE", "0")),
+            error_message=os.getenv("FAKE_ERROR_MESSAGE", "503 Service Unavailable (fake backend)"),
+            stream_chunks=int(os.getenv("FAKE_STREAM_CHUNKS", "8")),
+            seed=int(seed) if seed else None
+        )
+    if backend == "extractive":
+        return ExtractiveBackend()
+    return _gemini_backend(os.getenv("GEMINI_MODEL"), http_pool, context_cache)
+
+
+def create_backends_from_env(http_pool=None, context_cache=None) -> List[ModelBackend]:
+    """
+    Build the model pool
+
+    GEMINI_MODELS: Comma-separated Gemini models, default first (e.g.
+        'gemini-2.0-flash,gemini-1.5-pro'); when unset, the pool is the single
+        backend from create_backend_from_env()
+
+    Gemini models share http_pool (see services.http_pool) when given, and use
+    the google-generativeai SDK otherwise; on either transport they cache prompt
+    prefixes in context_cache (see services.prompts) when given.
+    """
+    models = [name.strip() for name in os.getenv("GEMINI_MODELS", "").split(",") if name.strip()]
+    if os.getenv("MODEL_BACKEND", "gemini").lower() != "gemini" or not models:
+        return [create_backend_from_env(http_pool, context_cache)]
+    return [_gemini_backend(name, http_pool, context_cache) for name in models]
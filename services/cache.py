@@ -0,0 +1,243 @@
+"""
+Summary Cache
+Content-addressed cache for summarization results with pluggable backends
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from services.shared_state import open_database, shared_state_enabled
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially reformatted inputs share a cache entry"""
+    return " ".join(text.split())
+
+
+def make_cache_key(model_name: str, endpoint: str, text: str, params: dict,
+                   prompts: Optional[str] = None) -> str:
+    """
+    Build a content-addressed cache key
+
+    Args:
+        model_name: Model that produces the result
+        endpoint: Service method name (summaries and key points never collide)
+        text: The input text (normalized before hashing)
+        params: All generation parameters that influence the output
+        prompts: Fingerprint of the active prompt templates, if any
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    key = {
+        "model": model_name,
+        "endpoint": endpoint,
+        "params": params,
+        "text": normalize_text(text),
+    }
+    if prompts:
+        key["prompts"] = prompts
+    payload = json.dumps(key, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Interface for cache backends. Values are JSON-serializable dicts.
+
+    blocking is True for backends whose get/set do disk I/O; callers on the
+    event loop run those in an executor (see shared_state.call_store).
+    """
+
+    blocking = False
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: dict) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryCache(SummaryCache):
+    """In-process LRU cache bounded by entry count, total bytes and TTL"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def set(self, key: str, value: dict) -> None:
+        size = len(key) + len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, dict(value))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class SQLiteCache(SummaryCache):
+    """
+    On-disk cache that survives restarts, bounded by TTL and row count
+
+    The database runs in WAL mode, so several worker processes can share it.
+    Every purge_every writes, expired rows are deleted and the rows closest to
+    expiry (the oldest writes) are trimmed down to max_entries, so a write does
+    not scan the table and the file cannot grow without bound.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = "summary_cache.db", ttl: float = 24 * 3600, max_entries: int = 100000,
+                 purge_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_expires_at ON summaries (expires_at)")
+        self._conn.commit()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge(now)
+            self._conn.commit()
+
+    def _purge(self, now: float) -> None:
+        """Delete expired rows, then the rows closest to expiry beyond max_entries (lock held)"""
+        self._conn.execute("DELETE FROM summaries WHERE expires_at < ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.evictions += self._conn.execute(
+                "DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY expires_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def create_cache_from_env() -> Optional[SummaryCache]:
+    """
+    Build the cache configured by environment variables
+
+    SUMMARY_CACHE_BACKEND: 'memory' (default), 'sqlite' or 'none'; defaults to
+        'sqlite' when SHARED_STATE=sqlite so every worker process sees one cache
+    SUMMARY_CACHE_TTL: Entry lifetime in seconds
+    SUMMARY_CACHE_MAX_ENTRIES: Entry bound (default 1024 in memory, 100000 in SQLite)
+    SUMMARY_CACHE_MAX_BYTES: Memory backend size bound
+    SUMMARY_CACHE_PATH: SQLite database file
+
+    Raises:
+        ValueError: If the memory backend is combined with SHARED_STATE=sqlite
+    """
+    backend = os.getenv("SUMMARY_CACHE_BACKEND", "sqlite" if shared_state_enabled() else "memory").lower()
+    if backend == "memory" and shared_state_enabled():
+        # Cross-process coalescing waits for the leader's result in this cache
+        raise ValueError(
+            "SUMMARY_CACHE_BACKEND=memory cannot be shared between worker processes; "
+            "use 'sqlite' (or 'none') with SHARED_STATE=sqlite"
+        )
+    ttl = float(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+    max_entries = os.getenv("SUMMARY_CACHE_MAX_ENTRIES")
+
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        return SQLiteCache(
+            path=os.getenv("SUMMARY_CACHE_PATH", "summary_cache.db"),
+            ttl=ttl,
+            max_entries=int(max_entries or 100000),
+        )
+    return MemoryCache(
+        max_entries=int(max_entries or 1024),
+        max_bytes=int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        ttl=ttl,
+    )
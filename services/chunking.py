@@ -0,0 +1,98 @@
+"""
+Text Chunking
+Splits long documents into token-budgeted chunks on paragraph and sentence boundaries
+"""
+
+import hashlib
+import re
+from typing import Callable, List
+
+# Sentence ends: terminal punctuation followed by whitespace and an uppercase/quote/digit
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=["\'(\[A-Z0-9])')
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split on blank lines, dropping empty paragraphs"""
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a paragraph into sentences"""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def _split_oversized(piece: str, max_tokens: int, estimate: Callable[[str], int]) -> List[str]:
+    """Break a paragraph that exceeds the budget into sentence groups (words as a last resort)"""
+    units = []
+    for sentence in split_sentences(piece):
+        sentence_tokens = estimate(sentence)
+        if sentence_tokens <= max_tokens:
+            units.append(sentence)
+            continue
+        words = sentence.split()
+        words_per_unit = max(1, max_tokens * len(words) // sentence_tokens)
+        for i in range(0, len(words), words_per_unit):
+            units.append(" ".join(words[i:i + words_per_unit]))
+
+    groups, current = [], []
+    for unit in units:
+        if current and estimate(" ".join(current + [unit])) > max_tokens:
+            groups.append(" ".join(current))
+            current = []
+        current.append(unit)
+    if current:
+        groups.append(" ".join(current))
+    return groups
+
+
+def _is_boundary(paragraph: str, divisor: int) -> bool:
+    digest = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % divisor == 0
+
+
+def split_into_chunks(text: str, max_tokens: int, boundary_divisor: int = 4,
+                      estimate: Callable[[str], int] = estimate_tokens) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens estimated tokens
+
+    Chunk ends are content-defined: once a chunk is at least half full, it
+    closes after any paragraph whose hash hits the boundary condition. An edit
+    therefore only moves the boundaries next to it, and the other chunks keep
+    their exact text (and their cached summaries).
+
+    Args:
+        text: The document
+        max_tokens: Token budget per chunk
+        boundary_divisor: About one paragraph in this many is a boundary candidate
+        estimate: Token count of a string (the service passes its calibrated TokenEstimator)
+
+    Returns:
+        list: Chunk strings, paragraphs joined by blank lines
+    """
+    pieces = []
+    for paragraph in split_paragraphs(text):
+        if estimate(paragraph) > max_tokens:
+            pieces.extend(_split_oversized(paragraph, max_tokens, estimate))
+        else:
+            pieces.append(paragraph)
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        piece_tokens = estimate(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+        if current_tokens >= max_tokens // 2 and _is_boundary(piece, boundary_divisor):
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
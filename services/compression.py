@@ -0,0 +1,301 @@
+"""
+HTTP Compression
+Streaming request decompression with a size cap, and negotiated response compression
+"""
+
+import gzip
+import io
+import json
+import zlib
+from typing import Callable, Dict, Iterator
+
+try:
+    import brotli
+except ImportError:  # Optional: 'br' is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: 'zstd' is only offered when installed
+    zstandard = None
+
+# Largest piece of output produced per decompression step, so the size cap is
+# checked long before a decompression bomb can exhaust memory
+_OUTPUT_STEP = 64 * 1024
+
+
+class DecodeError(Exception):
+    """Raised when a request body is not valid for its Content-Encoding"""
+
+
+class _IdentityDecoder:
+    """Uncompressed body of unknown length (chunked), read through the same size cap"""
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        yield data
+
+    def finish(self) -> Iterator[bytes]:
+        return iter(())
+
+
+class _GzipDecoder:
+    def __init__(self):
+        self._decoder = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            yield self._decoder.decompress(data, _OUTPUT_STEP)
+            data = self._decoder.unconsumed_tail
+
+    def finish(self) -> Iterator[bytes]:
+        yield self._decoder.flush()
+        if not self._decoder.eof:
+            raise DecodeError("truncated gzip body")
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._decoder = brotli.Decompressor()
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        yield self._decoder.process(data, output_buffer_limit=_OUTPUT_STEP)
+        while not self._decoder.can_accept_more_data():
+            yield self._decoder.process(b"", output_buffer_limit=_OUTPUT_STEP)
+
+    def finish(self) -> Iterator[bytes]:
+        while not self._decoder.is_finished():
+            piece = self._decoder.process(b"", output_buffer_limit=_OUTPUT_STEP)
+            if not piece:
+                raise DecodeError("truncated brotli body")
+            yield piece
+
+
+class _ZstdDecoder:
+    """
+    zstd decompression with bounded output per step
+
+    zstandard's decompressobj has no output limit per call (a few input bytes
+    can expand to megabytes), so the compressed input is buffered, counted
+    against the cap like any other body bytes, and decoded at the end through
+    stream_reader, which returns at most _OUTPUT_STEP bytes per read.
+    """
+
+    def __init__(self):
+        self._input = io.BytesIO()
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        self._input.write(data)
+        return iter(())
+
+    def finish(self) -> Iterator[bytes]:
+        data = self._input.getvalue()
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data))
+        while True:
+            piece = reader.read(_OUTPUT_STEP)
+            if not piece:
+                break
+            yield piece
+        # The reader stops quietly at the end of a truncated frame. The output is
+        # known to be within the cap by now, so a one-shot decode can check for it.
+        checker = zstandard.ZstdDecompressor().decompressobj()
+        checker.decompress(data)
+        if not checker.eof:
+            raise DecodeError("truncated zstd body")
+
+
+def _brotli_compress(body: bytes) -> bytes:
+    return brotli.compress(body, quality=4)
+
+
+def _zstd_compress(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+
+DECODERS: Dict[str, Callable] = {"gzip": _GzipDecoder, "x-gzip": _GzipDecoder}
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if zstandard is not None:
+    DECODERS["zstd"] = _ZstdDecoder
+    ENCODERS["zstd"] = _zstd_compress
+if brotli is not None:
+    DECODERS["br"] = _BrotliDecoder
+    ENCODERS["br"] = _brotli_compress
+ENCODERS["gzip"] = lambda body: gzip.compress(body, compresslevel=6)
+
+
+def negotiate(accept_encoding: str) -> str:
+    """
+    Pick the response encoding from an Accept-Encoding header
+
+    Prefers zstd, then br, then gzip among the encodings the client accepts
+    with a non-zero q-value. Returns '' when none is acceptable.
+    """
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    for encoding in ENCODERS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return ""
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware for compressed request and response bodies
+
+    Requests with Content-Encoding gzip, br or zstd are decoded incrementally as
+    the body arrives; decoding stops with 413 once the decoded size exceeds
+    max_body_bytes (so compressed bodies cannot be used as decompression bombs),
+    400 on corrupt data and 415 on unsupported encodings. The bytes received
+    count against the cap as well. Uncompressed bodies declaring a larger
+    Content-Length are rejected with 413 without being read, and those without
+    a Content-Length (chunked) are read through the same cap.
+
+    Complete (non-streaming) responses of at least min_size bytes are
+    compressed with the best encoding the client accepts. Streaming responses
+    such as Server-Sent Events pass through unchanged.
+    """
+
+    def __init__(self, app, max_body_bytes: int = 16 * 1024 * 1024, min_size: int = 1024):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.lower(): value for name, value in scope["headers"]}
+        content_encoding = headers.get(b"content-encoding", b"identity").decode("latin-1").strip().lower()
+
+        identity = content_encoding in ("", "identity")
+        if identity and b"content-length" in headers:
+            if int(headers[b"content-length"] or 0) > self.max_body_bytes:
+                await self._reject(send, 413, f"Request body exceeds {self.max_body_bytes} bytes")
+                return
+        elif not identity or scope.get("method") not in ("GET", "HEAD", "OPTIONS"):
+            # Compressed bodies, and uncompressed ones of unknown length (chunked)
+            decoder_class = _IdentityDecoder if identity else DECODERS.get(content_encoding)
+            if decoder_class is None:
+                await self._reject(send, 415, f"Unsupported Content-Encoding: {content_encoding}")
+                return
+            try:
+                body = await self._decode_body(receive, decoder_class())
+            except DecodeError as e:
+                await self._reject(send, 400, f"Invalid {content_encoding} body: {e}")
+                return
+            if body is None:
+                detail = "Request body" if identity else "Decoded request body"
+                await self._reject(send, 413, f"{detail} exceeds {self.max_body_bytes} bytes")
+                return
+            receive = self._replay(body, receive)
+            scope["headers"] = [
+                (name, value) for name, value in scope["headers"]
+                if name.lower() not in (b"content-encoding", b"content-length", b"transfer-encoding")
+            ] + [(b"content-length", str(len(body)).encode("latin-1"))]
+
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, self._compressing_send(send, encoding))
+
+    async def _decode_body(self, receive, decoder):
+        """Decode the body as it arrives; None when it or its decoded form exceeds max_body_bytes"""
+        parts, size, received = [], 0, 0
+        more_body = True
+        try:
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    raise DecodeError("client disconnected")
+                more_body = message.get("more_body", False)
+                data = message.get("body", b"")
+                received += len(data)
+                if received > self.max_body_bytes:
+                    return None
+                pieces = decoder.feed(data)
+                for piece in pieces:
+                    size += len(piece)
+                    if size > self.max_body_bytes:
+                        return None
+                    parts.append(piece)
+            for piece in decoder.finish():
+                size += len(piece)
+                if size > self.max_body_bytes:
+                    return None
+                parts.append(piece)
+        except DecodeError:
+            raise
+        except Exception as e:
+            raise DecodeError(str(e)) from e
+        return b"".join(parts)
+
+    @staticmethod
+    def _replay(body: bytes, receive):
+        """Deliver the decoded body, then defer to the server for the disconnect"""
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return replay
+
+    def _compressing_send(self, send, encoding: str):
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # Held until the first body message shows whether to compress
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            headers = [(name.lower(), value) for name, value in response_start.get("headers", [])]
+            already_encoded = any(name == b"content-encoding" for name, _ in headers)
+
+            if message.get("more_body", False) or already_encoded or len(body) < self.min_size:
+                await send(response_start)
+                await send(message)
+                return
+
+            compressed = ENCODERS[encoding](body)
+            headers = [(name, value) for name, value in headers if name != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**response_start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        return send_wrapper
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str):
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
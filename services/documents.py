@@ -0,0 +1,235 @@
+"""
+Document Store
+Per-document section summaries for incremental re-summarization of versioned documents
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import List, Optional
+
+from services.cache import normalize_text
+from services.chunking import split_paragraphs
+from services.shared_state import open_database, shared_state_enabled
+
+
+def content_hash(text: str) -> str:
+    """Hash of a paragraph, section or document, insensitive to whitespace changes"""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def paragraph_hashes(text: str) -> List[str]:
+    return [content_hash(paragraph) for paragraph in split_paragraphs(text)]
+
+
+def diff_paragraphs(previous: List[str], current: List[str]) -> dict:
+    """Count paragraphs kept, added and removed between two versions (by hash, order ignored)"""
+    unchanged = sum((Counter(previous) & Counter(current)).values())
+    return {
+        "unchanged": unchanged,
+        "added": len(current) - unchanged,
+        "removed": len(previous) - unchanged,
+    }
+
+
+def _replaces(stored: dict, state: dict) -> bool:
+    """True when state may replace the stored state of the same document"""
+    return stored["version"] < state["version"] or (
+        stored["version"] == state["version"] and stored["text_hash"] == state["text_hash"]
+    )
+
+
+class DocumentStore:
+    """
+    Interface for document state backends
+
+    A state is a JSON-serializable dict holding the latest version of one
+    document: its version number, content and paragraph hashes, the summary of
+    each section by section hash, and the last merged result.
+
+    put is a compare-and-set on the version, so of two concurrent requests for
+    different versions the older can never replace the newer. blocking is True
+    for backends that do disk I/O (see shared_state.call_store).
+    """
+
+    blocking = False
+
+    def get(self, document_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def put(self, document_id: str, state: dict) -> bool:
+        """
+        Store a state unless a newer one is stored
+
+        Replaces the stored state only when it has a lower version, or the same
+        version and text_hash (the same text summarized with other parameters).
+
+        Returns:
+            bool: False when the write was refused because of the stored version
+        """
+        raise NotImplementedError
+
+    def delete(self, document_id: str) -> bool:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryDocumentStore(DocumentStore):
+    """In-process LRU store bounded by document count and total bytes"""
+
+    def __init__(self, max_documents: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self._documents = OrderedDict()  # document id -> (size, JSON-encoded state)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, document_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is None:
+                return None
+            self._documents.move_to_end(document_id)
+            return json.loads(entry[1])
+
+    def put(self, document_id: str, state: dict) -> bool:
+        encoded = json.dumps(state, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is not None and not _replaces(json.loads(entry[1]), state):
+                return False
+            if size > self.max_bytes:
+                return True
+            self._remove(document_id)
+            self._documents[document_id] = (size, encoded)
+            self._bytes += size
+            while len(self._documents) > self.max_documents or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._documents)))
+                self.evictions += 1
+        return True
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock:
+            return self._remove(document_id)
+
+    def _remove(self, document_id: str) -> bool:
+        entry = self._documents.pop(document_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[0]
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "documents": len(self._documents),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """
+    Document states in SQLite, shared by worker processes
+
+    Holds at most max_documents documents; the least recently used are
+    deleted when a new one is stored. The version check of put runs in the
+    same statement as the write, so it holds across processes.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = "shared_state.db", max_documents: int = 1000):
+        self.path = path
+        self.max_documents = max_documents
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id TEXT PRIMARY KEY, state TEXT NOT NULL, used_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        for column, kind in (("version", "INTEGER"), ("text_hash", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {kind}")
+        self._conn.commit()
+
+    def get(self, document_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM documents WHERE id = ?", (document_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE documents SET used_at = ? WHERE id = ?", (time.time(), document_id))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def put(self, document_id: str, state: dict) -> bool:
+        with self._lock:
+            stored = self._conn.execute(
+                "INSERT INTO documents (id, state, used_at, version, text_hash) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET state = excluded.state, used_at = excluded.used_at, "
+                "version = excluded.version, text_hash = excluded.text_hash "
+                "WHERE documents.version IS NULL OR documents.version < excluded.version "
+                "OR (documents.version = excluded.version AND documents.text_hash = excluded.text_hash)",
+                (document_id, json.dumps(state, ensure_ascii=False), time.time(), state["version"], state["text_hash"])
+            ).rowcount
+            if not stored:
+                self._conn.commit()
+                return False
+            evicted = self._conn.execute(
+                "DELETE FROM documents WHERE id NOT IN "
+                "(SELECT id FROM documents ORDER BY used_at DESC LIMIT ?)",
+                (self.max_documents,)
+            ).rowcount
+            self._conn.commit()
+            self.evictions += evicted
+        return True
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM documents WHERE id = ?", (document_id,)).rowcount
+            self._conn.commit()
+        return deleted == 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "documents": documents,
+            "evictions": self.evictions,
+        }
+
+
+def create_document_store_from_env() -> DocumentStore:
+    """
+    Build the document store configured by environment variables
+
+    DOCUMENT_STORE_BACKEND: 'memory' (default) or 'sqlite'; defaults to 'sqlite'
+        when SHARED_STATE=sqlite so every worker process sees each document's state
+    DOCUMENT_STORE_MAX_DOCUMENTS: Documents kept before the least recently used is evicted (default 1000)
+    DOCUMENT_STORE_MAX_BYTES: Memory backend size bound (default 64 MiB)
+    SHARED_STATE_PATH: SQLite database file
+    """
+    backend = os.getenv("DOCUMENT_STORE_BACKEND", "sqlite" if shared_state_enabled() else "memory").lower()
+    max_documents = int(os.getenv("DOCUMENT_STORE_MAX_DOCUMENTS", "1000"))
+    if backend == "sqlite":
+        return SQLiteDocumentStore(
+            path=os.getenv("SHARED_STATE_PATH", "shared_state.db"),
+            max_documents=max_documents
+        )
+    return MemoryDocumentStore(
+        max_documents=max_documents,
+        max_bytes=int(os.getenv("DOCUMENT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+    )
@@ -0,0 +1,182 @@
+"""
+Extractive Summarization
+Local TF-IDF / TextRank sentence ranking, for millisecond summaries without a model call
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, List
+
+from services.chunking import split_paragraphs, split_sentences
+
+# NumPy is imported by the ranking functions on first use, not with this
+# module, so the service starts without it until an extractive summary is made
+if TYPE_CHECKING:
+    import numpy as np
+
+# Reported as the 'model' of extractive results
+MODEL_NAME = "extractive"
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9'-]*")
+
+# Common function words that carry no topical weight
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over
+own same she should so some such than that the their theirs them themselves then there these they
+this those through to too under until up very was we were what when where which while who whom
+why will with would you your yours yourself yourselves
+""".split())
+
+# Sentences in a 'concise' summary and in a 'bullet' summary before max_tokens applies
+STYLE_SENTENCES = {"concise": 3, "bullet": 5, "detailed": None}
+
+# Largest sentence graph ranked in one piece (the similarity matrix is n x n)
+MAX_GRAPH_SENTENCES = 400
+
+
+def tokenize(sentence: str) -> List[str]:
+    """Lowercase content words of a sentence"""
+    return [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+
+
+def tfidf_matrix(sentences: List[str]) -> np.ndarray:
+    """
+    L2-normalized TF-IDF rows, one per sentence
+
+    Term counts are accumulated from (sentence, term) index pairs in a single
+    scatter-add, so the cost is linear in the number of words.
+    """
+    import numpy as np
+
+    vocabulary = {}
+    rows, cols = [], []
+    for row, sentence in enumerate(sentences):
+        for word in tokenize(sentence):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    counts = np.zeros((len(sentences), max(1, len(vocabulary))), dtype=np.float32)
+    if rows:
+        np.add.at(counts, (np.array(rows), np.array(cols)), 1.0)
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1.0 + len(sentences)) / (1.0 + document_frequency)) + 1.0
+    weights = np.log1p(counts) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.where(norms == 0, 1.0, norms)
+
+
+def textrank(sentences: List[str], damping: float = 0.85, iterations: int = 50, tolerance: float = 1e-6) -> np.ndarray:
+    """
+    Score sentences by PageRank over their cosine-similarity graph
+
+    Returns:
+        np.ndarray: One score per sentence (higher is more central)
+    """
+    import numpy as np
+
+    count = len(sentences)
+    if count <= 2:
+        return np.ones(count)
+
+    vectors = tfidf_matrix(sentences)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / count), where=out_weight > 0)
+
+    scores = np.full(count, 1.0 / count)
+    for _ in range(iterations):
+        updated = (1 - damping) / count + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def _sentences(text: str) -> List[str]:
+    return [s for paragraph in split_paragraphs(text) for s in split_sentences(" ".join(paragraph.split()))]
+
+
+def _candidates(sentences: List[str]) -> List[int]:
+    """
+    Indices of the sentences to rank together
+
+    The similarity graph is quadratic in sentences, so long documents are ranked
+    in blocks of MAX_GRAPH_SENTENCES and only each block's best sentences go on
+    to the next round, until one graph fits.
+    """
+    import numpy as np
+
+    candidates = list(range(len(sentences)))
+    keep = MAX_GRAPH_SENTENCES // 8
+    while len(candidates) > MAX_GRAPH_SENTENCES:
+        survivors = []
+        for start in range(0, len(candidates), MAX_GRAPH_SENTENCES):
+            block = candidates[start:start + MAX_GRAPH_SENTENCES]
+            scores = textrank([sentences[i] for i in block])
+            survivors.extend(block[i] for i in sorted(np.argsort(-scores, kind="stable")[:keep]))
+        candidates = survivors
+    return candidates
+
+
+def select_sentences(text: str, limit=None, max_chars=None) -> List[str]:
+    """
+    The top-ranked sentences of text, in document order
+
+    Args:
+        text: Source document
+        limit: Maximum number of sentences (None for no limit)
+        max_chars: Character budget; the top sentence is always kept
+
+    Returns:
+        list: Selected sentences
+    """
+    import numpy as np
+
+    sentences = _sentences(text)
+    if not sentences:
+        return []
+
+    candidates = _candidates(sentences)
+    scores = textrank([sentences[i] for i in candidates])
+    chosen, used = [], 0
+    for position in np.argsort(-scores, kind="stable"):
+        if limit is not None and len(chosen) >= limit:
+            break
+        index = candidates[position]
+        length = len(sentences[index])
+        if chosen and max_chars is not None and used + length > max_chars:
+            continue
+        chosen.append(index)
+        used += length
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def summarize(text: str, style: str = "concise", max_tokens: int = 150) -> str:
+    """
+    Extractive summary in one of the API styles
+
+    Args:
+        text: The text to summarize
+        style: 'concise' (top 3 sentences), 'detailed' (as many as fit) or
+            'bullet' (top 5 sentences as a bullet list)
+        max_tokens: Length budget, at roughly 4 characters per token
+
+    Returns:
+        str: The summary
+    """
+    selected = select_sentences(text, limit=STYLE_SENTENCES.get(style), max_chars=max_tokens * 4)
+    if style == "bullet":
+        return "\n".join(f"- {sentence}" for sentence in selected)
+    return " ".join(selected)
+
+
+def key_points(text: str, num_points: int = 5) -> str:
+    """The num_points most central sentences as a numbered list, in document order"""
+    selected = select_sentences(text, limit=num_points)
+    return "\n".join(f"{i}. {sentence}" for i, sentence in enumerate(selected, 1))
@@ -0,0 +1,242 @@
+"""
+HTTP Connection Pool
+Bounded pool of persistent keep-alive connections to one upstream origin
+"""
+
+import http.client
+import os
+import threading
+import time
+from collections import deque
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Errors meaning a kept-alive connection was closed by the server while idle;
+# the request never reached it and is safe to send again on a new connection
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free before the request's timeout"""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent HTTP/1.1 connections to a single origin
+
+    At most max_connections connections are open at once; requests beyond that
+    wait for one to be returned. Returned connections are kept alive and reused
+    most-recently-used first (the connection most likely still open), and are
+    closed once idle for idle_timeout seconds. prewarm() opens connections ahead
+    of traffic so the first requests skip TCP and TLS handshakes.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 8, idle_timeout: float = 60.0,
+                 connect_timeout: float = 10.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+
+        self._idle = deque()  # (connection, returned_at), most recently returned last
+        self._open = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+        self.created = 0
+        self.reused = 0
+        self.expired = 0
+        self.stale_retries = 0
+        self.waits = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self.connect_timeout)
+        connection.connect()
+        return connection
+
+    def _checkout(self, timeout: Optional[float]) -> Tuple[http.client.HTTPConnection, bool]:
+        """Take an idle connection or open a new one; returns (connection, reused)"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    connection, returned_at = self._idle.pop()
+                    if now - returned_at <= self.idle_timeout:
+                        self._in_use += 1
+                        self.reused += 1
+                        return connection, True
+                    connection.close()
+                    self._open -= 1
+                    self.expired += 1
+                if self._open < self.max_connections:
+                    self._open += 1
+                    self._in_use += 1
+                    break
+                remaining = deadline - now if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout(f"504 No upstream connection free within {timeout:g}s")
+                self.waits += 1
+                self._condition.wait(remaining)
+
+        try:
+            connection = self._connect()
+        except BaseException:
+            self._release(None)
+            raise
+        with self._condition:
+            self.created += 1
+        return connection, False
+
+    def _release(self, connection: Optional[http.client.HTTPConnection]) -> None:
+        """Return a connection for reuse, or discard it when None"""
+        with self._condition:
+            self._in_use -= 1
+            if connection is not None:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._open -= 1
+            self._condition.notify()
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: dict,
+              timeout: Optional[float]) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a request, retrying once on a fresh connection when a reused one turns out stale"""
+        for attempt in range(2):
+            connection, reused = self._checkout(timeout)
+            try:
+                connection.sock.settimeout(timeout if timeout is not None else self.connect_timeout)
+                connection.request(method, path, body=body, headers=headers)
+                return connection, connection.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                connection.close()
+                self._release(None)
+                if not reused or attempt:
+                    raise
+                with self._condition:
+                    self.stale_retries += 1
+            except BaseException:
+                connection.close()
+                self._release(None)
+                raise
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None, headers: Optional[dict] = None,
+                timeout: Optional[float] = None) -> Tuple[int, bytes]:
+        """
+        Send one request on a pooled connection
+
+        Args:
+            timeout: Seconds to wait for a free connection and for each socket read
+
+        Returns:
+            tuple: (status code, response body)
+        """
+        connection, response = self._send(method, path, body, headers or {}, timeout)
+        try:
+            data = response.read()
+        except BaseException:
+            connection.close()
+            self._release(None)
+            raise
+        self._release(None if response.will_close else connection)
+        return response.status, data
+
+    def stream_lines(self, method: str, path: str, body: Optional[bytes] = None,
+                     headers: Optional[dict] = None, timeout: Optional[float] = None) -> Iterator[bytes]:
+        """
+        Send one request and yield the response body line by line
+
+        The first item is the status code as bytes. The connection returns to
+        the pool only if the body was read to the end; a stream abandoned early
+        closes its connection.
+        """
+        connection, response = self._send(method, path, body, headers or {}, timeout)
+        completed = False
+        try:
+            yield str(response.status).encode("ascii")
+            for line in iter(response.readline, b""):
+                yield line
+            completed = True
+        finally:
+            if completed and not response.will_close:
+                self._release(connection)
+            else:
+                connection.close()
+                self._release(None)
+
+    def prewarm(self, count: int) -> int:
+        """Open up to count idle connections ahead of traffic; returns how many were opened"""
+        opened = []
+        try:
+            for _ in range(count):
+                with self._condition:
+                    if self._open >= self.max_connections or len(self._idle) + len(opened) >= count:
+                        break
+                    self._open += 1
+                    self._in_use += 1
+                try:
+                    connection = self._connect()
+                except BaseException:
+                    self._release(None)
+                    raise
+                with self._condition:
+                    self.created += 1
+                opened.append(connection)
+        finally:
+            for connection in opened:
+                self._release(connection)
+        return len(opened)
+
+    def close(self) -> None:
+        """Close every idle connection"""
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                connection.close()
+                self._open -= 1
+
+    def stats(self) -> dict:
+        """Occupancy, and how many requests reused a connection versus opened one"""
+        with self._condition:
+            requests = self.created + self.reused
+            return {
+                "max_connections": self.max_connections,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "reuse_rate": round(self.reused / requests, 4) if requests else 0.0,
+                "expired": self.expired,
+                "stale_retries": self.stale_retries,
+                "waits": self.waits,
+            }
+
+
+def create_connection_pool_from_env(default_size: int = 8) -> Optional[ConnectionPool]:
+    """
+    Build the pool Gemini calls share, or None when they go through the SDK
+
+    GEMINI_TRANSPORT: 'sdk' (default; google-generativeai with its own transport) or
+        'rest' (opt-in; REST API on this pool); only applies to MODEL_BACKEND=gemini
+    GEMINI_API_BASE: Upstream origin (default https://generativelanguage.googleapis.com);
+        point it at a local stand-in such as gemini_stub_server.py for testing
+    GEMINI_POOL_SIZE: Maximum open connections (default: the upstream concurrency)
+    GEMINI_POOL_IDLE_TIMEOUT: Seconds an unused connection is kept alive (default 60)
+    GEMINI_CONNECT_TIMEOUT: TCP/TLS connect timeout in seconds (default 10)
+    """
+    if os.getenv("MODEL_BACKEND", "gemini").lower() != "gemini":
+        return None
+    if os.getenv("GEMINI_TRANSPORT", "sdk").lower() != "rest":
+        return None
+    return ConnectionPool(
+        os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com"),
+        max_connections=int(os.getenv("GEMINI_POOL_SIZE", str(default_size))),
+        idle_timeout=float(os.getenv("GEMINI_POOL_IDLE_TIMEOUT", "60")),
+        connect_timeout=float(os.getenv("GEMINI_CONNECT_TIMEOUT", "10"))
+    )
@@ -0,0 +1,395 @@
+"""
+Job Queue
+SQLite-backed queue with an in-app worker pool for long-running summarizations
+"""
+
+import asyncio
+import http.client
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Collection, Optional
+from urllib.parse import urlsplit
+
+from services.shared_state import open_database
+
+
+class TransientJobError(Exception):
+    """Raised by a job handler to request a retry with backoff"""
+
+
+class JobDeferred(Exception):
+    """Raised by a job handler to put the job back in the queue without using up an attempt"""
+
+    def __init__(self, retry_after: float, reason: str = "deferred"):
+        self.retry_after = retry_after
+        super().__init__(f"Job deferred ({reason}): retry after {retry_after:.0f}s")
+
+
+def _public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    return ip.is_global and not ip.is_multicast
+
+
+def check_callback_url(url: str, allowed_hosts: Optional[Collection[str]] = None) -> None:
+    """
+    Check a webhook URL before a job is accepted
+
+    Only http and https are allowed. With allowed_hosts, the host must be one of
+    them; without, a literal IP address must be public (host names are checked
+    against the addresses they resolve to when the webhook is sent).
+
+    Raises:
+        ValueError: If the server must not post to the URL
+    """
+    try:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port
+    except ValueError as e:
+        raise ValueError(f"Invalid callback URL: {e}") from None
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("Callback URL must be an absolute http or https URL")
+    if allowed_hosts:
+        if host.lower() not in allowed_hosts:
+            raise ValueError(f"Callback host {host} is not allowed")
+        return
+    try:
+        public = _public_address(host)
+    except ValueError:
+        return
+    if not public:
+        raise ValueError(f"Callback host {host} is not a public address")
+
+
+class JobQueue:
+    """
+    Persistent priority queue of summarization jobs
+
+    Jobs are rows in SQLite, so queued work survives restarts. Workers claim the
+    oldest job of the most urgent priority; 'interactive' always runs before
+    'batch'. A handler raising TransientJobError is retried with exponential
+    backoff up to max_attempts; one raising JobDeferred (the server is shedding
+    load) is re-queued after its retry_after without using up an attempt, so
+    queued work waits out an overload instead of failing. Finished jobs
+    optionally POST to a webhook.
+    Claims are atomic row updates, so worker processes can share one database.
+
+    A claimed job is leased to its queue instance (owner) for `lease` seconds,
+    and the lease is renewed while the handler runs. Only jobs whose lease has
+    lapsed (their worker process died) are claimed again, so a worker starting
+    next to live siblings never re-runs their jobs; a lost job counts as an
+    attempt. Database calls run in the default executor, off the event loop.
+
+    Webhooks go only to callback_allowed_hosts when it is set, and otherwise
+    only to public addresses: the host is resolved once, every address checked,
+    and the POST sent to the checked address, so a caller cannot point the
+    server at internal services. Redirects are not followed.
+    """
+
+    PRIORITIES = {"interactive": 0, "batch": 1}
+
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable[dict]],
+        path: str = "jobs.db",
+        workers: int = 2,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        retention: float = 24 * 3600,
+        lease: float = 60.0,
+        callback_allowed_hosts: Optional[Collection[str]] = None
+    ):
+        self.handler = handler
+        self.path = path
+        self.num_workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lease = lease
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.callback_allowed_hosts = {host.lower() for host in callback_allowed_hosts or ()}
+
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, payload TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "result TEXT, error TEXT, callback_url TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, available_at, created_at)"
+        )
+        self._conn.commit()
+
+        self._workers = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.deferred = 0
+
+    async def _call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    async def submit(self, payload: dict, priority: str = "batch", callback_url: Optional[str] = None) -> dict:
+        """
+        Enqueue a job
+
+        Args:
+            payload: JSON-serializable input passed to the handler
+            priority: 'interactive' or 'batch'
+            callback_url: Optional URL that receives the finished job as a JSON POST
+
+        Returns:
+            dict: The job record
+
+        Raises:
+            ValueError: If callback_url is not an allowed webhook (see check_callback_url)
+        """
+        if callback_url:
+            check_callback_url(callback_url, self.callback_allowed_hosts)
+        job_id = uuid.uuid4().hex
+        await self._call(self._insert, job_id, payload, priority, callback_url)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return await self.get(job_id)
+
+    def _insert(self, job_id: str, payload: dict, priority: str, callback_url: Optional[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, payload, priority, status, callback_url, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), self.PRIORITIES[priority], callback_url, now, now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (now - self.retention,)
+            )
+            self._conn.commit()
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Return the job record, or None if it does not exist"""
+        return await self._call(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, priority, status, attempts, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        priority_names = {v: k for k, v in self.PRIORITIES.items()}
+        return {
+            "id": row[0],
+            "priority": priority_names[row[1]],
+            "status": row[2],
+            "attempts": row[3],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
+
+    def stats(self) -> dict:
+        """Queue depth by status and priority, plus worker counters (blocking; one indexed query)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, priority, COUNT(*) FROM jobs GROUP BY status, priority"
+            ).fetchall()
+        priority_names = {v: k for k, v in self.PRIORITIES.items()}
+        depth = {name: 0 for name in self.PRIORITIES}
+        by_status = {}
+        for status, priority, count in rows:
+            by_status[status] = by_status.get(status, 0) + count
+            if status == "queued":
+                depth[priority_names[priority]] += count
+        return {
+            "queue_depth": sum(depth.values()),
+            "queued_by_priority": depth,
+            "by_status": by_status,
+            "workers": self.num_workers,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "deferred": self.deferred,
+        }
+
+    async def start(self) -> None:
+        """Start the workers; jobs of a process that died are reclaimed once their lease lapses"""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers and re-queue the jobs they were running"""
+        self._stopping = True  # wait_for can swallow a cancellation that races a wakeup
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self._call(self._requeue_own)
+
+    def _requeue_own(self) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE status = 'running' AND owner = ?",
+                (time.time(), self.owner)
+            )
+            self._conn.commit()
+
+    def _claim(self) -> Optional[tuple]:
+        """Lease the next ready job: queued and due, or running under a lapsed lease"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, payload, attempts, callback_url FROM jobs "
+                "WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)) "
+                "ORDER BY priority, created_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, lease_expires_at = ?, "
+                "updated_at = ? WHERE id = ? AND attempts = ? AND (status = 'queued' OR "
+                "(status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)))",
+                (self.owner, now + self.lease, now, row[0], row[2], now)
+            ).rowcount
+            self._conn.commit()
+        if not claimed:
+            return None
+        return row[0], json.loads(row[1]), row[2] + 1, row[3]
+
+    def _renew(self, job_id: str) -> bool:
+        """Extend the lease of a job this queue runs; False when it was lost to another worker"""
+        now = time.time()
+        with self._lock:
+            renewed = self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                (now + self.lease, job_id, self.owner)
+            ).rowcount
+            self._conn.commit()
+        return renewed == 1
+
+    def _finish(self, job_id: str, status: str, result: Optional[dict] = None,
+                error: Optional[str] = None, retry_at: Optional[float] = None, refund: bool = False) -> bool:
+        """
+        Record the outcome of a job this queue runs; False when it no longer holds the job
+
+        With refund, the attempt just made is not counted.
+        """
+        now = time.time()
+        with self._lock:
+            finished = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, available_at = ?, "
+                "attempts = attempts - ?, owner = NULL, lease_expires_at = NULL "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, now,
+                 retry_at if retry_at is not None else now, int(refund), job_id, self.owner)
+            ).rowcount
+            self._conn.commit()
+        return finished == 1
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            job = await self._call(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._execute(*job)
+
+    async def _keep_leased(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            if not await self._call(self._renew, job_id):
+                return
+
+    async def _execute(self, job_id: str, payload: dict, attempts: int, callback_url: Optional[str]) -> None:
+        if attempts > self.max_attempts:
+            # Lost by workers that died while running it; do not try it again
+            if await self._call(self._finish, job_id, "failed", None, "Job was interrupted too many times"):
+                self.failed += 1
+            return
+
+        renewal = asyncio.create_task(self._keep_leased(job_id))
+        status, result, error, retry_at, refund = "succeeded", None, None, None, False
+        try:
+            result = await self.handler(payload)
+        except JobDeferred as e:
+            status, error, retry_at, refund = "queued", str(e), time.time() + e.retry_after, True
+        except TransientJobError as e:
+            status, error = "failed", str(e)
+            if attempts < self.max_attempts:
+                status, retry_at = "queued", time.time() + 2 ** attempts
+        except Exception as e:
+            status, error = "failed", str(e)
+        finally:
+            renewal.cancel()
+
+        if not await self._call(self._finish, job_id, status, result, error, retry_at, refund):
+            return  # The lease lapsed and another worker took the job over
+        if refund:
+            self.deferred += 1
+            return
+        if status == "queued":
+            self.retried += 1
+            return
+        if status == "failed":
+            self.failed += 1
+        else:
+            self.succeeded += 1
+
+        if callback_url:
+            await self._notify(callback_url, await self.get(job_id))
+
+    def _post(self, url: str, body: bytes) -> None:
+        """POST body to url, connecting only to an address that passed the webhook checks"""
+        check_callback_url(url, self.callback_allowed_hosts)
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = [info[4][0] for info in socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)]
+        if not self.callback_allowed_hosts and not all(_public_address(address) for address in addresses):
+            raise ValueError(f"Callback host {parts.hostname} resolves to a non-public address")
+
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(parts.hostname, port, timeout=10)
+        # Connect to the checked address (TLS still verifies the host name), so a
+        # second DNS answer cannot redirect the request
+        connection._create_connection = lambda address, timeout, source_address: socket.create_connection(
+            (addresses[0], port), timeout, source_address
+        )
+        try:
+            path = parts.path or "/"
+            connection.request("POST", path + (f"?{parts.query}" if parts.query else ""), body=body,
+                               headers={"Content-Type": "application/json"})
+            connection.getresponse().read(65536)
+        finally:
+            connection.close()
+
+    async def _notify(self, url: str, job: dict) -> None:
+        """Best-effort webhook delivery; failures never affect the job"""
+        try:
+            body = json.dumps(job).encode("utf-8")
+            await asyncio.get_running_loop().run_in_executor(None, self._post, url, body)
+        except Exception:
+            pass
@@ -0,0 +1,222 @@
+"""
+Metrics
+Minimal Prometheus-style metrics registry, stage timers and ASGI instrumentation
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Latency buckets in seconds, from cache hits to slow upstream calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    """Label value with backslash, double quote and newline escaped, as the text format requires"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._values: Dict[Tuple, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, entry in self._values.items():
+                for i, bound in enumerate(self.buckets):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {entry[i]}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {entry[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {entry[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds metrics and scrape-time collectors
+
+    A collector is a function returning (name, help, {label tuple: value})
+    gauge families; it is called on every scrape, so component stats
+    (cache, queue, limiter) are always current without extra bookkeeping.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], list]] = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        metric = Gauge(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], list]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        for collector in self._collectors:
+            for name, help_text, values in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in values.items():
+                    lines.append(f"{name}{_format_labels(tuple(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route, method and status"
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served")
+REQUEST_LATENCY = REGISTRY.histogram(
+    "summarizer_request_duration_seconds", "Service call latency by endpoint, style and cache outcome"
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "summarizer_stage_duration_seconds", "Time spent per stage (prompt, upstream, serialization)"
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "gemini_request_duration_seconds", "Latency of individual upstream model calls by endpoint and model"
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "gemini_errors_total", "Failed upstream calls by endpoint, exception class and model"
+)
+REQUEST_ERRORS = REGISTRY.counter(
+    "summarizer_errors_total", "Failed service calls by endpoint and error type"
+)
+INPUT_CHARS = REGISTRY.counter("summarizer_input_characters_total", "Input characters by endpoint")
+OUTPUT_CHARS = REGISTRY.counter("summarizer_output_characters_total", "Output characters by endpoint")
+INPUT_TOKENS = REGISTRY.counter("summarizer_input_tokens_total", "Prompt tokens sent upstream by endpoint")
+OUTPUT_TOKENS = REGISTRY.counter("summarizer_output_tokens_total", "Tokens generated upstream by endpoint")
+DOCUMENT_SECTIONS = REGISTRY.counter(
+    "summarizer_document_sections_total", "Versioned document sections reused from the previous version or summarized"
+)
+MULTI_OUTPUT_FALLBACKS = REGISTRY.counter(
+    "summarizer_multi_output_fallbacks_total", "Multi-output sections regenerated separately after failing validation"
+)
+
+
+@contextmanager
+def time_stage(endpoint: str, stage: str):
+    """Record the duration of a block as a stage of an endpoint"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, stage=stage)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight count for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                route=route.path if route is not None else "unmatched",
+                method=scope["method"],
+                status=status
+            )
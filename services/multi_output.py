@@ -0,0 +1,91 @@
+"""
+Multi-Output Summaries
+One prompt and JSON response schema producing several summary styles of the same text
+"""
+
+import json
+import re
+from typing import Dict, List, Tuple
+
+# Output name -> instruction for its section of the JSON response
+OUTPUTS = {
+    "concise": "a brief, concise summary in 2-3 sentences",
+    "detailed": "a comprehensive summary with key details and context",
+    "bullet": "the main points as a list of short bullet items",
+    "key_points": "exactly {num_points} key points, most important first",
+}
+
+# Sections returned as JSON arrays of strings; the others are plain strings
+LIST_OUTPUTS = frozenset({"bullet", "key_points"})
+
+_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+_ITEM_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def response_schema(outputs: List[str]) -> dict:
+    """JSON response schema (Gemini's OpenAPI subset) with one required property per output"""
+    properties = {
+        name: {"type": "ARRAY", "items": {"type": "STRING"}} if name in LIST_OUTPUTS else {"type": "STRING"}
+        for name in outputs
+    }
+    return {"type": "OBJECT", "properties": properties, "required": list(outputs)}
+
+
+def build_prompt(text: str, outputs: List[str], num_points: int) -> str:
+    """Ask for every requested output in a single JSON object"""
+    sections = "\n".join(
+        f'- "{name}": {OUTPUTS[name].format(num_points=num_points)}' for name in outputs
+    )
+    return (
+        "Read the following text once and respond with a single JSON object "
+        f"with these fields:\n{sections}\n\nText:\n\n{text}"
+    )
+
+
+def _items(value) -> List[str]:
+    """Non-empty list items, with any bullet or number markers the model added removed"""
+    if isinstance(value, str):
+        value = value.splitlines()
+    if not isinstance(value, list):
+        return []
+    items = [_ITEM_MARKER.sub("", item).strip() for item in value if isinstance(item, str)]
+    return [item for item in items if item]
+
+
+def parse_sections(raw: str, outputs: List[str], num_points: int) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Parse and validate a multi-output response
+
+    Summaries must be non-empty strings; bullet and key point sections must
+    hold at least one non-empty item, and are formatted like the single-style
+    endpoints ('- ' bullets, a numbered list of at most num_points points).
+
+    Returns:
+        tuple: (valid sections by output name, names of missing or invalid outputs)
+    """
+    text = raw.strip()
+    fenced = _FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return {}, list(outputs)
+
+    sections, invalid = {}, []
+    for name in outputs:
+        value = data.get(name)
+        if name == "key_points":
+            items = _items(value)[:num_points]
+            formatted = "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+        elif name == "bullet":
+            formatted = "\n".join(f"- {item}" for item in _items(value))
+        else:
+            formatted = value.strip() if isinstance(value, str) else ""
+        if formatted:
+            sections[name] = formatted
+        else:
+            invalid.append(name)
+    return sections, invalid
@@ -0,0 +1,229 @@
+"""
+Near-Duplicate Index
+MinHash signatures with locality-sensitive hashing, to reuse summaries of almost identical inputs
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Hashable, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+# Mersenne prime for the universal hash family; with a, b < 2**31 and 32-bit x,
+# a * x stays below 2**63, so a * x + b cannot overflow uint64
+_PRIME = (1 << 31) - 1
+
+# Shingles hashed per block, bounding the (num_perm x block) intermediate array
+_BLOCK = 4096
+
+
+class Sketch:
+    """MinHash signature of one text, plus its shingle hashes for exact verification"""
+
+    def __init__(self, signature: np.ndarray, shingles: np.ndarray):
+        self.signature = signature
+        self.shingles = shingles
+
+
+class NearDuplicateIndex:
+    """
+    Bounded LSH index from text sketches to stored results
+
+    Texts are reduced to word 5-gram shingles and a num_perm MinHash signature,
+    split into bands. Two texts sharing any band land in the same bucket and
+    become candidates; the candidate with the highest estimated Jaccard
+    similarity at or above threshold is a match. Entries are only compared
+    within the same scope (model, endpoint and generation parameters).
+
+    The index holds at most max_entries entries and about max_bytes of
+    signatures, shingles, bucket keys and serialized results, evicting the least
+    recently used entries past either bound. A verify_rate fraction of entries also keeps its shingles, so hits on
+    them are checked against the exact Jaccard similarity to estimate the
+    false-match rate.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        verify_rate: float = 0.05,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.verify_rate = verify_rate
+
+        # NumPy is imported only once an index is built, keeping it off startup when disabled
+        import numpy as np
+
+        generator = np.random.default_rng(seed)
+        self._prime = np.uint64(_PRIME)
+        self._a = generator.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = generator.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # id -> (scope, band keys, signature, shingles, result, size)
+        self._buckets = {}  # band key -> set of entry ids
+        self._next_id = 0
+        self._bytes = 0
+
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self.verified_hits = 0
+        self.false_matches = 0
+
+    def _shingles(self, text: str) -> np.ndarray:
+        import numpy as np
+
+        words = _WORD.findall(text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {
+            zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+            for i in range(max(1, len(words) - size + 1))
+        }
+        return np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+
+    def sketch(self, text: str) -> Sketch:
+        """Shingle and MinHash a text (CPU-bound; run large texts off the event loop)"""
+        import numpy as np
+
+        shingles = self._shingles(text)
+        signature = np.full(self.num_perm, self._prime, dtype=np.uint64)
+        for start in range(0, len(shingles), _BLOCK):
+            block = shingles[start:start + _BLOCK]
+            hashed = (self._a * block[np.newaxis, :] + self._b) % self._prime
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return Sketch(signature, np.sort(shingles).astype(np.uint32))
+
+    def _band_keys(self, scope: Hashable, signature: np.ndarray) -> list:
+        scope_digest = hashlib.blake2b(repr(scope).encode("utf-8"), digest_size=8).digest()
+        return [
+            scope_digest + bytes([band]) + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def lookup(self, sketch: Sketch, scope: Hashable) -> Optional[tuple]:
+        """
+        Find the most similar stored entry in scope
+
+        Returns:
+            tuple: (stored result, estimated Jaccard similarity), or None
+        """
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for key in self._band_keys(scope, sketch.signature):
+                candidates |= self._buckets.get(key, set())
+
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                similarity = float((self._entries[entry_id][2] == sketch.signature).mean())
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None or best_similarity < self.threshold:
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            _, _, _, stored_shingles, result, _ = self._entries[best_id]
+            if stored_shingles is not None:
+                self.verified_hits += 1
+                if self._exact_jaccard(stored_shingles, sketch.shingles) < self.threshold:
+                    self.false_matches += 1
+            return dict(result), best_similarity
+
+    @staticmethod
+    def _exact_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+        import numpy as np
+
+        intersection = len(np.intersect1d(a, b, assume_unique=True))
+        union = len(a) + len(b) - intersection
+        return intersection / union if union else 1.0
+
+    def add(self, sketch: Sketch, scope: Hashable, result: dict) -> None:
+        """Store a result under a text's sketch, evicting the least recently used entry when full"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            keys = self._band_keys(scope, sketch.signature)
+            verify = (entry_id * 2654435761 % 2 ** 32) / 2 ** 32 < self.verify_rate
+            shingles = sketch.shingles if verify else None
+            size = (
+                sketch.signature.nbytes + (shingles.nbytes if shingles is not None else 0)
+                + sum(len(key) for key in keys) + len(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+            )
+            self._entries[entry_id] = (scope, keys, sketch.signature, shingles, dict(result), size)
+            self._bytes += size
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries or (self._bytes > self.max_bytes and len(self._entries) > 1):
+                old_id, (_, old_keys, _, _, _, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                for key in old_keys:
+                    bucket = self._buckets.get(key)
+                    if bucket is not None:
+                        bucket.discard(old_id)
+                        if not bucket:
+                            del self._buckets[key]
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Hit rate, size and sampled false-match rate"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                "evictions": self.evictions,
+                "verified_hits": self.verified_hits,
+                "false_matches": self.false_matches,
+                "false_match_rate": round(self.false_matches / self.verified_hits, 4) if self.verified_hits else 0.0,
+            }
+
+
+def create_near_duplicate_index_from_env() -> Optional[NearDuplicateIndex]:
+    """
+    Build the near-duplicate index configured by environment variables
+
+    NEAR_DUPLICATE_CACHE: 'true' to enable (default 'false')
+    NEAR_DUPLICATE_THRESHOLD: Minimum Jaccard similarity to reuse a summary (default 0.9)
+    NEAR_DUPLICATE_MAX_ENTRIES: Index size bound (default 10000)
+    NEAR_DUPLICATE_MAX_BYTES: Index memory bound (default 64 MiB)
+    NEAR_DUPLICATE_VERIFY_RATE: Fraction of entries checked for false matches (default 0.05)
+    """
+    if os.getenv("NEAR_DUPLICATE_CACHE", "false").lower() != "true":
+        return None
+    return NearDuplicateIndex(
+        threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9")),
+        max_entries=int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "10000")),
+        max_bytes=int(os.getenv("NEAR_DUPLICATE_MAX_BYTES", str(64 * 1024 * 1024))),
+        verify_rate=float(os.getenv("NEAR_DUPLICATE_VERIFY_RATE", "0.05"))
+    )
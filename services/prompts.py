@@ -0,0 +1,228 @@
+"""
+Prompt Templates
+Versioned prompt templates loaded once at startup, and the registry of upstream
+context caches holding their shared prefixes
+"""
+
+import hashlib
+import json
+import os
+import string
+import threading
+import time
+from typing import Dict, Optional
+
+# Placeholders each template may use
+TEMPLATE_FIELDS = {
+    "summary.concise": {"text"},
+    "summary.detailed": {"text"},
+    "summary.bullet": {"text"},
+    "context": {"text", "context"},
+    "key_points": {"text", "num_points"},
+    "chunk": {"text"},
+}
+
+# Built-in templates (version 'v1'), identical to the prompts the service has always sent
+DEFAULT_TEMPLATES = {
+    "summary.concise": {"prefix": "Provide a brief, concise summary in 2-3 sentences.\n\n"
+                                  "Summarize the following text:\n\n", "body": "{text}"},
+    "summary.detailed": {"prefix": "Provide a comprehensive summary with key details and context.\n\n"
+                                   "Summarize the following text:\n\n", "body": "{text}"},
+    "summary.bullet": {"prefix": "Summarize the main points in bullet point format.\n\n"
+                                 "Summarize the following text:\n\n", "body": "{text}"},
+    "context": {"body": "Summarize the following text for: {context}\n\n{text}"},
+    "key_points": {"body": "Extract exactly {num_points} key points from the following text. "
+                           "Format as a numbered list.\n\n{text}"},
+    "chunk": {"prefix": "Summarize this section of a longer document. Keep the key facts, "
+                        "names, figures and conclusions.\n\n", "body": "{text}"},
+}
+
+
+class PromptTemplate:
+    """
+    One version of a prompt: a static prefix followed by a per-call body
+
+    The prefix (instructions and few-shot examples) is the same for every call,
+    so backends can cache it upstream; the body is a str.format template over
+    the request's values. Placeholders are checked when the template is built.
+    """
+
+    def __init__(self, name: str, version: str, body: str, prefix: str = "", examples: Optional[list] = None):
+        allowed = TEMPLATE_FIELDS.get(name)
+        if allowed is None:
+            raise ValueError(f"Unknown prompt template: {name}")
+        fields = {field for _, field, _, _ in string.Formatter().parse(body) if field is not None}
+        if not fields <= allowed:
+            raise ValueError(f"Prompt template {name}@{version} uses unknown fields {sorted(fields - allowed)}")
+
+        for index, example in enumerate(examples or [], start=1):
+            prefix += f"Example {index}:\nText: {example['input']}\nOutput: {example['output']}\n\n"
+        self.name = name
+        self.version = version
+        self.prefix = prefix
+        self.body = body
+
+    def render(self, **values) -> str:
+        """The full prompt: prefix, then the body filled with values"""
+        return self.prefix + self.body.format(**values)
+
+
+class PromptRegistry:
+    """
+    Every version of every template, and the version each endpoint uses
+
+    Built-in 'v1' templates are always present. A JSON file maps template names
+    to versions to {'prefix', 'examples', 'body'}; PROMPT_VERSIONS selects one
+    version per template. fingerprint hashes the name, version and text of
+    every active template and is part of result cache keys, so changing a
+    template, even without a new version, never serves results produced with
+    the previous one.
+    """
+
+    def __init__(self, templates: Optional[dict] = None, versions: Optional[Dict[str, str]] = None):
+        self._templates = {
+            name: {"v1": PromptTemplate(name, "v1", **spec)} for name, spec in DEFAULT_TEMPLATES.items()
+        }
+        for name, by_version in (templates or {}).items():
+            for version, spec in by_version.items():
+                self._templates.setdefault(name, {})[version] = PromptTemplate(name, version, **spec)
+
+        self.active = {name: "v1" for name in self._templates}
+        for name, version in (versions or {}).items():
+            if version not in self._templates.get(name, {}):
+                raise ValueError(f"Prompt template {name}@{version} is not defined")
+            self.active[name] = version
+
+        active = sorted(
+            (name, version, self.get(name).prefix, self.get(name).body) for name, version in self.active.items()
+        )
+        self.fingerprint = hashlib.sha256(json.dumps(active, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+    def get(self, name: str) -> PromptTemplate:
+        """The active version of a template"""
+        return self._templates[name][self.active[name]]
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self._templates),
+            "versions": sum(len(by_version) for by_version in self._templates.values()),
+            "active": dict(self.active),
+        }
+
+
+def create_prompt_registry_from_env() -> PromptRegistry:
+    """
+    Load the prompt templates configured by environment variables
+
+    PROMPT_TEMPLATES_PATH: JSON file of extra template versions, e.g.
+        {"summary.detailed": {"v2": {"prefix": "...", "examples": [{"input": "...", "output": "..."}],
+        "body": "{text}"}}}
+    PROMPT_VERSIONS: Active versions, e.g. 'summary.detailed=v2,key_points=v2' (default v1 everywhere)
+    """
+    templates = {}
+    path = os.getenv("PROMPT_TEMPLATES_PATH")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            templates = json.load(f)
+    versions = dict(
+        item.strip().split("=", 1) for item in os.getenv("PROMPT_VERSIONS", "").split(",") if item.strip()
+    )
+    return PromptRegistry(templates, {name.strip(): version.strip() for name, version in versions.items()})
+
+
+class ContextCache:
+    """
+    Names of upstream cached contents holding prompt prefixes, per model
+
+    A prefix is worth caching only when it reaches min_tokens (Gemini rejects
+    smaller caches). Entries are used until shortly before their TTL runs out;
+    a prefix whose cache could not be created is not retried until the TTL has
+    passed. Only one thread creates a given cache; others send the full prompt
+    meanwhile.
+    """
+
+    def __init__(self, ttl: float = 600, min_tokens: int = 4096, chars_per_token: float = 4.0):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.chars_per_token = chars_per_token
+        self._entries = {}  # (model, prefix hash) -> (cache name or None, expires_at)
+        self._creating = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.created = 0
+        self.failures = 0
+        self.cached_tokens = 0
+
+    @staticmethod
+    def _key(model: str, prefix: str) -> tuple:
+        return model, hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    def lookup(self, model: str, prefix: str) -> tuple:
+        """
+        Find the cache for a prefix
+
+        Returns:
+            tuple: (cache name or None, True when the caller should create it)
+        """
+        if len(prefix) / self.chars_per_token < self.min_tokens:
+            return None, False
+        key = self._key(model, prefix)
+        now = time.time()
+        with self._lock:
+            name, expires_at = self._entries.get(key, (None, 0.0))
+            if expires_at - min(60.0, self.ttl / 10) > now:
+                if name is not None:
+                    self.hits += 1
+                return name, False
+            if key in self._creating:
+                return None, False
+            self._creating.add(key)
+            return None, True
+
+    def store(self, model: str, prefix: str, name: Optional[str]) -> None:
+        """Record a created cache, or a failed creation (name None)"""
+        key = self._key(model, prefix)
+        with self._lock:
+            self._creating.discard(key)
+            self._entries[key] = (name, time.time() + self.ttl)
+            if name is None:
+                self.failures += 1
+            else:
+                self.created += 1
+
+    def invalidate(self, model: str, prefix: str) -> None:
+        """Forget a cache the upstream no longer knows"""
+        with self._lock:
+            self._entries.pop(self._key(model, prefix), None)
+
+    def record_usage(self, cached_tokens: Optional[int]) -> None:
+        if cached_tokens:
+            with self._lock:
+                self.cached_tokens += cached_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.time()
+            return {
+                "entries": sum(1 for name, expires_at in self._entries.values() if name and expires_at > now),
+                "hits": self.hits,
+                "created": self.created,
+                "failures": self.failures,
+                "cached_input_tokens": self.cached_tokens,
+            }
+
+
+def create_context_cache_from_env() -> Optional[ContextCache]:
+    """
+    Build the context cache registry, or None when GEMINI_CONTEXT_CACHE=false
+
+    GEMINI_CONTEXT_CACHE_TTL: Seconds a cached prefix lives upstream (default 600)
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: Smallest prefix worth caching (default 4096)
+    """
+    if os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() != "true":
+        return None
+    return ContextCache(
+        ttl=float(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "600")),
+        min_tokens=int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "4096")),
+        chars_per_token=float(os.getenv("TOKEN_CHARS_PER_TOKEN", "4"))
+    )
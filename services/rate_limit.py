@@ -0,0 +1,175 @@
+"""
+Rate Limiting
+Token buckets for the Gemini quota and AIMD adaptive concurrency
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Optional
+
+from services.retry import error_status
+
+
+def is_rate_limit_error(error) -> bool:
+    """Return True when an exception signals throttling: RateLimitExceeded or an upstream 429 (RESOURCE_EXHAUSTED)"""
+    return isinstance(error, RateLimitExceeded) or error_status(error) == 429
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot be admitted before its deadline"""
+
+    status = 429
+
+    def __init__(self, retry_after: float, reason: str = "rate limit"):
+        self.retry_after = max(1.0, retry_after)
+        super().__init__(f"Rate limit exceeded (429, {reason}): retry after {self.retry_after:.0f}s")
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at per_minute / 60 per second
+
+    reserve() lets the balance go negative, so concurrent callers queue up in
+    arrival order: each one waits until the bucket has refilled past its share.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount could be taken"""
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits shared by every call"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.throttled = 0
+        self.rejected = 0
+
+    async def acquire(self, tokens: int, timeout: float) -> None:
+        """
+        Reserve one request and `tokens` tokens, waiting at most `timeout` seconds
+
+        Raises:
+            RateLimitExceeded: If the reservation would wait past the timeout
+        """
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        if wait > timeout:
+            self.rejected += 1
+            raise RateLimitExceeded(retry_after=wait, reason="quota")
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        if wait > 0:
+            self.throttled += 1
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        self.requests._refill()
+        self.tokens._refill()
+        return {
+            "requests_available": round(self.requests.tokens, 2),
+            "tokens_available": round(self.tokens.tokens),
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit for upstream calls
+
+    Each success raises the limit by 1/limit (about +1 per round of calls);
+    each throttling response halves it. Callers over the limit queue and give
+    up with RateLimitExceeded when their deadline passes.
+
+    The queue is weighted-fair across flows (tenants): each waiter is tagged
+    with its flow's virtual finish time, last tag + 1/weight, and the smallest
+    tag is served first. A flow with weight 2 gets twice the slots of a flow
+    with weight 1 while both are queued, and a flow that queues a burst cannot
+    delay other flows' waiters by more than their share. Within a flow, and
+    with a single flow, the order is FIFO.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._waiters = []  # heap of (virtual finish tag, arrival, future)
+        self._arrivals = itertools.count()
+        self._virtual_time = 0.0
+        self._finish_tags = {}  # flow -> tag of its last queued waiter
+        self.backoffs = 0
+
+    def _queued(self) -> bool:
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters)
+
+    async def acquire(self, timeout: float, flow: Optional[str] = None, weight: float = 1.0) -> None:
+        if self.in_flight < int(self.limit) and not self._queued():
+            self.in_flight += 1
+            return
+
+        tag = max(self._virtual_time, self._finish_tags.get(flow, 0.0)) + 1.0 / weight
+        self._finish_tags[flow] = tag
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (tag, next(self._arrivals), waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted as we gave up; hand it to the next caller
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise RateLimitExceeded(retry_after=1.0, reason="concurrency") from None
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            tag, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self._virtual_time = tag
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        self.limit = max(self.minimum, self.limit / 2)
+        self.backoffs += 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for _, _, waiter in self._waiters if not waiter.done()),
+            "backoffs": self.backoffs,
+        }
@@ -0,0 +1,168 @@
+"""
+Retry Policy
+Jittered exponential backoff, hedged requests and per-call deadlines for upstream calls
+"""
+
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+# HTTP statuses of temporary upstream conditions worth retrying
+TRANSIENT_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+# An HTTP status leading an error message, as in "503 UNAVAILABLE: ..." (SDK and REST errors)
+_LEADING_STATUS = re.compile(r"^\s*([1-5]\d\d)\b")
+
+
+def error_status(error) -> Optional[int]:
+    """
+    HTTP status of an upstream error, or None when it has none
+
+    Read from the exception's status (GenerationError, RateLimitExceeded,
+    DeadlineExceeded) or code attribute (google.api_core errors), else from a
+    status leading the message. Digits elsewhere in the text never count.
+    """
+    for attribute in ("status", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int) and 100 <= value <= 599:
+            return value
+    match = _LEADING_STATUS.match(str(error))
+    return int(match.group(1)) if match else None
+
+
+def is_transient_error(error) -> bool:
+    """Return True for a retryable upstream failure: a timeout, a dropped connection or a 408/429/5xx status"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, DeadlineExceeded)):
+        return True
+    return error_status(error) in TRANSIENT_STATUSES
+
+
+def backoff_delay(retry: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**retry)]"""
+    return random.uniform(0, min(cap, base * (2 ** retry)))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call does not succeed within its deadline"""
+
+    status = 504
+
+    def __init__(self, deadline: float, attempts: int, last_error: Optional[Exception] = None):
+        self.deadline = deadline
+        self.attempts = attempts
+        detail = f" (last error: {last_error})" if last_error else ""
+        super().__init__(f"Deadline of {deadline:g}s exceeded after {attempts} attempt(s){detail}")
+
+
+class LatencyTracker:
+    """Rolling window of call latencies for percentile estimates"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile q (0-1), or None until min_samples are recorded"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def call_with_retries(
+    attempt: Callable[[float], Awaitable],
+    deadline: float,
+    max_attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    hedge_after: Optional[float] = None,
+    is_retryable: Callable[[Exception], bool] = is_transient_error
+) -> tuple:
+    """
+    Run an upstream call with a deadline, retries and optional hedging
+
+    Args:
+        attempt: Coroutine function taking the remaining seconds, making one call
+        deadline: Total seconds allowed across all attempts and backoff sleeps
+        max_attempts: Sequential tries; a hedge does not count as a new try
+        base_delay: First backoff ceiling in seconds
+        max_delay: Backoff ceiling cap in seconds
+        hedge_after: If set, a second concurrent call starts when the first has
+            not finished after this many seconds; the first result to arrive wins
+        is_retryable: Decides whether an error is worth another try
+
+    Returns:
+        tuple: (result, attempts) where attempts counts every upstream call made
+
+    Raises:
+        DeadlineExceeded: If the deadline passes first
+        Exception: The last error, when it is not retryable or tries run out.
+            Its 'attempts' attribute holds the number of calls made.
+    """
+    started = time.monotonic()
+    attempts = 0
+    last_error = None
+
+    def remaining() -> float:
+        return deadline - (time.monotonic() - started)
+
+    async def launch():
+        nonlocal attempts
+        attempts += 1
+        return await attempt(remaining())
+
+    async def hedged():
+        tasks = [asyncio.ensure_future(launch())]
+        try:
+            if hedge_after is not None and hedge_after < remaining():
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    tasks.append(asyncio.ensure_future(launch()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    for retry in range(max_attempts):
+        if remaining() <= 0:
+            break
+        # Not wait_for: its TimeoutError is the same class as an upstream
+        # timeout (Python 3.11+), which must be retried like any transient error
+        call = asyncio.ensure_future(hedged())
+        try:
+            done, _ = await asyncio.wait({call}, timeout=remaining())
+        except BaseException:
+            call.cancel()
+            raise
+        if not done:
+            call.cancel()
+            await asyncio.gather(call, return_exceptions=True)
+            break
+        try:
+            return call.result(), attempts
+        except Exception as e:
+            last_error = e
+            if not is_retryable(e) or retry == max_attempts - 1:
+                e.attempts = attempts
+                raise
+            delay = backoff_delay(retry, base_delay, max_delay)
+            if delay >= remaining():
+                break
+            await asyncio.sleep(delay)
+
+    raise DeadlineExceeded(deadline, attempts, last_error)
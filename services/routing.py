@@ -0,0 +1,110 @@
+"""
+Model Routing
+Picks which model of the pool serves a request, and in which order to fail over
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+from services.backends import ModelBackend
+from services.retry import LatencyTracker
+
+
+class ModelRouter:
+    """
+    Routes requests across a pool of model backends
+
+    The first backend is the default. 'detailed' summaries go to detailed_model
+    and inputs above long_input_tokens go to long_input_model (by default both
+    are the last, largest model of the pool). Every other model follows as a
+    failover candidate in pool order. A model whose observed p95 latency is
+    above latency_slo seconds is moved behind the models that meet it.
+    """
+
+    def __init__(
+        self,
+        backends: List[ModelBackend],
+        detailed_model: Optional[str] = None,
+        long_input_model: Optional[str] = None,
+        long_input_tokens: int = 30000,
+        latency_slo: Optional[float] = None
+    ):
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        self.backends = list(backends)
+        self.detailed_model = detailed_model or self.backends[-1].model_name
+        self.long_input_model = long_input_model or self.backends[-1].model_name
+        self.long_input_tokens = long_input_tokens
+        self.latency_slo = latency_slo
+
+        self._lock = threading.Lock()
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.failovers: Dict[str, int] = {}
+        self.served: Dict[str, int] = {}
+
+    @property
+    def name(self) -> str:
+        """Identity of the pool (part of cache keys)"""
+        return "+".join(backend.model_name for backend in self.backends)
+
+    @property
+    def primary(self) -> ModelBackend:
+        return self.backends[0]
+
+    def candidates(self, style: Optional[str] = None, input_tokens: int = 0) -> List[ModelBackend]:
+        """Backends to try for a request, preferred first"""
+        if style == "detailed":
+            preferred = self.detailed_model
+        elif input_tokens > self.long_input_tokens:
+            preferred = self.long_input_model
+        else:
+            preferred = self.primary.model_name
+
+        ordered = sorted(self.backends, key=lambda backend: backend.model_name != preferred)
+        if self.latency_slo is not None and len(ordered) > 1:
+            ordered.sort(key=self._over_slo)
+        return ordered
+
+    def _over_slo(self, backend: ModelBackend) -> bool:
+        tracker = self._latency.get(backend.model_name)
+        p95 = tracker.percentile(0.95) if tracker is not None else None
+        return p95 is not None and p95 > self.latency_slo
+
+    def record(self, model: str, seconds: Optional[float] = None, error: bool = False) -> None:
+        """Record one upstream call to a model"""
+        with self._lock:
+            self.calls[model] = self.calls.get(model, 0) + 1
+            if error:
+                self.errors[model] = self.errors.get(model, 0) + 1
+            elif seconds is not None:
+                self._latency.setdefault(model, LatencyTracker()).record(seconds)
+
+    def record_failover(self, model: str) -> None:
+        """Count a request moving on from model to the next candidate"""
+        with self._lock:
+            self.failovers[model] = self.failovers.get(model, 0) + 1
+
+    def record_served(self, model: str) -> None:
+        with self._lock:
+            self.served[model] = self.served.get(model, 0) + 1
+
+    def stats(self) -> dict:
+        """Per-model calls, errors, failovers, requests served and latency percentiles"""
+        with self._lock:
+            p50, p95 = {}, {}
+            for model, tracker in self._latency.items():
+                for quantile, target in ((0.5, p50), (0.95, p95)):
+                    value = tracker.percentile(quantile)
+                    if value is not None:
+                        target[model] = round(value, 4)
+            return {
+                "pool": [backend.model_name for backend in self.backends],
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "failovers": dict(self.failovers),
+                "served": dict(self.served),
+                "latency_p50_seconds": p50,
+                "latency_p95_seconds": p95,
+            }
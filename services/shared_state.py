@@ -0,0 +1,245 @@
+"""
+Shared State
+SQLite (WAL mode) backed rate limits and request coalescing shared by worker processes
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Optional, Tuple
+
+from services.rate_limit import RateLimitExceeded
+from services.singleflight import SingleFlight
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database for use by several processes at once
+
+    WAL mode lets readers proceed while one process writes; busy_timeout makes
+    writers wait for the lock instead of failing with 'database is locked'.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+async def call_store(blocking: bool, function: Callable, *args):
+    """
+    Call a store method from the event loop
+
+    Methods of stores backed by SQLite (blocking True) wait on disk and on
+    other processes' write locks, so they run in the default executor; memory
+    stores are called directly.
+    """
+    if blocking:
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+    return function(*args)
+
+
+def shared_state_enabled() -> bool:
+    """True when SHARED_STATE=sqlite (set automatically when running several workers)"""
+    return os.getenv("SHARED_STATE", "none").lower() == "sqlite"
+
+
+class SharedRateLimiter:
+    """
+    RPM and TPM token buckets stored in SQLite, shared by every process
+
+    Same admission rule as RateLimiter: a reservation may take a bucket below
+    zero and then waits for the refill, so callers queue in arrival order across
+    processes. Buckets refill by wall-clock time, which all processes share.
+    """
+
+    def __init__(self, path: str, requests_per_minute: float, tokens_per_minute: float):
+        self.path = path
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.throttled = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.isolation_level = None  # Explicit BEGIN IMMEDIATE transactions
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        now = time.time()
+        for name, per_minute in self.limits.items():
+            self._conn.execute(
+                "INSERT OR IGNORE INTO rate_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (name, per_minute, now)
+            )
+
+    def _levels(self, now: float) -> dict:
+        """Current bucket balances, refilled up to now (call inside a transaction)"""
+        levels = {}
+        for name, tokens, updated in self._conn.execute("SELECT name, tokens, updated FROM rate_buckets"):
+            if name in self.limits:
+                per_minute = self.limits[name]
+                levels[name] = min(per_minute, tokens + max(0.0, now - updated) * per_minute / 60.0)
+        return levels
+
+    def _reserve(self, tokens: int, timeout: float) -> float:
+        """Atomically reserve across processes; returns the wait or raises RateLimitExceeded"""
+        wanted = {"requests": 1, "tokens": tokens}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = self._levels(now)
+                wait = max(
+                    max(0.0, (wanted[name] - levels[name]) / (self.limits[name] / 60.0))
+                    for name in levels
+                )
+                if wait > timeout:
+                    self._conn.execute("ROLLBACK")
+                    self.rejected += 1
+                    raise RateLimitExceeded(retry_after=wait, reason="quota")
+                for name, level in levels.items():
+                    self._conn.execute(
+                        "UPDATE rate_buckets SET tokens = ?, updated = ? WHERE name = ?",
+                        (level - wanted[name], now, name)
+                    )
+                self._conn.execute("COMMIT")
+            except RateLimitExceeded:
+                raise
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def acquire(self, tokens: int, timeout: float) -> None:
+        """
+        Reserve one request and `tokens` tokens, waiting at most `timeout` seconds
+
+        Raises:
+            RateLimitExceeded: If the reservation would wait past the timeout
+        """
+        wait = await asyncio.get_running_loop().run_in_executor(None, self._reserve, tokens, timeout)
+        if wait > 0:
+            self.throttled += 1
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            levels = self._levels(time.time())
+        return {
+            "requests_available": round(levels.get("requests", 0.0), 2),
+            "tokens_available": round(levels.get("tokens", 0.0)),
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
+
+
+class SharedSingleFlight:
+    """
+    Request coalescing across processes
+
+    Within a process, identical calls share one task (SingleFlight). Across
+    processes, the first to insert a lease row for the key runs the call and
+    renews the lease every lease / 3 seconds while it runs; the others poll
+    `lookup` (the shared cache) for its result, backing off from poll_interval
+    to max_poll_interval, until the lease is released or lapses. They then look
+    up the result once more and only run the call when it is still missing (e.g.
+    the owner failed, since failures are not cached) and they win the new claim;
+    waiters that lose it go back to waiting. `lookup` must read a store every
+    process shares. Database calls and lookups run in the default executor.
+    """
+
+    def __init__(self, path: str, lookup: Optional[Callable[[str], Optional[dict]]],
+                 lease: float = 60.0, poll_interval: float = 0.05, max_poll_interval: float = 0.5):
+        self.lookup = lookup
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.owner = str(os.getpid())
+        self.remote_coalesced = 0
+        self._local = SingleFlight()
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS inflight (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _claim(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM inflight WHERE key = ? AND expires_at < ?", (key, now))
+            claimed = self._conn.execute(
+                "INSERT OR IGNORE INTO inflight (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.lease)
+            ).rowcount
+            self._conn.commit()
+        return claimed == 1
+
+    def _renew(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE inflight SET expires_at = ? WHERE key = ? AND owner = ?",
+                (time.time() + self.lease, key, self.owner)
+            )
+            self._conn.commit()
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM inflight WHERE key = ? AND owner = ?", (key, self.owner))
+            self._conn.commit()
+
+    def _held(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM inflight WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    async def _keep_leased(self, key: str) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await loop.run_in_executor(None, self._renew, key)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Run fn once per key among concurrent callers in every process (see SingleFlight.do)"""
+        loop = asyncio.get_running_loop()
+        remote = False
+
+        async def across_processes():
+            nonlocal remote
+            if self.lookup is None:
+                return await fn()
+            interval = self.poll_interval
+            while not await loop.run_in_executor(None, self._claim, key):
+                while await loop.run_in_executor(None, self._held, key):
+                    await asyncio.sleep(interval)
+                    interval = min(self.max_poll_interval, interval * 2)
+                    result = await loop.run_in_executor(None, self.lookup, key)
+                    if result is not None:
+                        break
+                else:
+                    # The owner may have stored its result just before releasing the lease
+                    result = await loop.run_in_executor(None, self.lookup, key)
+                if result is not None:
+                    remote = True
+                    self.remote_coalesced += 1
+                    return result
+                # Released without a result (the owner failed) or lost the claim to another waiter
+            renewal = asyncio.create_task(self._keep_leased(key))
+            try:
+                return await fn()
+            finally:
+                renewal.cancel()
+                await loop.run_in_executor(None, self._release, key)
+
+        result, shared = await self._local.do(key, across_processes)
+        return result, shared or remote
+
+    def stats(self) -> dict:
+        stats = self._local.stats()
+        with self._lock:
+            stats["in_flight_all_processes"] = self._conn.execute("SELECT COUNT(*) FROM inflight").fetchone()[0]
+        stats["remote_coalesced"] = self.remote_coalesced
+        return stats
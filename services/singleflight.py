@@ -0,0 +1,61 @@
+"""
+Single-flight Request Coalescing
+Identical concurrent calls share one upstream execution
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key
+
+    The first caller for a key starts the work as a task; later callers with the
+    same key await that task instead of starting their own. Every waiter awaits
+    through asyncio.shield, so a cancelled client only stops waiting and never
+    cancels the shared call for the others. Exceptions raised by the work are
+    re-raised to every waiter.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """
+        Run fn once per key among concurrent callers
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine function doing the work
+
+        Returns:
+            tuple: (result, shared) where shared is True when another caller's
+            in-flight call produced the result
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.started += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
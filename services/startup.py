@@ -0,0 +1,83 @@
+"""
+Startup Profiling
+Phase timings of process startup, and per-module import times for cold-start tuning
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+
+
+class StartupProfile:
+    """
+    Durations of the startup phases of this process
+
+    PROFILE is created when main.py first imports this module, so marks such as
+    'ready' count from the start of the application import. Every value is in
+    seconds, keyed '<name>_seconds'.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.warmup = {}
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block as a named startup phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._seconds[f"{name}_seconds"] = round(time.perf_counter() - started, 4)
+
+    def mark(self, name: str) -> None:
+        """Record the time elapsed since the start of the import under name"""
+        with self._lock:
+            self._seconds[f"{name}_seconds"] = round(time.perf_counter() - self.started, 4)
+
+    def stats(self) -> dict:
+        """Phase durations, plus warm-up seconds (or error) per model"""
+        with self._lock:
+            return {**self._seconds, "warmup_by_model": dict(self.warmup)}
+
+
+# Process-wide profile. `python main.py` imports main twice (as __main__, then as
+# 'main' through uvicorn), and both copies must report into the same profile.
+PROFILE = StartupProfile()
+
+
+def import_times(module: str = "main", top: int = 15, env: dict = None) -> List[dict]:
+    """
+    Import `module` in a fresh interpreter with -X importtime
+
+    Returns:
+        list: The `top` slowest modules as dicts with 'module', 'self_ms' and
+        'cumulative_ms' (which includes the module's own imports), slowest first
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2),
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
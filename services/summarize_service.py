@@ -3,31 +3,699 @@ Text Summarization Service using Google Gemini API
 This service provides various summarization methods with different approaches
 """
 
-import google.generativeai as genai
-from typing import Literal
+from typing import List, Literal, Optional
+import asyncio
+import functools
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from services.backends import ModelBackend, create_backends_from_env
+from services.cache import create_cache_from_env, make_cache_key
+from services.chunking import split_into_chunks
+from services.documents import content_hash, create_document_store_from_env, diff_paragraphs, paragraph_hashes
+from services.http_pool import create_connection_pool_from_env
+from services.near_duplicate import create_near_duplicate_index_from_env
+from services.prompts import create_context_cache_from_env, create_prompt_registry_from_env
+from services.rate_limit import (
+    AdaptiveConcurrency,
+    RateLimiter,
+    RateLimitExceeded,
+    is_rate_limit_error,
+)
+from services.retry import DeadlineExceeded, LatencyTracker, call_with_retries, is_transient_error
+from services.routing import ModelRouter
+from services.shared_state import SharedRateLimiter, SharedSingleFlight, call_store, shared_state_enabled
+from services.singleflight import SingleFlight
+from services.tenants import create_tenant_registry_from_env, current_tenant
+from services.tokens import ContextExceeded, TokenEstimator
+from services import extractive, metrics, multi_output
 
 # Load environment variables
 load_dotenv()
 
+# Output budget of each partial summary in long-document modes
+CHUNK_SUMMARY_TOKENS = 256
+
 
 class SummarizeService:
     """Service for summarizing text using Google Gemini models"""
     
-    def __init__(self):
-        """Initialize the Gemini client with API key from environment"""
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        model_name = os.getenv("GEMINI_MODEL")
-        self.model = genai.GenerativeModel(model_name)
-        self.model_name = model_name
+    def __init__(self, backend: Optional[ModelBackend] = None, backends: Optional[List[ModelBackend]] = None):
+        """
+        Initialize the model pool (MODEL_BACKEND / GEMINI_MODELS from environment unless given)
+        
+        Args:
+            backend: Explicit single backend, e.g. a FakeBackend for benchmarks
+            backends: Explicit model pool, default model first
+        """
+        # With GEMINI_TRANSPORT=rest, Gemini calls share one bounded pool of
+        # keep-alive connections (GEMINI_POOL_SIZE, GEMINI_POOL_IDLE_TIMEOUT), opened
+        # ahead of traffic on warm-up; None on the default SDK transport
+        self.max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        self.http_pool = None
+        if backends is None and backend is None:
+            self.http_pool = create_connection_pool_from_env(default_size=self.max_concurrency)
+        
+        # Prompts come from versioned templates loaded once (PROMPT_TEMPLATES_PATH,
+        # PROMPT_VERSIONS). With Gemini, on either transport, template prefixes
+        # large enough to qualify are kept in context caches and sent once.
+        self.prompts = create_prompt_registry_from_env()
+        self.context_cache = None
+        if backends is None and backend is None and os.getenv("MODEL_BACKEND", "gemini").lower() == "gemini":
+            self.context_cache = create_context_cache_from_env()
+        
+        if backends is None:
+            backends = [backend] if backend is not None else create_backends_from_env(
+                self.http_pool, self.context_cache
+            )
+        
+        # Requests are routed across the pool by style, input length and latency
+        # SLO; a rate-limited, failing or slow model fails over to the next one.
+        # The preferred model gets one try of at most MODEL_FAILOVER_AFTER_SECONDS
+        # (default half the endpoint deadline) before the request moves on.
+        latency_slo = os.getenv("MODEL_LATENCY_SLO_SECONDS")
+        self.router = ModelRouter(
+            backends,
+            detailed_model=os.getenv("ROUTE_DETAILED_MODEL"),
+            long_input_model=os.getenv("ROUTE_LONG_INPUT_MODEL"),
+            long_input_tokens=int(os.getenv("ROUTE_LONG_INPUT_TOKENS", "30000")),
+            latency_slo=float(latency_slo) if latency_slo else None
+        )
+        failover_after = os.getenv("MODEL_FAILOVER_AFTER_SECONDS")
+        self.failover_after = float(failover_after) if failover_after else None
+        
+        # Backend calls block, so upstream calls run on a bounded thread pool
+        # instead of the event loop. GEMINI_MAX_CONCURRENCY caps in-flight calls.
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="gemini"
+        )
+        
+        # Content-addressed result cache (None when SUMMARY_CACHE_BACKEND=none)
+        self.cache = create_cache_from_env()
+        
+        # Near-identical inputs (MinHash/LSH) reuse an earlier summary; None when disabled
+        self.near_duplicates = create_near_duplicate_index_from_env()
+        
+        # With several worker processes (SHARED_STATE=sqlite), request coalescing and
+        # the quota buckets live in SQLite so limits stay global; the cache is then
+        # SQLite by default too (see create_cache_from_env)
+        self.shared_state = shared_state_enabled()
+        shared_path = os.getenv("SHARED_STATE_PATH", "shared_state.db")
+        
+        # Identical requests already in flight share one upstream call
+        if self.shared_state:
+            self._inflight = SharedSingleFlight(
+                shared_path,
+                lookup=self.cache.get if self.cache is not None else None
+            )
+        else:
+            self._inflight = SingleFlight()
+        
+        # Client-side quota: RPM/TPM token buckets plus AIMD concurrency that backs
+        # off on 429s. Calls that cannot be admitted within RATE_LIMIT_MAX_WAIT fail
+        # fast with RateLimitExceeded instead of queueing forever.
+        limiter_class = functools.partial(SharedRateLimiter, shared_path) if self.shared_state else RateLimiter
+        self.rate_limiter = limiter_class(
+            requests_per_minute=float(os.getenv("GEMINI_RPM", "60")),
+            tokens_per_minute=float(os.getenv("GEMINI_TPM", "1000000"))
+        )
+        self.concurrency = AdaptiveConcurrency(
+            initial=self.max_concurrency,
+            maximum=self.max_concurrency
+        )
+        self.rate_limit_max_wait = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))
+        
+        # Callers are tenants (TENANTS_PATH) with their own request and token
+        # quotas, charged per upstream call; queued calls get concurrency slots
+        # weighted-fair across tenants so a batch client cannot starve others
+        self.tenants = create_tenant_registry_from_env()
+        
+        # Per-endpoint deadlines (seconds, covering all retries), jittered
+        # exponential backoff for transient errors, and optional hedging: a second
+        # call fires once the first exceeds the endpoint's observed p95 latency.
+        default_deadline = os.getenv("GEMINI_DEADLINE_SECONDS", "30")
+        self.deadlines = {
+            "summarize_text": float(os.getenv("DEADLINE_SUMMARIZE_SECONDS", default_deadline)),
+            "summarize_chunk": float(os.getenv("DEADLINE_SUMMARIZE_SECONDS", default_deadline)),
+            "summarize_with_context": float(os.getenv("DEADLINE_CONTEXT_SECONDS", default_deadline)),
+            "extract_key_points": float(os.getenv("DEADLINE_KEYPOINTS_SECONDS", default_deadline)),
+            "summarize_multi": float(os.getenv("DEADLINE_SUMMARIZE_SECONDS", default_deadline)),
+        }
+        self.max_attempts = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+        self.retry_base_delay = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+        self.retry_max_delay = float(os.getenv("RETRY_MAX_DELAY", "8"))
+        self.hedge_requests = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+        self._latency = {endpoint: LatencyTracker() for endpoint in self.deadlines}
+        
+        # Local token estimates, calibrated from reported usage, plan every prompt
+        # against the model's context window before any network call
+        self.tokens = TokenEstimator(chars_per_token=float(os.getenv("TOKEN_CHARS_PER_TOKEN", "4")))
+        self.context_tokens = int(os.getenv("MODEL_CONTEXT_TOKENS", "1048576"))
+        
+        # Hierarchical (map-reduce) summarization for long documents
+        self.chunk_tokens = int(os.getenv("CHUNK_TOKENS", "3000"))
+        self.chunk_fan_out = int(os.getenv("CHUNK_FAN_OUT", "4"))
+        self.hierarchical_threshold = int(os.getenv("HIERARCHICAL_THRESHOLD_TOKENS", "8000"))
+        self.max_reduce_levels = int(os.getenv("MAX_REDUCE_LEVELS", "3"))
+        
+        # Versioned documents keep their section summaries, so an edit only
+        # re-summarizes the sections it touched (bounded, LRU-evicted)
+        self.documents = create_document_store_from_env()
+        
+        # Serve a local extractive result when the model is unavailable
+        # (throttled, timing out or erroring transiently) instead of failing
+        self.extractive_fallback = os.getenv("EXTRACTIVE_FALLBACK", "false").lower() == "true"
+    
+    @property
+    def backend(self) -> ModelBackend:
+        """The default model of the pool"""
+        return self.router.primary
+    
+    @backend.setter
+    def backend(self, backend: ModelBackend) -> None:
+        """Replace the whole pool with a single backend (benchmarks and tests)"""
+        self.router = ModelRouter([backend])
+    
+    @property
+    def model_name(self) -> str:
+        """Identity of the model pool, part of every cache key"""
+        return self.router.name
+    
+    async def _run(self, endpoint: str, text: str, params: dict, compute) -> dict:
+        """
+        Serve a result from the cache, an identical in-flight call, or compute it
+        
+        Args:
+            endpoint: Service method name, part of the cache key
+            text: The input text
+            params: Every parameter that influences the output
+            compute: Coroutine function producing the result dict
+            
+        Returns:
+            dict: The result with 'cache' ('hit', 'miss' or 'disabled') and,
+            for non-hits, 'coalesced' (True when another request's call was shared)
+        """
+        started = time.perf_counter()
+        key = make_cache_key(self.model_name, endpoint, text, params, self.prompts.fingerprint)
+        if self.cache is not None:
+            cached = await call_store(self.cache.blocking, self.cache.get, key)
+            if cached is not None:
+                cached["cache"] = "hit"
+                if "attempts" in cached:
+                    cached["attempts"] = 0
+                self._observe(endpoint, params, cached, started)
+                return cached
+        
+        async def compute_and_store():
+            result = await compute()
+            if self.cache is not None and result.get("success") and not result.get("fallback"):
+                await call_store(self.cache.blocking, self.cache.set, key, result)
+            return result
+        
+        shared_result, coalesced = await self._inflight.do(key, compute_and_store)
+        result = dict(shared_result)
+        result["cache"] = "miss" if self.cache is not None else "disabled"
+        result["coalesced"] = coalesced
+        self._observe(endpoint, params, result, started)
+        return result
+    
+    def _observe(self, endpoint: str, params: dict, result: dict, started: float) -> None:
+        """Record latency and failures of one service call"""
+        metrics.REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            endpoint=endpoint,
+            style=params.get("style", "none"),
+            cache=result.get("cache")
+        )
+        if not result.get("success"):
+            metrics.REQUEST_ERRORS.inc(endpoint=endpoint, error_type=result.get("error_type", "upstream_error"))
+    
+    def _record_usage(self, endpoint: str, prompt: str, output: str, response=None) -> dict:
+        """
+        Count characters and tokens in and out of an upstream call
+        
+        Uses the token usage reported by the backend when available (and
+        calibrates the estimator with it), and the local estimate otherwise.
+        The tokens are charged to the current tenant.
+        
+        Returns:
+            dict: 'input_tokens' and 'output_tokens' for the response
+        """
+        reported_input = getattr(response, "input_tokens", None)
+        if reported_input:
+            self.tokens.observe(prompt, reported_input)
+        usage = {
+            "input_tokens": reported_input or self.tokens.estimate(prompt),
+            "output_tokens": getattr(response, "output_tokens", None) or self.tokens.estimate(output),
+        }
+        metrics.INPUT_CHARS.inc(len(prompt), endpoint=endpoint)
+        metrics.OUTPUT_CHARS.inc(len(output), endpoint=endpoint)
+        metrics.INPUT_TOKENS.inc(usage["input_tokens"], endpoint=endpoint)
+        metrics.OUTPUT_TOKENS.inc(usage["output_tokens"], endpoint=endpoint)
+        charge = (current_tenant.get(), usage["input_tokens"], usage["output_tokens"])
+        if self.tenants.blocking:
+            # Shared counters wait on SQLite; the charge need not hold up the response
+            asyncio.get_running_loop().run_in_executor(None, self.tenants.record_usage, *charge)
+        else:
+            self.tenants.record_usage(*charge)
+        return usage
+    
+    def _check_context(self, prompt: str, max_tokens: int) -> None:
+        """
+        Raise ContextExceeded when a prompt cannot fit the model's context window
+        
+        Runs before admission and retries, so oversized prompts fail in
+        microseconds instead of after a full upstream round trip.
+        """
+        prompt_tokens = self.tokens.estimate(prompt)
+        if prompt_tokens + max_tokens > self.context_tokens:
+            raise ContextExceeded(prompt_tokens, max_tokens, self.context_tokens)
+    
+    def _chunk_budget(self, *merges) -> int:
+        """
+        Largest chunk, in estimated tokens, whose prompt fits the model's context window
+        
+        A chunk prompt carries the chunk template's instructions and must leave
+        room for CHUNK_SUMMARY_TOKENS of output. Each (template, max_tokens) in
+        merges is a later prompt that takes up to one chunk's worth of text (the
+        final pass over the partial summaries) and is budgeted the same way.
+        
+        Raises:
+            ContextExceeded: If not even a one-token chunk fits
+        """
+        budget = self.chunk_tokens
+        for name, max_tokens in (("chunk", CHUNK_SUMMARY_TOKENS), *merges):
+            overhead = self.tokens.estimate(self.prompts.get(name).render(text=""))
+            if overhead + max_tokens >= self.context_tokens:
+                raise ContextExceeded(overhead, max_tokens, self.context_tokens)
+            budget = min(budget, self.context_tokens - overhead - max_tokens)
+        return budget
+    
+    @asynccontextmanager
+    async def _upstream_slot(self, prompt: str, max_tokens: int):
+        """
+        Admit one upstream call through adaptive concurrency and the rate limiter
+        
+        The call first queues for a concurrency slot with the tenant's weight,
+        and only then reserves quota from the shared token buckets, so when the
+        upstream quota is the bottleneck it is handed out in weighted-fair order
+        too rather than in arrival order. The tenant is charged once the call starts.
+        
+        Raises:
+            RateLimitExceeded: If the call cannot start within RATE_LIMIT_MAX_WAIT
+        """
+        deadline = time.monotonic() + self.rate_limit_max_wait
+        tenant = current_tenant.get()
+        await self.concurrency.acquire(
+            timeout=self.rate_limit_max_wait,
+            flow=tenant,
+            weight=self.tenants.weight(tenant)
+        )
+        try:
+            await self.rate_limiter.acquire(
+                self.tokens.estimate(prompt) + max_tokens,
+                timeout=max(0.0, deadline - time.monotonic())
+            )
+            await call_store(self.tenants.blocking, self.tenants.record_call, tenant)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.concurrency.on_overload()
+            raise
+        else:
+            self.concurrency.on_success()
+        finally:
+            self.concurrency.release()
+    
+    @staticmethod
+    def _upstream_usage(results: list) -> dict:
+        """
+        Token usage summed over the results that made their own upstream call
+        
+        Cache hits and calls shared with a concurrent request (coalesced) report
+        the usage of a call made for someone else, so they count as zero.
+        """
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        for result in results:
+            if result.get("cache") == "hit" or result.get("coalesced"):
+                continue
+            for field in usage:
+                usage[field] += result.get("usage", {}).get(field, 0)
+        return usage
+    
+    def _error_result(self, error: Exception, **extra) -> dict:
+        """
+        Build a failed result dict
+        
+        Throttling errors are tagged with error_type 'rate_limited' and a
+        retry_after hint so the API can answer 429 instead of 500; missed
+        deadlines are tagged 'deadline_exceeded'. Failures worth retrying later
+        (see is_transient_error) carry 'transient': True.
+        """
+        result = {"success": False, "error": str(error), **extra}
+        if is_transient_error(error):
+            result["transient"] = True
+        if hasattr(error, "attempts"):
+            result["attempts"] = error.attempts
+        if isinstance(error, DeadlineExceeded):
+            result["error_type"] = "deadline_exceeded"
+        elif isinstance(error, ContextExceeded):
+            result["error_type"] = "context_exceeded"
+        elif is_rate_limit_error(error):
+            result["error_type"] = "rate_limited"
+            result["retry_after"] = getattr(error, "retry_after", self.rate_limit_max_wait)
+        return result
+    
+    async def _extractive(self, endpoint: str, text: str, params: dict, rank, build_result) -> dict:
+        """
+        Run the local extractive engine through the cache and coalescing pipeline
+        
+        Args:
+            endpoint: Service method name; '_extractive' is appended for the cache key
+            text: The input text
+            params: Every parameter that influences the output
+            rank: Blocking function of the text returning the extracted text
+            build_result: Builds the success dict from the extracted text
+        """
+        loop = asyncio.get_running_loop()
+        
+        async def compute():
+            try:
+                with metrics.time_stage(endpoint, "extractive"):
+                    output = await loop.run_in_executor(None, rank, text)
+                return {**build_result(output), "model": extractive.MODEL_NAME, "engine": "extractive", "attempts": 0}
+            except Exception as e:
+                return self._error_result(e)
+        
+        return await self._run(f"{endpoint}_extractive", text, params, compute)
+    
+    async def _with_fallback(self, result: dict, fallback) -> dict:
+        """
+        Replace a failed model result with the extractive one when EXTRACTIVE_FALLBACK is on
+        
+        Only failures that mean the model is unavailable (throttling, deadlines,
+        transient upstream errors) fall back. The fallback result carries
+        'fallback': True and the original error, and is never cached as the
+        model's answer.
+        """
+        if (
+            result.get("success")
+            or not self.extractive_fallback
+            or result.get("error_type") == "context_exceeded"
+            or not result.get("transient")
+        ):
+            return result
+        replacement = await fallback()
+        if not replacement.get("success"):
+            return result
+        return {**replacement, "fallback": True, "fallback_reason": result.get("error")}
+    
+    async def _reuse_near_duplicate(self, endpoint: str, text: str, params: dict, compute) -> dict:
+        """
+        Serve a near-duplicate's stored result, or compute and index a new one
+        
+        Runs behind the exact cache, so only exact misses pay for the sketch.
+        A reused result carries 'near_duplicate' with the estimated similarity,
+        and zero usage since no upstream call was made for it.
+        """
+        if self.near_duplicates is None:
+            return await compute()
+        
+        scope = (self.model_name, endpoint, tuple(sorted(params.items())))
+        with metrics.time_stage(endpoint, "near_duplicate"):
+            sketch = await asyncio.get_running_loop().run_in_executor(None, self.near_duplicates.sketch, text)
+            match = self.near_duplicates.lookup(sketch, scope)
+        if match is not None:
+            result, similarity = match
+            if "usage" in result:
+                result["usage"] = {field: 0 for field in result["usage"]}
+            return {**result, "attempts": 0, "near_duplicate": {"similarity": round(similarity, 4)}}
+        
+        result = await compute()
+        if result.get("success") and not result.get("fallback"):
+            self.near_duplicates.add(sketch, scope, result)
+        return result
+    
+    async def _generate(self, prompt: str, max_tokens: int, temperature: float, endpoint: str,
+                        source_text: Optional[str] = None, style: Optional[str] = None,
+                        response_schema: Optional[dict] = None, prefix: Optional[str] = None):
+        """
+        Run a blocking backend call on the worker pool
+        
+        The router orders the model pool for this request. Each attempt is
+        admitted by the rate limiter and bounded by the time left before the
+        endpoint's deadline. The last candidate retries transient failures;
+        earlier candidates get one try within the failover budget and hand over
+        to the next model when throttled, failing transiently or too slow.
+        
+        Args:
+            prompt: The full prompt to send
+            max_tokens: Maximum output tokens
+            temperature: Sampling temperature
+            endpoint: Service method name, selects the deadline and latency stats
+            source_text: The document itself, for backends that work on it directly
+            style: Summary style, used for routing
+            response_schema: JSON schema the response must follow, if any
+            prefix: Leading part of the prompt shared across calls (template
+                instructions and examples), cached upstream where supported
+            
+        Returns:
+            tuple: (GenerationResult with .model set to the serving model,
+            number of upstream calls made)
+            
+        Raises:
+            ContextExceeded: If the prompt cannot fit the model's context window
+        """
+        self._check_context(prompt, max_tokens)
+        loop = asyncio.get_running_loop()
+        tracker = self._latency[endpoint]
+        
+        async def attempt(backend: ModelBackend, remaining: float):
+            call = functools.partial(
+                backend.generate,
+                prompt,
+                max_tokens,
+                temperature,
+                timeout=remaining,
+                source_text=source_text,
+                response_schema=response_schema,
+                prefix=prefix
+            )
+            async with self._upstream_slot(prompt, max_tokens):
+                started = time.monotonic()
+                try:
+                    response = await loop.run_in_executor(self._executor, call)
+                except Exception as e:
+                    self.router.record(backend.model_name, error=True)
+                    metrics.UPSTREAM_ERRORS.inc(
+                        endpoint=endpoint, error_class=type(e).__name__, model=backend.model_name
+                    )
+                    raise
+                elapsed = time.monotonic() - started
+                tracker.record(elapsed)
+                self.router.record(backend.model_name, elapsed)
+                metrics.UPSTREAM_LATENCY.observe(elapsed, endpoint=endpoint, model=backend.model_name)
+                return response
+        
+        candidates = self.router.candidates(style, self.tokens.estimate(source_text or prompt))
+        deadline = self.deadlines[endpoint]
+        started = time.monotonic()
+        attempts = 0
+        for index, backend in enumerate(candidates):
+            last = index == len(candidates) - 1
+            remaining = deadline - (time.monotonic() - started)
+            try:
+                response, calls = await call_with_retries(
+                    functools.partial(attempt, backend),
+                    deadline=remaining if last else min(remaining, self.failover_after or deadline / 2),
+                    max_attempts=self.max_attempts if last else 1,
+                    base_delay=self.retry_base_delay,
+                    max_delay=self.retry_max_delay,
+                    hedge_after=tracker.percentile(0.95) if self.hedge_requests else None,
+                    is_retryable=lambda e: is_transient_error(e) and not isinstance(e, RateLimitExceeded)
+                )
+            except Exception as e:
+                attempts += getattr(e, "attempts", 0)
+                if last or not is_transient_error(e):
+                    e.attempts = attempts
+                    raise
+                self.router.record_failover(backend.model_name)
+                continue
+            response.model = backend.model_name
+            self.router.record_served(backend.model_name)
+            return response, attempts + calls
+    
+    async def _generate_stream(self, backend: ModelBackend, prompt: str, max_tokens: int, temperature: float,
+                               endpoint: str, source_text: Optional[str] = None):
+        """
+        Stream a backend call, yielding text chunks as they arrive
+        
+        The blocking backend iterator is drained on the worker pool and handed to the
+        event loop through a queue. When the consumer stops early (client
+        disconnect), the worker stops reading the upstream stream at the next chunk.
+        Streams are not retried or failed over once started; the endpoint deadline
+        bounds the call.
+        """
+        self._check_context(prompt, max_tokens)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        
+        def publish(kind, value=None):
+            if not stop.is_set():
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+                except RuntimeError:
+                    pass  # Event loop already closed
+        
+        def produce():
+            try:
+                chunks = backend.generate_stream(
+                    prompt,
+                    max_tokens,
+                    temperature,
+                    timeout=self.deadlines[endpoint],
+                    source_text=source_text
+                )
+                for chunk in chunks:
+                    if stop.is_set():
+                        break
+                    publish("chunk", chunk)
+                publish("end")
+            except Exception as e:
+                publish("error", e)
+        
+        async with self._upstream_slot(prompt, max_tokens):
+            loop.run_in_executor(self._executor, produce)
+            try:
+                while True:
+                    kind, value = await queue.get()
+                    if kind == "chunk":
+                        yield value
+                    elif kind == "error":
+                        raise value
+                    else:
+                        break
+            finally:
+                stop.set()
     
-    def summarize_text(
+    async def _stream(self, endpoint: str, text: str, params: dict, prompt: str,
+                      max_tokens: int, temperature: float, build_result,
+                      body_field: str = "summary"):
+        """
+        Stream a result as events, sharing the cache with the non-streaming path
+        
+        Yields dicts: {'event': 'chunk', 'text': ...} while generating, then one
+        {'event': 'done', ...result metadata} or {'event': 'error', 'error': ...}.
+        A cache hit is sent as a single chunk. body_field names the result key
+        holding the generated text, which the chunks replace in the final event.
+        """
+        key = make_cache_key(self.model_name, endpoint, text, params, self.prompts.fingerprint)
+        if self.cache is not None:
+            cached = await call_store(self.cache.blocking, self.cache.get, key)
+            if cached is not None:
+                yield {"event": "chunk", "text": cached[body_field]}
+                yield {"event": "done", **{k: v for k, v in cached.items() if k != body_field}, "cache": "hit"}
+                return
+        
+        backend = self.router.candidates(params.get("style"), self.tokens.estimate(text))[0]
+        parts = []
+        started = time.monotonic()
+        try:
+            stream = self._generate_stream(backend, prompt, max_tokens, temperature, endpoint, source_text=text)
+            async for piece in stream:
+                parts.append(piece)
+                yield {"event": "chunk", "text": piece}
+        except Exception as e:
+            self.router.record(backend.model_name, error=True)
+            metrics.UPSTREAM_ERRORS.inc(endpoint=endpoint, error_class=type(e).__name__, model=backend.model_name)
+            yield {"event": "error", **self._error_result(e)}
+            return
+        
+        elapsed = time.monotonic() - started
+        self.router.record(backend.model_name, elapsed)
+        self.router.record_served(backend.model_name)
+        metrics.UPSTREAM_LATENCY.observe(elapsed, endpoint=endpoint, model=backend.model_name)
+        usage = self._record_usage(endpoint, prompt, "".join(parts))
+        result = {**build_result("".join(parts)), "model": backend.model_name, "usage": usage}
+        if self.cache is not None:
+            await call_store(self.cache.blocking, self.cache.set, key, result)
+        yield {
+            "event": "done",
+            **{k: v for k, v in result.items() if k != body_field},
+            "cache": "miss" if self.cache is not None else "disabled"
+        }
+    
+    async def _stream_result(self, pending, body_field: str = "summary"):
+        """Emit a result computed in one piece (e.g. extractive) as a stream of events"""
+        result = await pending
+        if not result.get("success"):
+            yield {"event": "error", **result}
+            return
+        yield {"event": "chunk", "text": result[body_field]}
+        yield {"event": "done", **{k: v for k, v in result.items() if k != body_field}}
+    
+    def stats(self) -> dict:
+        """Current stats of every component: cache, coalescing, limiters, models, connections, prompts, tenants"""
+        stats = {
+            "singleflight": self._inflight.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "concurrency": self.concurrency.stats(),
+            "tokens": self.tokens.stats(),
+            "models": self.router.stats(),
+            "documents": self.documents.stats(),
+            "prompts": self.prompts.stats(),
+            "tenants": self.tenants.stats(),
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.near_duplicates is not None:
+            stats["near_duplicates"] = self.near_duplicates.stats()
+        if self.http_pool is not None:
+            stats["http_pool"] = self.http_pool.stats()
+        if self.context_cache is not None:
+            stats["context_cache"] = self.context_cache.stats()
+        return stats
+    
+    def warm_up(self) -> dict:
+        """
+        Load client libraries and open connections for every model of the pool (blocking)
+        
+        Returns:
+            dict: Seconds taken per model, or the error for models that failed
+        """
+        report = {}
+        for backend in self.router.backends:
+            started = time.perf_counter()
+            try:
+                backend.warm_up()
+                report[backend.model_name] = round(time.perf_counter() - started, 4)
+            except Exception as e:
+                report[backend.model_name] = f"error: {e}"
+        return report
+    
+    def shutdown(self):
+        """Release the worker pool (waits for in-flight calls) and close pooled connections"""
+        self._executor.shutdown(wait=True)
+        if self.http_pool is not None:
+            self.http_pool.close()
+    
+    async def summarize_text(
         self,
         text: str,
         style: Literal["concise", "detailed", "bullet"] = "concise",
         max_tokens: int = 150,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        mode: Literal["auto", "single", "hierarchical"] = "auto",
+        engine: Literal["llm", "extractive"] = "llm"
     ) -> dict:
         """
         Summarize text using Google Gemini API
@@ -37,46 +705,319 @@ class SummarizeService:
             style: Summarization style - 'concise', 'detailed', or 'bullet'
             max_tokens: Maximum tokens in the summary (controls length)
             temperature: Creativity level (0.0-2.0, lower = more focused)
+            mode: 'single' sends one prompt, 'hierarchical' map-reduces chunks,
+                'auto' picks hierarchical above HIERARCHICAL_THRESHOLD_TOKENS
+            engine: 'llm' calls the model, 'extractive' ranks the text's own
+                sentences locally (temperature and mode do not apply)
             
         Returns:
             dict: Contains 'summary' and 'model' information
         """
         
-        # Create style-specific prompts
-        style_prompts = {
-            "concise": "Provide a brief, concise summary in 2-3 sentences.",
-            "detailed": "Provide a comprehensive summary with key details and context.",
-            "bullet": "Summarize the main points in bullet point format."
-        }
+        def summarize_extractive():
+            return self._extractive(
+                "summarize_text",
+                text,
+                {"style": style, "max_tokens": max_tokens},
+                functools.partial(extractive.summarize, style=style, max_tokens=max_tokens),
+                lambda summary: {"success": True, "summary": summary, "style": style}
+            )
+        
+        if engine == "extractive":
+            return await summarize_extractive()
+        
+        async def compute():
+            try:
+                # Create prompt
+                with metrics.time_stage("summarize_text", "prompt"):
+                    template = self.prompts.get(f"summary.{style}")
+                    prompt = template.render(text=text)
+                
+                # Generate response
+                with metrics.time_stage("summarize_text", "upstream"):
+                    response, attempts = await self._generate(
+                        prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        endpoint="summarize_text",
+                        source_text=text,
+                        style=style,
+                        prefix=template.prefix
+                    )
+                
+                with metrics.time_stage("summarize_text", "serialization"):
+                    summary = response.text
+                    return {
+                        "success": True,
+                        "summary": summary,
+                        "model": response.model,
+                        "style": style,
+                        "attempts": attempts,
+                        "usage": self._record_usage("summarize_text", prompt, summary, response)
+                    }
+                
+            except Exception as e:
+                return self._error_result(e, summary=None)
+        
+        params = {"style": style, "max_tokens": max_tokens, "temperature": temperature}
         
+        if mode == "auto":
+            text_tokens = self.tokens.estimate(text)
+            too_long = text_tokens > self.hierarchical_threshold or text_tokens + max_tokens > self.context_tokens
+            mode = "hierarchical" if too_long else "single"
+        if mode == "hierarchical":
+            endpoint = "summarize_text_hierarchical"
+            compute = functools.partial(self._summarize_hierarchical, text, style, max_tokens, temperature)
+        else:
+            endpoint = "summarize_text"
+        
+        result = await self._run(
+            endpoint,
+            text,
+            params,
+            functools.partial(self._reuse_near_duplicate, endpoint, text, params, compute)
+        )
+        return await self._with_fallback(result, summarize_extractive)
+    
+    async def _summarize_chunk(self, chunk: str) -> dict:
+        """
+        Summarize one section of a long document (map step)
+        
+        Uses fixed generation settings so a chunk's cached summary is reused no
+        matter which style or temperature the whole-document request asked for.
+        """
+        async def compute():
+            try:
+                with metrics.time_stage("summarize_chunk", "prompt"):
+                    template = self.prompts.get("chunk")
+                    prompt = template.render(text=chunk)
+                with metrics.time_stage("summarize_chunk", "upstream"):
+                    response, attempts = await self._generate(
+                        prompt, max_tokens=CHUNK_SUMMARY_TOKENS, temperature=0.3, endpoint="summarize_chunk", source_text=chunk,
+                        prefix=template.prefix
+                    )
+                with metrics.time_stage("summarize_chunk", "serialization"):
+                    summary = response.text
+                    usage = self._record_usage("summarize_chunk", prompt, summary, response)
+                    return {"success": True, "summary": summary, "attempts": attempts, "usage": usage}
+            except Exception as e:
+                return self._error_result(e)
+        
+        params = {"max_tokens": CHUNK_SUMMARY_TOKENS, "temperature": 0.3}
+        return await self._run("summarize_chunk", chunk, params, compute)
+    
+    async def _summarize_hierarchical(
+        self,
+        text: str,
+        style: str,
+        max_tokens: int,
+        temperature: float
+    ) -> dict:
+        """
+        Map-reduce summarization: summarize chunks concurrently, then reduce
+        
+        Partial summaries that still exceed the chunk budget are chunked and
+        summarized again, up to MAX_REDUCE_LEVELS, before the final pass in the
+        requested style.
+        """
         try:
-            # Create prompt
-            prompt = f"{style_prompts[style]}\n\nSummarize the following text:\n\n{text}"
+            # Chunks, and the partial summaries reduced for the final pass, must
+            # fit the model's context with their prompts and outputs
+            chunk_tokens = self._chunk_budget((f"summary.{style}", max_tokens))
+        except ContextExceeded as e:
+            return self._error_result(e, summary=None)
+        semaphore = asyncio.Semaphore(self.chunk_fan_out)
+        
+        async def map_chunk(chunk):
+            async with semaphore:
+                return await self._summarize_chunk(chunk)
+        
+        current = text
+        total_chunks = 0
+        chunk_cache_hits = 0
+        attempts = 0
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        levels = 0
+        
+        while levels == 0 or (
+            self.tokens.estimate(current) > chunk_tokens and levels < self.max_reduce_levels
+        ):
+            chunks = split_into_chunks(current, chunk_tokens, estimate=self.tokens.estimate)
+            partials = await asyncio.gather(*(map_chunk(chunk) for chunk in chunks))
             
-            # Generate response
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=max_tokens,
-                    temperature=temperature
-                )
-            )
+            failed = [p for p in partials if not p.get("success")]
+            if failed:
+                return {
+                    **failed[0],
+                    "error": f"{len(failed)} of {len(chunks)} chunks failed: {failed[0].get('error')}",
+                    "summary": None
+                }
             
-            return {
-                "success": True,
-                "summary": response.text,
-                "model": self.model_name,
-                "style": style
-            }
+            total_chunks += len(chunks)
+            chunk_cache_hits += sum(1 for p in partials if p.get("cache") == "hit")
+            attempts += sum(p.get("attempts", 0) for p in partials if not p.get("coalesced"))
+            for field, count in self._upstream_usage(partials).items():
+                usage[field] += count
+            levels += 1
+            current = "\n\n".join(p["summary"].strip() for p in partials)
+        
+        result = await self.summarize_text(
+            current,
+            style=style,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            mode="single"
+        )
+        if not result.get("success") or result.get("fallback"):
+            return result
+        
+        return {
+            "success": True,
+            "summary": result["summary"],
+            "model": result["model"],
+            "style": style,
+            "mode": "hierarchical",
+            "chunks": total_chunks,
+            "chunk_cache_hits": chunk_cache_hits,
+            "reduce_levels": levels,
+            "attempts": attempts + result.get("attempts", 0),
+            "usage": {field: total + self._upstream_usage([result])[field] for field, total in usage.items()}
+        }
+    
+    async def summarize_document(
+        self,
+        document_id: str,
+        version: int,
+        text: str,
+        style: Literal["concise", "detailed", "bullet"] = "concise",
+        max_tokens: int = 150,
+        temperature: float = 0.7
+    ) -> dict:
+        """
+        Summarize a new version of a document, re-summarizing only what changed
+        
+        The text is split into content-defined sections (see split_into_chunks),
+        so an edit only changes the sections around it. Sections whose hash
+        matches a section of the stored previous version reuse its summary; the
+        others are summarized, and all section summaries are merged into the
+        final summary in the requested style. A short document that fits one
+        section is summarized directly.
+        
+        Args:
+            document_id: Caller's identifier of the document
+            version: Version number; must not go backwards
+            text: Full text of this version
+            style: Style of the merged summary
+            max_tokens: Maximum tokens in the merged summary
+            temperature: Sampling temperature of the merge
             
-        except Exception as e:
+        Returns:
+            dict: The summary with section and paragraph change counts, or a
+            failure with error_type 'version_conflict' for a stale version
+        """
+        params = {"style": style, "max_tokens": max_tokens, "temperature": temperature}
+        text_hash = content_hash(text)
+        previous = await call_store(self.documents.blocking, self.documents.get, document_id)
+        if previous is not None:
+            if version < previous["version"] or (version == previous["version"] and text_hash != previous["text_hash"]):
+                return self._version_conflict(document_id, previous["version"], version)
+            if version == previous["version"] and previous["params"] == params:
+                return {**previous["result"], "unchanged": True, "attempts": 0}
+        
+        try:
+            section_tokens = self._chunk_budget()
+        except ContextExceeded as e:
+            return self._error_result(e, summary=None)
+        paragraphs = paragraph_hashes(text)
+        sections = split_into_chunks(text, section_tokens, estimate=self.tokens.estimate)
+        hashes = [content_hash(section) for section in sections]
+        known = previous["sections"] if previous is not None else {}
+        semaphore = asyncio.Semaphore(self.chunk_fan_out)
+        
+        async def section_summary(section: str, section_hash: str) -> dict:
+            if len(sections) == 1:
+                return {"success": True, "summary": section}
+            if section_hash in known:
+                return {"success": True, "summary": known[section_hash], "reused": True}
+            async with semaphore:
+                return await self._summarize_chunk(section)
+        
+        partials = await asyncio.gather(*(section_summary(s, h) for s, h in zip(sections, hashes)))
+        failed = [p for p in partials if not p.get("success")]
+        if failed:
             return {
-                "success": False,
-                "error": str(e),
+                **failed[0],
+                "error": f"{len(failed)} of {len(sections)} sections failed: {failed[0].get('error')}",
                 "summary": None
             }
+        
+        merged = await self.summarize_text(
+            "\n\n".join(p["summary"].strip() for p in partials),
+            style=style,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        if not merged.get("success"):
+            return merged
+        
+        reused = sum(1 for p in partials if p.get("reused"))
+        metrics.DOCUMENT_SECTIONS.inc(reused, outcome="reused")
+        metrics.DOCUMENT_SECTIONS.inc(len(sections) - reused, outcome="summarized")
+        summarized = [p for p in partials if not p.get("reused") and "attempts" in p]
+        usage = self._upstream_usage(summarized + [merged])
+        
+        result = {
+            "success": True,
+            "document_id": document_id,
+            "version": version,
+            "previous_version": previous["version"] if previous is not None else None,
+            "summary": merged["summary"],
+            "model": merged["model"],
+            "style": style,
+            "sections": len(sections),
+            "sections_summarized": len(sections) - reused,
+            "sections_reused": reused,
+            "paragraphs": diff_paragraphs(previous["paragraphs"] if previous is not None else [], paragraphs),
+            "attempts": sum(p.get("attempts", 0) for p in summarized if not p.get("coalesced"))
+            + merged.get("attempts", 0),
+            "usage": usage
+        }
+        if merged.get("fallback"):
+            return {**result, "fallback": True, "fallback_reason": merged.get("fallback_reason")}
+        
+        stored = await call_store(self.documents.blocking, self.documents.put, document_id, {
+            "version": version,
+            "text_hash": text_hash,
+            "paragraphs": paragraphs,
+            "sections": dict(zip(hashes, (p["summary"] for p in partials))) if len(sections) > 1 else {},
+            "params": params,
+            "result": result
+        })
+        if not stored:
+            # A newer version was stored while this one was being summarized
+            current = await call_store(self.documents.blocking, self.documents.get, document_id)
+            return self._version_conflict(document_id, current["version"] if current else None, version)
+        return result
     
-    def summarize_with_context(
+    @staticmethod
+    def _version_conflict(document_id: str, current_version: Optional[int], version: int) -> dict:
+        return {
+            "success": False,
+            "error": f"Document {document_id} is at version {current_version}; got version {version}",
+            "error_type": "version_conflict",
+            "current_version": current_version
+        }
+    
+    async def get_document(self, document_id: str) -> Optional[dict]:
+        """Latest stored summary of a document, or None when unknown or evicted"""
+        state = await call_store(self.documents.blocking, self.documents.get, document_id)
+        return state["result"] if state is not None else None
+    
+    async def delete_document(self, document_id: str) -> bool:
+        """Forget a document's stored versions; False when it was not stored"""
+        return await call_store(self.documents.blocking, self.documents.delete, document_id)
+    
+    async def summarize_with_context(
         self,
         text: str,
         context: str,
@@ -94,62 +1035,307 @@ class SummarizeService:
             dict: Summary with metadata
         """
         
-        try:
-            prompt = f"Summarize the following text for: {context}\n\n{text}"
-            
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=max_tokens,
-                    temperature=0.7
-                )
-            )
-            
-            return {
-                "success": True,
-                "summary": response.text,
-                "context": context,
-                "model": self.model_name
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        async def compute():
+            try:
+                with metrics.time_stage("summarize_with_context", "prompt"):
+                    template = self.prompts.get("context")
+                    prompt = template.render(text=text, context=context)
+                
+                with metrics.time_stage("summarize_with_context", "upstream"):
+                    response, attempts = await self._generate(
+                        prompt,
+                        max_tokens=max_tokens,
+                        temperature=0.7,
+                        endpoint="summarize_with_context",
+                        source_text=text,
+                        prefix=template.prefix
+                    )
+                
+                with metrics.time_stage("summarize_with_context", "serialization"):
+                    summary = response.text
+                    return {
+                        "success": True,
+                        "summary": summary,
+                        "context": context,
+                        "model": response.model,
+                        "attempts": attempts,
+                        "usage": self._record_usage("summarize_with_context", prompt, summary, response)
+                    }
+                
+            except Exception as e:
+                return self._error_result(e)
+        
+        params = {"context": context, "max_tokens": max_tokens, "temperature": 0.7}
+        return await self._run("summarize_with_context", text, params, compute)
     
-    def extract_key_points(self, text: str, num_points: int = 5) -> dict:
+    async def extract_key_points(
+        self,
+        text: str,
+        num_points: int = 5,
+        engine: Literal["llm", "extractive"] = "llm"
+    ) -> dict:
         """
         Extract key points from text
         
         Args:
             text: The text to analyze
             num_points: Number of key points to extract
+            engine: 'llm' calls the model, 'extractive' returns the most central
+                sentences of the text itself
             
         Returns:
             dict: List of key points with metadata
         """
         
-        try:
-            prompt = f"Extract exactly {num_points} key points from the following text. Format as a numbered list.\n\n{text}"
-            
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=300,
-                    temperature=0.5
-                )
+        def extract_extractive():
+            return self._extractive(
+                "extract_key_points",
+                text,
+                {"num_points": num_points},
+                functools.partial(extractive.key_points, num_points=num_points),
+                lambda key_points: {"success": True, "key_points": key_points, "num_points_requested": num_points}
             )
+        
+        if engine == "extractive":
+            return await extract_extractive()
+        
+        async def compute():
+            try:
+                with metrics.time_stage("extract_key_points", "prompt"):
+                    template = self.prompts.get("key_points")
+                    prompt = template.render(text=text, num_points=num_points)
+                
+                with metrics.time_stage("extract_key_points", "upstream"):
+                    response, attempts = await self._generate(
+                        prompt,
+                        max_tokens=300,
+                        temperature=0.5,
+                        endpoint="extract_key_points",
+                        source_text=text,
+                        prefix=template.prefix
+                    )
+                
+                with metrics.time_stage("extract_key_points", "serialization"):
+                    key_points = response.text
+                    return {
+                        "success": True,
+                        "key_points": key_points,
+                        "num_points_requested": num_points,
+                        "model": response.model,
+                        "attempts": attempts,
+                        "usage": self._record_usage("extract_key_points", prompt, key_points, response)
+                    }
+                
+            except Exception as e:
+                return self._error_result(e)
+        
+        params = {"num_points": num_points, "max_tokens": 300, "temperature": 0.5}
+        result = await self._run("extract_key_points", text, params, compute)
+        return await self._with_fallback(result, extract_extractive)
+    
+    async def summarize_multi(
+        self,
+        text: str,
+        outputs: List[Literal["concise", "detailed", "bullet", "key_points"]] = ("concise", "bullet", "key_points"),
+        num_points: int = 5,
+        max_tokens: int = 600,
+        temperature: float = 0.5,
+        engine: Literal["llm", "extractive"] = "llm"
+    ) -> dict:
+        """
+        Produce several summary styles of one text with a single upstream call
+        
+        The model answers with one JSON object (enforced with a response schema
+        where the backend supports it) holding a section per output. Sections
+        that are missing or invalid are regenerated individually through
+        summarize_text / extract_key_points, so one bad section does not fail
+        the others.
+        
+        Args:
+            text: The text to summarize
+            outputs: Any of 'concise', 'detailed', 'bullet' and 'key_points'
+            num_points: Number of key points for the 'key_points' output
+            max_tokens: Output budget shared by all sections
+            temperature: Sampling temperature
+            engine: 'llm' calls the model once, 'extractive' builds every
+                output from the text's own sentences locally
             
+        Returns:
+            dict: 'outputs' by name, plus 'fallback_outputs' naming the sections
+            that had to be regenerated separately
+        """
+        outputs = list(dict.fromkeys(outputs))
+        params = {
+            "outputs": ",".join(outputs),
+            "num_points": num_points,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        
+        def rank_extractive(source: str) -> dict:
             return {
+                name: extractive.key_points(source, num_points) if name == "key_points"
+                else extractive.summarize(source, style=name, max_tokens=max_tokens // len(outputs))
+                for name in outputs
+            }
+        
+        def multi_extractive():
+            return self._extractive(
+                "summarize_multi",
+                text,
+                {key: value for key, value in params.items() if key != "temperature"},
+                rank_extractive,
+                lambda sections: {"success": True, "outputs": sections, "fallback_outputs": []}
+            )
+        
+        if engine == "extractive":
+            return await multi_extractive()
+        
+        async def regenerate(name: str) -> dict:
+            if name == "key_points":
+                result = await self.extract_key_points(text, num_points)
+                return {**result, "output": result.get("key_points")}
+            result = await self.summarize_text(
+                text,
+                style=name,
+                max_tokens=max(50, max_tokens // len(outputs)),
+                temperature=temperature,
+                mode="single"
+            )
+            return {**result, "output": result.get("summary")}
+        
+        async def compute():
+            try:
+                with metrics.time_stage("summarize_multi", "prompt"):
+                    prompt = multi_output.build_prompt(text, outputs, num_points)
+                
+                with metrics.time_stage("summarize_multi", "upstream"):
+                    response, attempts = await self._generate(
+                        prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        endpoint="summarize_multi",
+                        source_text=text,
+                        style="detailed" if "detailed" in outputs else None,
+                        response_schema=multi_output.response_schema(outputs)
+                    )
+                
+                with metrics.time_stage("summarize_multi", "serialization"):
+                    sections, invalid = multi_output.parse_sections(response.text, outputs, num_points)
+                    usage = self._record_usage("summarize_multi", prompt, response.text, response)
+            except Exception as e:
+                return self._error_result(e)
+            
+            result = {
                 "success": True,
-                "key_points": response.text,
-                "num_points_requested": num_points,
-                "model": self.model_name
+                "outputs": sections,
+                "num_points_requested": num_points if "key_points" in outputs else None,
+                "model": response.model,
+                "attempts": attempts,
+                "usage": usage,
+                "fallback_outputs": invalid,
             }
+            if not invalid:
+                return result
             
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
+            # Regenerate only the sections that failed validation, concurrently
+            for name in invalid:
+                metrics.MULTI_OUTPUT_FALLBACKS.inc(output=name)
+            replacements = await asyncio.gather(*(regenerate(name) for name in invalid))
+            for name, replacement in zip(invalid, replacements):
+                if not replacement.get("success"):
+                    return replacement
+                sections[name] = replacement["output"]
+                result["attempts"] += replacement.get("attempts", 0)
+                if replacement.get("fallback"):
+                    result["fallback"] = True  # Extractive stand-in: keep out of the cache
+                for field, count in self._upstream_usage([replacement]).items():
+                    usage[field] += count
+            result["outputs"] = {name: sections[name] for name in outputs}
+            return result
+        
+        result = await self._run("summarize_multi", text, params, compute)
+        return await self._with_fallback(result, multi_extractive)
+    
+    def stream_summarize_text(
+        self,
+        text: str,
+        style: Literal["concise", "detailed", "bullet"] = "concise",
+        max_tokens: int = 150,
+        temperature: float = 0.7,
+        engine: Literal["llm", "extractive"] = "llm"
+    ):
+        """
+        Stream a summary (single-prompt mode)
+        
+        Args:
+            text: The text to summarize
+            style: Summarization style - 'concise', 'detailed', or 'bullet'
+            max_tokens: Maximum tokens in the summary
+            temperature: Creativity level (0.0-2.0)
+            engine: 'extractive' sends the whole local result as one chunk
+            
+        Returns:
+            Async iterator of event dicts (see _stream)
+        """
+        if engine == "extractive":
+            return self._stream_result(self.summarize_text(text, style, max_tokens, engine="extractive"))
+        params = {"style": style, "max_tokens": max_tokens, "temperature": temperature}
+        return self._stream(
+            "summarize_text", text, params,
+            prompt=self.prompts.get(f"summary.{style}").render(text=text),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            build_result=lambda summary: {
+                "success": True,
+                "summary": summary,
+                "style": style
+            }
+        )
+    
+    def stream_summarize_with_context(self, text: str, context: str, max_tokens: int = 200):
+        """
+        Stream a context-aware summary
+        
+        Returns:
+            Async iterator of event dicts (see _stream)
+        """
+        params = {"context": context, "max_tokens": max_tokens, "temperature": 0.7}
+        return self._stream(
+            "summarize_with_context", text, params,
+            prompt=self.prompts.get("context").render(text=text, context=context),
+            max_tokens=max_tokens,
+            temperature=0.7,
+            build_result=lambda summary: {
+                "success": True,
+                "summary": summary,
+                "context": context
+            }
+        )
+    
+    def stream_extract_key_points(self, text: str, num_points: int = 5,
+                                  engine: Literal["llm", "extractive"] = "llm"):
+        """
+        Stream extracted key points
+        
+        Returns:
+            Async iterator of event dicts (see _stream)
+        """
+        if engine == "extractive":
+            return self._stream_result(
+                self.extract_key_points(text, num_points, engine="extractive"),
+                body_field="key_points"
+            )
+        params = {"num_points": num_points, "max_tokens": 300, "temperature": 0.5}
+        return self._stream(
+            "extract_key_points", text, params,
+            prompt=self.prompts.get("key_points").render(text=text, num_points=num_points),
+            max_tokens=300,
+            temperature=0.5,
+            body_field="key_points",
+            build_result=lambda key_points: {
+                "success": True,
+                "key_points": key_points,
+                "num_points_requested": num_points
             }
+        )
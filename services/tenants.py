@@ -0,0 +1,342 @@
+"""
+Tenants
+API keys mapped to tenants, with per-tenant quotas, scheduling weights and usage
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from services.rate_limit import RateLimitExceeded, TokenBucket
+from services.shared_state import open_database, shared_state_enabled
+
+# Usage counters, in the order /usage and /metrics report them
+USAGE_FIELDS = ("requests_admitted", "requests_rejected", "upstream_calls", "input_tokens", "output_tokens")
+
+# Tenant of the request being served. Set by the API on admission; asyncio
+# tasks created while serving the request (batch items, streams) inherit it.
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+DEFAULT_TENANT = "default"
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class Tenant:
+    """
+    One tenant: its quotas, scheduling weight, priority and usage counters
+
+    requests_per_minute counts upstream model calls (cache hits are free) and
+    tokens_per_minute the input plus output tokens they reported; None means
+    unlimited. Both are charged after the fact, and a tenant whose balance is
+    exhausted is turned away at admission until its buckets refill. priority
+    ('interactive' or 'batch') decides who is shed first under overload.
+    """
+
+    def __init__(self, tenant_id: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, weight: float = 1.0, priority: str = "interactive"):
+        if priority not in ("interactive", "batch"):
+            raise ValueError(f"Tenant {tenant_id} has unknown priority {priority!r}")
+        self.id = tenant_id
+        self.weight = weight
+        self.priority = priority
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.admitted = 0
+        self.rejected = 0
+        self.upstream_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+
+class TenantRegistry:
+    """
+    Tenants by API key
+
+    Without configured tenants, authentication is off and every request belongs
+    to the unlimited 'default' tenant. Buckets and counters are per process;
+    SharedTenantRegistry shares them between worker processes.
+    """
+
+    blocking = False
+
+    def __init__(self, tenants: Optional[Dict[str, Tenant]] = None, api_keys: Optional[Dict[str, str]] = None):
+        self.tenants = tenants or {DEFAULT_TENANT: Tenant(DEFAULT_TENANT)}
+        self._api_keys = api_keys or {}  # sha256 of key -> tenant id
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """True when requests must carry an API key"""
+        return bool(self._api_keys)
+
+    def authenticate(self, api_key: Optional[str]) -> Optional[Tenant]:
+        """The tenant owning api_key, or None; any caller is 'default' when authentication is off"""
+        if not self.enabled:
+            return self.tenants[DEFAULT_TENANT]
+        if not api_key:
+            return None
+        tenant_id = self._api_keys.get(hash_api_key(api_key))
+        return self.tenants.get(tenant_id) if tenant_id else None
+
+    def admit(self, tenant: Tenant) -> None:
+        """
+        Admit one request of tenant
+
+        Raises:
+            RateLimitExceeded: If the tenant has used up its request or token quota
+        """
+        with self._lock:
+            wait = max(
+                tenant.requests.wait_time(1) if tenant.requests else 0.0,
+                tenant.tokens.wait_time(1) if tenant.tokens else 0.0
+            )
+            if wait > 0:
+                tenant.rejected += 1
+                raise RateLimitExceeded(retry_after=wait, reason=f"tenant {tenant.id} quota")
+            tenant.admitted += 1
+
+    def weight(self, tenant_id: Optional[str]) -> float:
+        tenant = self.tenants.get(tenant_id)
+        return tenant.weight if tenant else 1.0
+
+    def record_call(self, tenant_id: Optional[str]) -> None:
+        """Charge one upstream call to a tenant"""
+        tenant = self.tenants.get(tenant_id)
+        if tenant is None:
+            return
+        with self._lock:
+            tenant.upstream_calls += 1
+            if tenant.requests:
+                tenant.requests.take(1)
+
+    def record_usage(self, tenant_id: Optional[str], input_tokens: int, output_tokens: int) -> None:
+        """Charge the tokens of a finished upstream call to a tenant"""
+        tenant = self.tenants.get(tenant_id)
+        if tenant is None:
+            return
+        with self._lock:
+            tenant.input_tokens += input_tokens
+            tenant.output_tokens += output_tokens
+            if tenant.tokens:
+                tenant.tokens.take(input_tokens + output_tokens)
+
+    @staticmethod
+    def _settings(tenant: Tenant) -> dict:
+        return {
+            "tenant": tenant.id,
+            "weight": tenant.weight,
+            "priority": tenant.priority,
+            "requests_per_minute": tenant.requests_per_minute,
+            "tokens_per_minute": tenant.tokens_per_minute,
+        }
+
+    def usage(self, tenant_id: str) -> dict:
+        """Quotas, remaining balance and usage counters of one tenant"""
+        tenant = self.tenants[tenant_id]
+        with self._lock:
+            usage = {
+                **self._settings(tenant),
+                "requests_admitted": tenant.admitted,
+                "requests_rejected": tenant.rejected,
+                "upstream_calls": tenant.upstream_calls,
+                "input_tokens": tenant.input_tokens,
+                "output_tokens": tenant.output_tokens,
+            }
+            if tenant.requests:
+                tenant.requests._refill()
+                usage["requests_available"] = round(tenant.requests.tokens, 2)
+            if tenant.tokens:
+                tenant.tokens._refill()
+                usage["tokens_available"] = round(tenant.tokens.tokens)
+        return usage
+
+    def stats(self) -> dict:
+        """Usage counters keyed by field, then by tenant id"""
+        usages = [self.usage(tenant_id) for tenant_id in self.tenants]
+        return {field: {usage["tenant"]: usage[field] for usage in usages} for field in USAGE_FIELDS}
+
+
+class SharedTenantRegistry(TenantRegistry):
+    """
+    Tenants whose quota buckets and usage counters live in SQLite
+
+    Every worker process admits and charges against the same rows, so a
+    tenant's quota holds for the deployment as a whole and /usage reports all
+    processes. Buckets refill by wall-clock time, which all processes share;
+    updates run in BEGIN IMMEDIATE transactions. Methods block on the database,
+    so callers on the event loop run them in the executor (blocking is True).
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, tenants: Optional[Dict[str, Tenant]] = None,
+                 api_keys: Optional[Dict[str, str]] = None):
+        super().__init__(tenants, api_keys)
+        self.path = path
+        self._conn = open_database(path)
+        self._conn.isolation_level = None  # Explicit BEGIN IMMEDIATE transactions
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tenant_buckets (tenant TEXT NOT NULL, name TEXT NOT NULL, "
+            "tokens REAL NOT NULL, updated REAL NOT NULL, PRIMARY KEY (tenant, name))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tenant_usage (tenant TEXT NOT NULL, field TEXT NOT NULL, "
+            "value INTEGER NOT NULL, PRIMARY KEY (tenant, field))"
+        )
+        now = time.time()
+        for tenant in self.tenants.values():
+            for name, per_minute in self._limits(tenant).items():
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO tenant_buckets (tenant, name, tokens, updated) VALUES (?, ?, ?, ?)",
+                    (tenant.id, name, per_minute, now)
+                )
+
+    @staticmethod
+    def _limits(tenant: Tenant) -> dict:
+        limits = {"requests": tenant.requests_per_minute, "tokens": tenant.tokens_per_minute}
+        return {name: per_minute for name, per_minute in limits.items() if per_minute}
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _levels(self, tenant: Tenant, now: float) -> dict:
+        """Current bucket balances of a tenant, refilled up to now"""
+        limits = self._limits(tenant)
+        levels = {}
+        for name, tokens, updated in self._conn.execute(
+            "SELECT name, tokens, updated FROM tenant_buckets WHERE tenant = ?", (tenant.id,)
+        ):
+            if name in limits:
+                levels[name] = min(limits[name], tokens + max(0.0, now - updated) * limits[name] / 60.0)
+        return levels
+
+    def _take(self, tenant: Tenant, name: str, amount: float) -> None:
+        per_minute = self._limits(tenant).get(name)
+        if per_minute:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE tenant_buckets SET tokens = MIN(?, tokens + MAX(0.0, ? - updated) * ?) - ?, updated = ? "
+                "WHERE tenant = ? AND name = ?",
+                (per_minute, now, per_minute / 60.0, amount, now, tenant.id, name)
+            )
+
+    def _count(self, tenant: Tenant, field: str, amount: int = 1) -> None:
+        self._conn.execute(
+            "INSERT INTO tenant_usage (tenant, field, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (tenant, field) DO UPDATE SET value = value + excluded.value",
+            (tenant.id, field, amount)
+        )
+
+    def admit(self, tenant: Tenant) -> None:
+        """
+        Admit one request of tenant, counting its quota across every process
+
+        Raises:
+            RateLimitExceeded: If the tenant has used up its request or token quota
+        """
+        limits = self._limits(tenant)
+        with self._transaction():
+            levels = self._levels(tenant, time.time())
+            wait = max(
+                [max(0.0, (1 - level) / (limits[name] / 60.0)) for name, level in levels.items()],
+                default=0.0
+            )
+            self._count(tenant, "requests_rejected" if wait > 0 else "requests_admitted")
+        if wait > 0:
+            raise RateLimitExceeded(retry_after=wait, reason=f"tenant {tenant.id} quota")
+
+    def record_call(self, tenant_id: Optional[str]) -> None:
+        """Charge one upstream call to a tenant"""
+        tenant = self.tenants.get(tenant_id)
+        if tenant is None:
+            return
+        with self._transaction():
+            self._count(tenant, "upstream_calls")
+            self._take(tenant, "requests", 1)
+
+    def record_usage(self, tenant_id: Optional[str], input_tokens: int, output_tokens: int) -> None:
+        """Charge the tokens of a finished upstream call to a tenant"""
+        tenant = self.tenants.get(tenant_id)
+        if tenant is None:
+            return
+        with self._transaction():
+            self._count(tenant, "input_tokens", input_tokens)
+            self._count(tenant, "output_tokens", output_tokens)
+            self._take(tenant, "tokens", input_tokens + output_tokens)
+
+    def usage(self, tenant_id: str) -> dict:
+        """Quotas, remaining balance and usage counters of one tenant, summed over every process"""
+        tenant = self.tenants[tenant_id]
+        with self._lock:
+            counters = dict(self._conn.execute(
+                "SELECT field, value FROM tenant_usage WHERE tenant = ?", (tenant.id,)
+            ).fetchall())
+            levels = self._levels(tenant, time.time())
+        usage = {**self._settings(tenant), **{field: counters.get(field, 0) for field in USAGE_FIELDS}}
+        if "requests" in levels:
+            usage["requests_available"] = round(levels["requests"], 2)
+        if "tokens" in levels:
+            usage["tokens_available"] = round(levels["tokens"])
+        return usage
+
+
+def create_tenant_registry_from_env() -> TenantRegistry:
+    """
+    Load tenants from TENANTS_PATH
+
+    TENANTS_PATH: JSON file mapping tenant ids to their settings, e.g.
+        {"mobile-app": {"api_keys": ["..."], "requests_per_minute": 60,
+        "tokens_per_minute": 200000, "weight": 4, "priority": "interactive"}}
+        ('batch' tenants are shed first under overload). Keys may be given as
+        'sha256:<hex digest>' instead of in clear. When unset, authentication
+        is off and every request belongs to the unlimited 'default' tenant.
+    SHARED_STATE_PATH: SQLite database holding the buckets and usage counters when
+        SHARED_STATE=sqlite, so quotas and /usage cover every worker process
+    """
+    path = os.getenv("TENANTS_PATH")
+    if not path:
+        return _registry(None, None)
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    tenants, api_keys = {}, {}
+    for tenant_id, settings in config.items():
+        tenants[tenant_id] = Tenant(
+            tenant_id,
+            requests_per_minute=settings.get("requests_per_minute"),
+            tokens_per_minute=settings.get("tokens_per_minute"),
+            weight=float(settings.get("weight", 1.0)),
+            priority=settings.get("priority", "interactive")
+        )
+        for key in settings.get("api_keys", []):
+            digest = key[len("sha256:"):] if key.startswith("sha256:") else hash_api_key(key)
+            if digest in api_keys:
+                raise ValueError(f"API key of tenant {tenant_id} is also assigned to {api_keys[digest]}")
+            api_keys[digest] = tenant_id
+    if not api_keys:
+        raise ValueError(f"{path} defines no API keys")
+    return _registry(tenants, api_keys)
+
+
+def _registry(tenants: Optional[Dict[str, Tenant]], api_keys: Optional[Dict[str, str]]) -> TenantRegistry:
+    if shared_state_enabled():
+        return SharedTenantRegistry(os.getenv("SHARED_STATE_PATH", "shared_state.db"), tenants, api_keys)
+    return TenantRegistry(tenants, api_keys)
@@ -0,0 +1,60 @@
+"""
+Token Estimation
+Fast local token counts, calibrated against the usage the model reports
+"""
+
+import math
+import threading
+
+
+class TokenEstimator:
+    """
+    Characters-per-token estimator that learns from reported usage
+
+    estimate() is O(1) (text length divided by the current ratio), so it can run
+    on every request before any network call. Each time the backend reports the
+    real prompt token count, observe() moves the ratio toward the observed one
+    with an exponentially weighted average, so estimates converge on the
+    tokenizer of the model actually in use.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0, smoothing: float = 0.1,
+                 minimum: float = 1.0, maximum: float = 8.0):
+        self.chars_per_token = chars_per_token
+        self.smoothing = smoothing
+        self.minimum = minimum
+        self.maximum = maximum
+        self.observations = 0
+        self._lock = threading.Lock()
+
+    def estimate(self, text: str) -> int:
+        """Estimated token count of text (at least 1)"""
+        return max(1, math.ceil(len(text) / self.chars_per_token))
+
+    def observe(self, text: str, tokens: int) -> None:
+        """Calibrate with the token count the model reported for text"""
+        if not tokens or len(text) < 200:
+            return  # Short prompts are dominated by fixed overhead
+        ratio = min(self.maximum, max(self.minimum, len(text) / tokens))
+        with self._lock:
+            self.chars_per_token += self.smoothing * (ratio - self.chars_per_token)
+            self.observations += 1
+
+    def stats(self) -> dict:
+        return {
+            "chars_per_token": round(self.chars_per_token, 3),
+            "observations": self.observations,
+        }
+
+
+class ContextExceeded(Exception):
+    """Raised when a prompt plus its output budget cannot fit the model's context window"""
+
+    def __init__(self, prompt_tokens: int, max_tokens: int, context_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.context_tokens = context_tokens
+        super().__init__(
+            f"Prompt of about {prompt_tokens} tokens plus {max_tokens} output tokens "
+            f"exceeds the model context of {context_tokens} tokens"
+        )
@@ -0,0 +1,119 @@
+"""
+Startup profile for AI Text Summarizer API
+Reports the slowest imports of the application and measures a cold start: the
+time from spawning a fresh server process to the first byte of /health, and the
+latency of the first summarization request after it.
+
+Run it on two commits (or with STARTUP_WARMUP=false) to compare cold starts,
+e.g. to check how scale-from-zero hosting is affected by a change.
+
+Usage:
+    python startup_profile.py [--top 15] [--cold-start] [--runs 3] [--port 8765]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from services.startup import import_times
+
+SAMPLE_TEXT = (
+    "Scale-to-zero hosting stops idle instances and starts a new process for the "
+    "next request, so that request pays for interpreter start, imports and service "
+    "initialization before the application can answer. "
+) * 4
+
+
+def request(url: str, payload: dict = None, timeout: float = 60) -> float:
+    """Send one request; returns seconds until the first byte of the response body"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        response.read(1)
+        return time.perf_counter() - started
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+                return
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError(f"server did not listen on port {port} within {timeout}s")
+
+
+def cold_start(port: int) -> dict:
+    """Start `python main.py` and time its first responses"""
+    env = {**os.environ, "PORT": str(port), "WEB_CONCURRENCY": "1"}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port, process)
+        listening = time.perf_counter() - started
+        request(f"http://127.0.0.1:{port}/health")
+        health = time.perf_counter() - started
+        result = {
+            "listening_seconds": round(listening, 4),
+            "health_first_byte_seconds": round(health, 4),
+        }
+        try:
+            result["first_summarize_seconds"] = round(
+                request(f"http://127.0.0.1:{port}/summarize", {"text": SAMPLE_TEXT}), 4
+            )
+        except (OSError, urllib.error.URLError) as e:
+            result["first_summarize_error"] = str(e)
+        return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time and cold-start profile of the summarizer API")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument("--cold-start", action="store_true", help="Also spawn servers and time their first responses")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to measure")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the spawned servers")
+    args = parser.parse_args()
+
+    print(f"Slowest imports of main ({os.getenv('MODEL_BACKEND', 'gemini')} backend):")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in import_times("main", top=args.top):
+        print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {row['module']}")
+
+    if args.cold_start:
+        runs = []
+        for run in range(args.runs):
+            try:
+                result = cold_start(args.port)
+            except (OSError, RuntimeError, urllib.error.URLError) as e:
+                print(f"Cold start {run + 1} failed: {e}")
+                continue
+            runs.append(result)
+            print(f"Cold start {run + 1}: " + ", ".join(f"{k}={v}" for k, v in result.items()))
+        if runs:
+            timings = [key for key in runs[0] if key.endswith("_seconds")]
+            print("Median: " + ", ".join(
+                f"{key}={statistics.median(r[key] for r in runs if key in r):.4f}" for key in timings
+            ))
@@ -0,0 +1,140 @@
+"""
+Shared test setup
+The app is configured for the fake model backend with every database in a
+temporary directory before main is imported, as load_test.py does for the
+load test. Tests drive the ASGI app in-process; no server or network is needed.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+STATE_DIR = tempfile.mkdtemp(prefix="summarizer-tests-")
+
+os.environ.update({
+    "MODEL_BACKEND": "fake",
+    "FAKE_LATENCY_MS": "5",
+    "GEMINI_RPM": "1000000",
+    "GEMINI_TPM": "1000000000",
+    "SUMMARY_CACHE_BACKEND": "memory",
+    "STARTUP_WARMUP": "false",
+    "JOB_WORKERS": "1",
+    "JOB_DB_PATH": os.path.join(STATE_DIR, "jobs.db"),
+    "SHARED_STATE_PATH": os.path.join(STATE_DIR, "shared_state.db"),
+    "SUMMARY_CACHE_PATH": os.path.join(STATE_DIR, "summary_cache.db"),
+})
+for name in ("SHARED_STATE", "TENANTS_PATH", "NEAR_DUPLICATE_CACHE", "PROMPT_TEMPLATES_PATH", "PROMPT_VERSIONS"):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Response:
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+    def events(self) -> list:
+        """Server-Sent Events of the body as (event name, data) pairs"""
+        events = []
+        for block in self.body.decode("utf-8").strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.split("\n"))
+            events.append((fields["event"], json.loads(fields["data"])))
+        return events
+
+
+class ASGIClient:
+    """Sends requests straight into the app, like load_test.call_app, with headers and raw bodies"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, payload=None, headers: dict = None,
+                      body: bytes = None, chunks: list = None) -> Response:
+        """
+        Send one request
+
+        Args:
+            payload: JSON body
+            body: Raw body, sent as is
+            chunks: Raw body sent in several messages without a Content-Length (chunked)
+        """
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+        header_list = [(b"host", b"testserver"), (b"content-type", b"application/json")]
+        if chunks is None:
+            body = body or b""
+            header_list.append((b"content-length", str(len(body)).encode()))
+            chunks = [body]
+        for name, value in (headers or {}).items():
+            header_list.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": header_list,
+            "client": ("127.0.0.1", 0),
+            "server": ("testserver", 80),
+        }
+        messages = [
+            {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+            for index, chunk in enumerate(chunks)
+        ]
+        status, response_headers, parts = None, {}, []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(3600)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update(
+                    (name.decode("latin-1").lower(), value.decode("latin-1")) for name, value in message["headers"]
+                )
+            elif message["type"] == "http.response.body":
+                parts.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return Response(status, response_headers, b"".join(parts))
+
+
+@pytest.fixture(scope="session")
+def main_module():
+    import main
+    yield main
+    main.get_summarizer().shutdown()
+
+
+@pytest.fixture
+def client(main_module):
+    return ASGIClient(main_module.app)
+
+
+@pytest.fixture
+def summarizer(main_module):
+    return main_module.get_summarizer()
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    """A fresh SQLite database file"""
+    return str(tmp_path / "state.db")
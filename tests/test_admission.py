@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, Overloaded
+from services.jobs import JobDeferred
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+
+def test_reserved_slots_are_kept_for_interactive_requests():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=2, reserved=1, max_queue=4)
+        assert await admission.acquire("batch") == 0.0
+        queued_batch = asyncio.create_task(admission.acquire("batch"))
+        await asyncio.sleep(0.01)
+        assert not queued_batch.done()
+
+        # The reserved slot still admits an interactive request at once
+        assert await admission.acquire("interactive") == 0.0
+        assert admission.in_flight == 2
+
+        admission.release()  # the interactive request
+        await asyncio.sleep(0.01)
+        assert not queued_batch.done()  # batch may never take the reserved slot
+        admission.release()  # the first batch request
+        assert await queued_batch > 0
+        admission.release()
+        assert admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_interactive_requests_are_granted_before_batch():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=2, reserved=1, max_queue=4)
+        await admission.acquire("interactive")
+        await admission.acquire("interactive")
+        order = []
+
+        async def wait(priority):
+            await admission.acquire(priority)
+            order.append(priority)
+            admission.release()
+
+        batch = asyncio.create_task(wait("batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait("interactive"))
+        await asyncio.sleep(0)
+        admission.release()
+        admission.release()
+        await asyncio.gather(batch, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch"]
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, reserved=0, max_queue=0)
+        await admission.acquire("interactive")
+        with pytest.raises(Overloaded) as caught:
+            await admission.acquire("interactive")
+        assert caught.value.retry_after >= 1
+        assert admission.stats()["shed"] == {"interactive": 1, "batch": 0}
+
+    asyncio.run(scenario())
+
+
+def test_requests_queued_too_long_are_rejected():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, reserved=0, max_queue=4, max_queue_delay=0.02)
+        await admission.acquire("interactive")
+        with pytest.raises(Overloaded):
+            await admission.acquire("interactive")
+        admission.release()
+        assert admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_standing_queue_sheds_batch_requests_until_it_drains():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, reserved=0, max_queue=10,
+                                        target_delay=0.01, interval=0.02, max_queue_delay=5)
+        await admission.acquire("interactive")
+        first = asyncio.create_task(admission.acquire("batch"))
+        await asyncio.sleep(0.03)
+        # The head has waited past target: the interval starts
+        second = asyncio.create_task(admission.acquire("batch"))
+        await asyncio.sleep(0.03)
+        assert not admission.dropping
+
+        # Still above target a whole interval later: batch arrivals are shed
+        with pytest.raises(Overloaded):
+            await admission.acquire("batch")
+        assert admission.dropping
+        assert admission.shedding_episodes == 1
+
+        # Once the slot frees, queued batch requests reach the head and are shed too
+        admission.release()
+        for task in (first, second):
+            with pytest.raises(Overloaded):
+                await task
+
+        # The queue drained, so shedding stopped and batch requests are admitted again
+        assert not admission.dropping
+        assert admission.in_flight == 0
+        assert await admission.acquire("batch") == 0.0
+        assert admission.stats()["shed"]["batch"] == 3
+
+
+def test_admission_below_target_ends_shedding():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, reserved=0, max_queue=10,
+                                        target_delay=0.01, interval=0.01, max_queue_delay=5)
+        await admission.acquire("interactive")
+        queued_batch = asyncio.create_task(admission.acquire("batch"))
+        await asyncio.sleep(0.02)
+        slow = asyncio.create_task(admission.acquire("interactive"))  # starts the interval
+        await asyncio.sleep(0.02)
+        with pytest.raises(Overloaded):
+            await admission.acquire("batch")
+        assert admission.dropping
+
+        admission.release()
+        await slow  # granted after a long wait: still shedding
+        assert admission.dropping
+
+        fast = asyncio.create_task(admission.acquire("interactive"))
+        await asyncio.sleep(0)
+        admission.release()
+        assert await fast < 0.01
+        assert not admission.dropping
+
+        # Shedding has ended, so the batch request still queued is admitted
+        admission.release()
+        assert await queued_batch > 0.01
+        admission.release()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def admission(main_module, monkeypatch):
+    """A single admission slot and no queue, so a held slot sheds the next request"""
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    monkeypatch.setattr(main_module, "admission", controller)
+    return controller
+
+
+def test_stream_holds_its_slot_until_it_ends(client, admission):
+    response = asyncio.run(client.request("POST", "/summarize/stream", {"text": TEXT + "Stream slot."}))
+    assert response.events()[-1][0] == "done"
+    assert admission.admitted["interactive"] == 1
+    assert admission.in_flight == 0
+
+
+def test_overloaded_requests_get_503_with_retry_after(client, admission):
+    async def scenario():
+        await admission.acquire("interactive")  # another request holds the only slot
+        try:
+            return (await client.request("POST", "/summarize", {"text": TEXT + "Shed test."}),
+                    await client.request("POST", "/summarize/batch", {"items": [{"text": TEXT + "Shed item."}]}))
+        finally:
+            admission.release()
+
+    single, batch = asyncio.run(scenario())
+    assert single.status == 503
+    assert int(single.headers["retry-after"]) >= 1
+
+    # A batch is answered, with the shed item marked as retryable
+    assert batch.status == 200
+    entry = batch.json()["results"][0]
+    assert not entry["success"]
+    assert entry["error_type"] == "overloaded"
+    assert entry["transient"]
+    assert entry["retry_after"] >= 1
+    assert admission.in_flight == 0
+
+
+def test_job_whose_items_are_shed_is_deferred(main_module, admission):
+    async def scenario():
+        await admission.acquire("interactive")
+        try:
+            with pytest.raises(JobDeferred) as caught:
+                await main_module.run_job({"items": [{"text": TEXT + "Shed job."}], "priority": "batch"})
+        finally:
+            admission.release()
+        return caught.value
+
+    assert asyncio.run(scenario()).retry_after >= 1
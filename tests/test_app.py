@@ -0,0 +1,47 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+
+def test_health_is_public(client):
+    response = asyncio.run(client.request("GET", "/health"))
+    assert response.status == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_slow_model_calls_do_not_block_other_requests(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer.backend, "latency_ms", 300)
+
+    async def scenario():
+        slow = asyncio.create_task(client.request("POST", "/summarize", {"text": TEXT + "Slow call."}))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        health = await client.request("GET", "/health")
+        health_seconds = time.monotonic() - started
+        assert not slow.done()
+        return health, health_seconds, await slow
+
+    health, health_seconds, slow = asyncio.run(scenario())
+    assert health.status == 200
+    assert health_seconds < 0.1
+    assert slow.status == 200
+    assert slow.json()["success"]
+
+
+def test_empty_text_is_rejected(client):
+    response = asyncio.run(client.request("POST", "/summarize", {"text": ""}))
+    assert response.status == 422
+
+
+def test_importing_the_app_loads_no_numpy_and_opens_no_database(tmp_path):
+    db = tmp_path / "jobs.db"
+    env = {**os.environ, "JOB_DB_PATH": str(db), "MODEL_BACKEND": "fake", "NEAR_DUPLICATE_CACHE": "false"}
+    probe = "import sys, main; print('numpy' in sys.modules, main._summarizer, main._job_queue)"
+    output = subprocess.run([sys.executable, "-c", probe], env=env, cwd=os.path.dirname(os.path.dirname(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "None", "None"]
+    assert not db.exists()
@@ -0,0 +1,48 @@
+import asyncio
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+
+def test_batch_reports_each_item(client):
+    payload = {"items": [
+        {"id": "a", "text": TEXT + "Batch one."},
+        {"id": "b", "type": "keypoints", "text": TEXT + "Batch two.", "num_points": 3},
+        {"id": "c", "type": "context", "text": TEXT + "Batch three.", "context": "investors"},
+    ]}
+    response = asyncio.run(client.request("POST", "/summarize/batch", payload))
+    assert response.status == 200
+    body = response.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (3, 3, 0)
+    assert [(entry["index"], entry["id"], entry["type"]) for entry in body["results"]] == [
+        (0, "a", "summarize"), (1, "b", "keypoints"), (2, "c", "context")
+    ]
+    assert all(entry["result"]["success"] for entry in body["results"])
+
+
+def test_failed_item_does_not_fail_the_batch(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer.backend, "error_message", "400 Invalid argument (fake backend)")
+    monkeypatch.setattr(summarizer.backend, "error_rate", 1.0)
+    payload = {"items": [
+        {"id": "model", "text": TEXT + "Batch failure."},
+        {"id": "local", "text": TEXT + "Batch extractive.", "engine": "extractive"},
+    ]}
+    response = asyncio.run(client.request("POST", "/summarize/batch", payload))
+    assert response.status == 200
+    body = response.json()
+    assert (body["success"], body["succeeded"], body["failed"]) == (False, 1, 1)
+    failed, succeeded = body["results"]
+    assert not failed["success"]
+    assert "400" in failed["error"]
+    assert "transient" not in failed
+    assert succeeded["success"]
+
+
+def test_empty_and_oversized_batches_are_rejected(client, main_module):
+    async def scenario():
+        empty = await client.request("POST", "/summarize/batch", {"items": []})
+        items = [{"text": TEXT}] * (main_module.BATCH_MAX_ITEMS + 1)
+        oversized = await client.request("POST", "/summarize/batch", {"items": items})
+        return empty, oversized
+
+    for response in asyncio.run(scenario()):
+        assert response.status == 422
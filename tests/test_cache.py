@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from services.cache import MemoryCache, SQLiteCache, make_cache_key
+
+
+def test_cache_key_covers_text_parameters_and_prompts():
+    key = make_cache_key("fake", "summarize_text", "Some text", {"style": "concise"}, "abc")
+    assert key == make_cache_key("fake", "summarize_text", "  Some   text ", {"style": "concise"}, "abc")
+    assert key != make_cache_key("fake", "summarize_text", "Some text", {"style": "detailed"}, "abc")
+    assert key != make_cache_key("fake", "extract_key_points", "Some text", {"style": "concise"}, "abc")
+    assert key != make_cache_key("fake", "summarize_text", "Some text", {"style": "concise"}, "def")
+
+
+def test_sqlite_cache_round_trip_and_expiry(state_path):
+    cache = SQLiteCache(path=state_path, ttl=60)
+    cache.set("key", {"summary": "cached"})
+    assert cache.get("key") == {"summary": "cached"}
+    assert SQLiteCache(path=state_path).get("key") == {"summary": "cached"}  # survives a restart
+
+    expired = SQLiteCache(path=state_path, ttl=-1)
+    expired.set("old", {"summary": "stale"})
+    assert expired.get("old") is None
+
+
+def test_sqlite_cache_purges_expired_rows_and_caps_its_size(state_path):
+    cache = SQLiteCache(path=state_path, ttl=-1, max_entries=5, purge_every=1)
+    cache.set("expired", {"summary": "gone"})
+    cache.ttl = 60
+    for index in range(12):
+        cache.set(f"key{index}", {"summary": str(index)})
+    stats = cache.stats()
+    assert stats["entries"] == 5
+    assert stats["evictions"] == 7
+    # The oldest writes are trimmed first
+    assert cache.get("key0") is None
+    assert cache.get("key11") == {"summary": "11"}
+
+
+def test_memory_cache_is_bounded_and_expires():
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set("a", {"summary": "a"})
+    cache.set("b", {"summary": "b"})
+    cache.get("a")
+    cache.set("c", {"summary": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"summary": "a"}
+
+    short = MemoryCache(ttl=0.01)
+    short.set("a", {"summary": "a"})
+    time.sleep(0.02)
+    assert short.get("a") is None
+
+
+def test_repeated_summary_is_served_from_the_cache(client):
+    text = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+    async def scenario():
+        return (await client.request("POST", "/summarize", {"text": text}),
+                await client.request("POST", "/summarize", {"text": text}))
+
+    first, second = asyncio.run(scenario())
+    assert first.status == second.status == 200
+    assert first.json()["cache"] == "miss"
+    assert second.json()["cache"] == "hit"
+    assert second.json()["summary"] == first.json()["summary"]
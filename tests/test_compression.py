@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from services.compression import CompressionMiddleware, negotiate
+
+zstandard = pytest.importorskip("zstandard")
+
+LIMIT = 64 * 1024
+
+
+async def echo_length(scope, receive, send):
+    """App answering with the size of the body it received and a large payload"""
+    body, more = b"", True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    payload = json.dumps({"received": len(body), "padding": "x" * 4096}).encode()
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]})
+    await send({"type": "http.response.body", "body": payload})
+
+
+def send_request(chunks, headers=(), method="POST", app=echo_length):
+    """Send a body in chunks through the middleware; returns (status, headers, body)"""
+    middleware = CompressionMiddleware(app, max_body_bytes=LIMIT, min_size=1024)
+    scope = {"type": "http", "method": method, "path": "/", "headers": list(headers)}
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    headers = dict(sent[0]["headers"])
+    return sent[0]["status"], headers, b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def split(data: bytes, size: int = 1000) -> list:
+    return [data[i:i + size] for i in range(0, len(data), size)] or [b""]
+
+
+def test_gzip_body_is_decoded_and_content_length_rewritten():
+    received_headers = {}
+
+    async def app(scope, receive, send):
+        received_headers.update(scope["headers"])
+        await echo_length(scope, receive, send)
+
+    body = b"hello world " * 1000
+    status, _, response = send_request(split(gzip.compress(body)), [(b"content-encoding", b"gzip")], app=app)
+    assert status == 200
+    assert json.loads(response)["received"] == len(body)
+    assert b"content-encoding" not in received_headers
+    assert received_headers[b"content-length"] == str(len(body)).encode()
+
+
+@pytest.mark.parametrize("encoding, compress", [
+    ("gzip", gzip.compress),
+    ("zstd", lambda data: zstandard.ZstdCompressor().compress(data)),
+])
+def test_decompression_bombs_are_rejected(encoding, compress):
+    bomb = compress(b"\0" * (64 * LIMIT))
+    assert len(bomb) < LIMIT
+    status, _, response = send_request(split(bomb), [(b"content-encoding", encoding.encode())])
+    assert status == 413
+    assert "exceeds" in json.loads(response)["detail"]
+
+
+def test_zstd_frame_without_content_size_is_bounded():
+    compressor = zstandard.ZstdCompressor().compressobj()
+    bomb = compressor.compress(b"\0" * (64 * LIMIT)) + compressor.flush()
+    status, _, _ = send_request(split(bomb), [(b"content-encoding", b"zstd")])
+    assert status == 413
+
+
+@pytest.mark.parametrize("encoding, compress", [
+    ("gzip", gzip.compress),
+    ("zstd", lambda data: zstandard.ZstdCompressor().compress(data)),
+])
+def test_truncated_bodies_are_rejected(encoding, compress):
+    body = compress(b"some request text " * 500)
+    status, _, response = send_request([body[:len(body) // 2]], [(b"content-encoding", encoding.encode())])
+    assert status == 400
+    assert "truncated" in json.loads(response)["detail"]
+
+
+def test_corrupt_bodies_are_rejected():
+    status, _, _ = send_request([b"not gzip at all"], [(b"content-encoding", b"gzip")])
+    assert status == 400
+
+
+def test_unsupported_encoding_is_rejected():
+    status, _, _ = send_request([b"data"], [(b"content-encoding", b"compress")])
+    assert status == 415
+
+
+def test_declared_oversized_identity_body_is_rejected_unread():
+    status, _, _ = send_request([b""], [(b"content-length", str(LIMIT + 1).encode())])
+    assert status == 413
+
+
+def test_chunked_identity_body_is_read_through_the_cap():
+    status, _, response = send_request(split(b"a" * 5000))
+    assert status == 200
+    assert json.loads(response)["received"] == 5000
+
+    status, _, _ = send_request(split(b"a" * (LIMIT + 1), size=4096))
+    assert status == 413
+
+
+def test_responses_are_compressed_with_the_negotiated_encoding():
+    status, headers, response = send_request([b""], [(b"content-length", b"0"), (b"accept-encoding", b"gzip")],
+                                             method="GET")
+    assert status == 200
+    assert headers[b"content-encoding"] == b"gzip"
+    assert json.loads(gzip.decompress(response))["received"] == 0
+
+
+def test_negotiate_prefers_zstd_and_honours_q_zero():
+    assert negotiate("gzip, zstd") == "zstd"
+    assert negotiate("zstd;q=0, gzip") == "gzip"
+    assert negotiate("identity") == ""
+
+
+def test_app_accepts_gzip_request_bodies(client):
+    text = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+    body = gzip.compress(json.dumps({"text": text + "Gzip test."}).encode())
+    response = asyncio.run(client.request("POST", "/summarize", body=body, headers={"Content-Encoding": "gzip"}))
+    assert response.status == 200
+    assert response.json()["success"]
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.documents import MemoryDocumentStore, SQLiteDocumentStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, state_path):
+    if request.param == "sqlite":
+        return SQLiteDocumentStore(path=state_path)
+    return MemoryDocumentStore()
+
+
+def state(version: int, text_hash: str, summary: str = "") -> dict:
+    return {"version": version, "text_hash": text_hash, "result": {"summary": summary}}
+
+
+def test_put_is_a_compare_and_set_on_the_version(store):
+    assert store.put("doc", state(2, "b", "second"))
+    assert not store.put("doc", state(1, "a", "first"))  # older version
+    assert not store.put("doc", state(2, "c", "other text"))  # same version, different text
+    assert store.put("doc", state(2, "b", "second again"))  # same text, other parameters
+    assert store.put("doc", state(3, "c", "third"))
+    assert store.get("doc")["result"]["summary"] == "third"
+
+
+def test_delete_forgets_the_version(store):
+    store.put("doc", state(5, "e"))
+    assert store.delete("doc")
+    assert not store.delete("doc")
+    assert store.put("doc", state(1, "a"))
+
+
+def test_sqlite_version_check_holds_across_connections(state_path):
+    first, second = SQLiteDocumentStore(path=state_path), SQLiteDocumentStore(path=state_path)
+    assert first.put("doc", state(3, "c"))
+    assert not second.put("doc", state(2, "b"))
+    assert second.get("doc")["version"] == 3
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryDocumentStore(max_documents=2)
+    store.put("a", state(1, "a"))
+    store.put("b", state(1, "b"))
+    store.get("a")
+    store.put("c", state(1, "c"))
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def section(name: str) -> str:
+    return " ".join(f"{name} sentence {index} describes the quarterly results in detail." for index in range(8))
+
+
+@pytest.fixture
+def documents(summarizer, monkeypatch):
+    """A fresh document store, and sections small enough that a few paragraphs make several"""
+    monkeypatch.setattr(summarizer, "documents", MemoryDocumentStore())
+    monkeypatch.setattr(summarizer, "chunk_tokens", 150)
+    return summarizer.documents
+
+
+def test_edit_resummarizes_only_changed_sections(client, documents):
+    paragraphs = [section(f"part{index}") for index in range(4)]
+
+    async def scenario():
+        first = await client.request("POST", "/documents/report/summarize",
+                                     {"version": 1, "text": "\n\n".join(paragraphs)})
+        edited = paragraphs[:3] + [section("rewritten")]
+        second = await client.request("POST", "/documents/report/summarize",
+                                      {"version": 2, "text": "\n\n".join(edited)})
+        stale = await client.request("POST", "/documents/report/summarize",
+                                     {"version": 1, "text": "\n\n".join(paragraphs)})
+        latest = await client.request("GET", "/documents/report")
+        return first, second, stale, latest
+
+    first, second, stale, latest = asyncio.run(scenario())
+    assert first.status == 200
+    assert first.json()["sections"] > 1
+    assert first.json()["sections_reused"] == 0
+
+    assert second.status == 200
+    body = second.json()
+    assert body["sections_reused"] >= 1
+    assert body["sections_summarized"] < body["sections"]
+    assert body["paragraphs"] == {"unchanged": 3, "added": 1, "removed": 1}
+    assert body["usage"]["input_tokens"] < first.json()["usage"]["input_tokens"]
+
+    assert stale.status == 409
+    assert latest.json()["version"] == 2
+
+
+def test_slower_older_version_cannot_overwrite_a_newer_one(client, documents):
+    async def scenario():
+        await client.request("POST", "/documents/wiki/summarize", {"version": 1, "text": section("intro")})
+        # Version 2 has many sections and finishes after version 3, which has one
+        long_text = "\n\n".join(section(f"chapter{index}") for index in range(12))
+        older, newer = await asyncio.gather(
+            client.request("POST", "/documents/wiki/summarize", {"version": 2, "text": long_text}),
+            client.request("POST", "/documents/wiki/summarize", {"version": 3, "text": section("short")}),
+        )
+        return older, newer
+
+    older, newer = asyncio.run(scenario())
+    assert newer.status == 200
+    assert older.status == 409
+    assert "version 3" in older.json()["detail"]
+    assert documents.get("wiki")["version"] == 3
+
+
+def test_reads_and_deletes_of_a_sqlite_store_run_off_the_event_loop(client, summarizer, monkeypatch, state_path):
+    store = SQLiteDocumentStore(path=state_path)
+    store.put("doc", state(1, "a", "stored"))
+    monkeypatch.setattr(summarizer, "documents", store)
+    threads = []
+    for name in ("get", "delete"):
+        def record(document_id, method=getattr(store, name)):
+            threads.append(threading.get_ident())
+            return method(document_id)
+        monkeypatch.setattr(store, name, record)
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        return (loop_thread, await client.request("GET", "/documents/doc"),
+                await client.request("DELETE", "/documents/doc"), await client.request("GET", "/documents/doc"))
+
+    loop_thread, read, deleted, missing = asyncio.run(scenario())
+    assert read.json() == {"summary": "stored"}
+    assert deleted.json() == {"deleted": True, "document_id": "doc"}
+    assert missing.status == 404
+    assert len(threads) == 3
+    assert loop_thread not in threads
@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services import extractive
+
+ON_TOPIC = [
+    "Revenue grew strongly in the third quarter as cloud sales expanded.",
+    "Cloud sales drove most of the revenue growth this quarter.",
+    "Analysts expect cloud revenue to keep growing next quarter.",
+]
+OFF_TOPIC = [
+    "The cafeteria menu now includes a vegetarian option on Fridays.",
+    "Parking permits must be renewed at the front desk.",
+]
+REPORT = " ".join([ON_TOPIC[0], OFF_TOPIC[0], ON_TOPIC[1], OFF_TOPIC[1], ON_TOPIC[2]])
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert extractive.tokenize("The Revenue of the company GREW.") == ["revenue", "company", "grew"]
+
+
+def test_tfidf_rows_are_normalized_and_similar_sentences_align():
+    vectors = extractive.tfidf_matrix(ON_TOPIC + OFF_TOPIC + ["the and of"])
+    norms = np.linalg.norm(vectors, axis=1)
+    assert norms[:-1] == pytest.approx(np.ones(5), abs=1e-5)
+    assert norms[-1] == 0  # only stopwords
+    similarity = vectors @ vectors.T
+    assert similarity[0, 1] > similarity[0, 3]
+    assert similarity[0, 4] == pytest.approx(0.0)
+
+
+def test_textrank_ranks_central_sentences_first():
+    scores = extractive.textrank(ON_TOPIC + OFF_TOPIC)
+    assert min(scores[:3]) > max(scores[3:])
+    assert scores.sum() == pytest.approx(1.0)
+
+
+def test_selected_sentences_are_the_central_ones_in_document_order():
+    selected = extractive.select_sentences(REPORT, limit=3)
+    assert selected == ON_TOPIC
+
+
+def test_character_budget_always_keeps_the_top_sentence():
+    selected = extractive.select_sentences(REPORT, limit=3, max_chars=10)
+    assert len(selected) == 1
+    assert selected[0] in ON_TOPIC
+
+
+def test_long_documents_are_ranked_in_blocks():
+    sentences = [f"Filler sentence number {index} mentions topic{index % 50}." for index in range(1000)]
+    sentences[700] = "Cloud revenue growth was the main story of the quarter for cloud revenue."
+    text = " ".join(sentences)
+    assert len(extractive.select_sentences(text, limit=5)) == 5
+
+
+def test_styles_and_key_points_are_formatted():
+    bullets = extractive.summarize(REPORT, style="bullet").splitlines()
+    assert bullets[0] == f"- {ON_TOPIC[0]}"
+    assert all(line.startswith("- ") for line in bullets)
+    assert extractive.summarize(REPORT, style="concise") == " ".join(ON_TOPIC)
+    assert extractive.key_points(REPORT, num_points=2).splitlines()[0].startswith("1. ")
+    assert extractive.summarize("") == ""
+
+
+def test_extractive_engine_makes_no_model_call(client):
+    response = asyncio.run(client.request("POST", "/summarize", {"text": REPORT, "engine": "extractive"}))
+    body = response.json()
+    assert response.status == 200
+    assert body["summary"] == " ".join(ON_TOPIC)
+    assert (body["model"], body["engine"], body["attempts"]) == ("extractive", "extractive", 0)
+
+
+@pytest.fixture
+def unavailable_model(summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer.backend, "error_rate", 1.0)
+    monkeypatch.setattr(summarizer, "max_attempts", 1)
+    return summarizer.backend
+
+
+def test_fallback_replaces_an_unavailable_model(client, summarizer, unavailable_model, monkeypatch):
+    monkeypatch.setattr(summarizer, "extractive_fallback", True)
+    response = asyncio.run(client.request("POST", "/summarize", {"text": REPORT + " Fallback on."}))
+    body = response.json()
+    assert response.status == 200
+    assert body["fallback"] is True
+    assert body["model"] == "extractive"
+    assert "503" in body["fallback_reason"]
+
+
+def test_no_fallback_when_disabled_or_for_permanent_errors(client, summarizer, unavailable_model, monkeypatch):
+    async def scenario():
+        disabled = await client.request("POST", "/summarize", {"text": REPORT + " Fallback off."})
+        monkeypatch.setattr(summarizer, "extractive_fallback", True)
+        monkeypatch.setattr(unavailable_model, "error_message", "400 Invalid argument (fake backend)")
+        permanent = await client.request("POST", "/summarize", {"text": REPORT + " Permanent error."})
+        return disabled, permanent
+
+    disabled, permanent = asyncio.run(scenario())
+    assert disabled.status == permanent.status == 500
+    assert "503" in disabled.json()["detail"]
+    assert "400" in permanent.json()["detail"]
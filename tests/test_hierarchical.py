@@ -0,0 +1,33 @@
+import asyncio
+
+
+def section(name: str) -> str:
+    return " ".join(f"{name} sentence {index} describes the quarterly results in detail." for index in range(8))
+
+
+def test_long_text_is_summarized_chunk_by_chunk(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "chunk_tokens", 150)
+    text = "\n\n".join(section(f"long{index}") for index in range(4))
+    response = asyncio.run(client.request("POST", "/summarize", {"text": text, "mode": "hierarchical"}))
+    assert response.status == 200
+    body = response.json()
+    assert body["mode"] == "hierarchical"
+    assert body["chunks"] > 1
+    assert body["reduce_levels"] >= 1
+    assert body["summary"]
+
+
+def test_rerun_reuses_unchanged_chunks(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "chunk_tokens", 150)
+    paragraphs = [section(f"hierarchy{index}") for index in range(4)]
+
+    async def scenario():
+        first = await client.request("POST", "/summarize", {"text": "\n\n".join(paragraphs), "mode": "hierarchical"})
+        edited = "\n\n".join(paragraphs[:3] + [section("edited")])
+        second = await client.request("POST", "/summarize", {"text": edited, "mode": "hierarchical"})
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.status == second.status == 200
+    assert second.json()["chunk_cache_hits"] > first.json()["chunk_cache_hits"]
+    assert second.json()["usage"]["input_tokens"] < first.json()["usage"]["input_tokens"]
@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+
+from gemini_stub_server import StubHandler, StubServer
+from services.backends import GeminiRESTBackend, GenerationError
+from services.http_pool import ConnectionPool, PoolTimeout
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(("127.0.0.1", 0), latency_ms=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_pool(server, **options):
+    host, port = server.server_address[:2]
+    return ConnectionPool(f"http://{host}:{port}", **options)
+
+
+def test_sequential_requests_reuse_one_connection(stub):
+    pool = make_pool(stub)
+    for _ in range(5):
+        status, _ = pool.request("POST", "/v1beta/models/stub:generateContent", body=b"{}", headers=HEADERS)
+        assert status == 200
+
+    assert stub.stats()["connections"] == 1
+    assert stub.stats()["requests"] == 5
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"], stats["idle"], stats["in_use"]) == (1, 4, 1, 0)
+    pool.close()
+    assert pool.stats()["open"] == 0
+
+
+def test_concurrent_requests_never_exceed_the_pool_size(stub):
+    stub.latency_ms = 50
+    pool = make_pool(stub, max_connections=2)
+    statuses = []
+
+    def call():
+        statuses.append(pool.request("POST", "/v1beta/models/stub:generateContent", body=b"{}",
+                                     headers=HEADERS, timeout=5)[0])
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 6
+    assert stub.stats()["connections"] == 2
+    assert pool.stats()["waits"] > 0
+
+
+def test_exhausted_pool_times_out_waiting_for_a_connection(stub):
+    stub.latency_ms = 300
+    pool = make_pool(stub, max_connections=1)
+    holder = threading.Thread(target=pool.request, args=("POST", "/v1beta/models/stub:generateContent"),
+                              kwargs={"body": b"{}", "headers": HEADERS})
+    holder.start()
+    try:
+        while pool.stats()["in_use"] == 0:
+            threading.Event().wait(0.005)
+        with pytest.raises(PoolTimeout, match="^504"):
+            pool.request("GET", "/v1beta/models/stub", timeout=0.05)
+    finally:
+        holder.join()
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["open"] == 1
+
+
+def test_connection_the_server_will_close_is_not_kept(stub):
+    class ClosingHandler(StubHandler):
+        protocol_version = "HTTP/1.0"  # no keep-alive: the server closes after each response
+
+    stub.RequestHandlerClass = ClosingHandler
+    pool = make_pool(stub)
+    for _ in range(3):
+        assert pool.request("GET", "/v1beta/models/stub")[0] == 200
+
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"], stats["open"], stats["idle"]) == (3, 0, 0, 0)
+    assert stub.stats()["connections"] == 3
+
+
+def test_connection_closed_while_idle_is_retried_on_a_new_one(stub):
+    pool = make_pool(stub)
+    # The server closes after answering, but the response does not say so
+    assert pool.request("GET", "/v1beta/models/stub", headers={"Connection": "close"})[0] == 200
+    assert pool.stats()["idle"] == 1
+
+    assert pool.request("GET", "/v1beta/models/stub")[0] == 200
+    stats = pool.stats()
+    assert stats["stale_retries"] == 1
+    assert (stats["open"], stats["idle"]) == (1, 1)
+
+
+def test_stream_returns_its_connection_only_when_read_to_the_end(stub):
+    pool = make_pool(stub)
+    path = "/v1beta/models/stub:streamGenerateContent?alt=sse"
+    body = b'{"generationConfig": {"maxOutputTokens": 40}}'
+
+    lines = list(pool.stream_lines("POST", path, body=body, headers=HEADERS))
+    assert lines[0] == b"200"
+    assert sum(line.startswith(b"data:") for line in lines) == 6
+    assert pool.stats()["idle"] == 1
+
+    abandoned = pool.stream_lines("POST", path, body=body, headers=HEADERS)
+    assert next(abandoned) == b"200"
+    abandoned.close()
+    stats = pool.stats()
+    assert (stats["reused"], stats["open"], stats["idle"], stats["in_use"]) == (1, 0, 0, 0)
+
+
+def test_rest_backend_generates_and_streams_over_the_pool(stub):
+    pool = make_pool(stub)
+    backend = GeminiRESTBackend("stub", pool, api_key="test", prewarm=1)
+    backend.warm_up()
+
+    result = backend.generate("x" * 400, max_tokens=20, temperature=0.3, timeout=5)
+    assert result.text.startswith("Stub summary of 400 prompt characters.")
+    assert result.input_tokens == 100
+    assert result.output_tokens > 0
+
+    chunks = list(backend.generate_stream("x" * 40, max_tokens=20, temperature=0.3, timeout=5))
+    assert len(chunks) == 3
+    assert "".join(chunks).startswith("Stub summary of 40 prompt characters.")
+
+    assert stub.stats()["connections"] == 1
+    assert pool.stats()["reused"] == 3
+
+
+def test_rest_backend_raises_upstream_errors_with_their_status(stub):
+    stub.error_rate = 1.0
+    backend = GeminiRESTBackend("stub", make_pool(stub), api_key="test")
+
+    with pytest.raises(GenerationError, match="^503 UNAVAILABLE") as error:
+        backend.generate("text", max_tokens=20, temperature=0.3, timeout=5)
+    assert error.value.status == 503
+    with pytest.raises(GenerationError) as error:
+        list(backend.generate_stream("text", max_tokens=20, temperature=0.3, timeout=5))
+    assert error.value.status == 503
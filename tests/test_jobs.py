@@ -0,0 +1,226 @@
+import asyncio
+import time
+
+import pytest
+
+from services.jobs import JobDeferred, JobQueue, TransientJobError, check_callback_url
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+
+async def echo(payload: dict) -> dict:
+    return {"echo": payload}
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, statuses=("succeeded", "failed"), timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} stayed {job['status']}")
+
+
+def test_jobs_run_interactive_before_batch(state_path):
+    order = []
+
+    async def record(payload):
+        order.append(payload["name"])
+        return {}
+
+    async def scenario():
+        queue = JobQueue(record, path=state_path, workers=1, poll_interval=0.01)
+        jobs = [
+            await queue.submit({"name": "batch"}, priority="batch"),
+            await queue.submit({"name": "interactive"}, priority="interactive"),
+        ]
+        await queue.start()
+        try:
+            for job in jobs:
+                await wait_for_status(queue, job["id"])
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+    assert order == ["interactive", "batch"]
+
+
+def test_transient_failures_are_retried_with_backoff(state_path):
+    async def flaky(payload):
+        raise TransientJobError("503 upstream unavailable")
+
+    async def scenario():
+        queue = JobQueue(flaky, path=state_path, workers=1, poll_interval=0.01, max_attempts=2)
+        job = await queue.submit({})
+        await queue.start()
+        while queue.retried == 0:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue, await queue.get(job["id"])
+
+    queue, job = asyncio.run(scenario())
+    # Queued again, but not due before its backoff
+    assert job["status"] == "queued"
+    assert job["attempts"] == 1
+    assert "503" in job["error"]
+    assert queue.retried == 1
+    assert queue._claim() is None
+
+
+def test_deferred_jobs_wait_without_using_up_attempts(state_path):
+    runs = []
+
+    async def shed_then_succeed(payload):
+        runs.append(len(runs))
+        if len(runs) <= 3:
+            raise JobDeferred(0.01, "server overloaded")
+        return {"runs": len(runs)}
+
+    async def scenario():
+        queue = JobQueue(shed_then_succeed, path=state_path, workers=1, poll_interval=0.01, max_attempts=2)
+        job = await queue.submit({})
+        await queue.start()
+        try:
+            return queue, await wait_for_status(queue, job["id"])
+        finally:
+            await queue.stop()
+
+    queue, job = asyncio.run(scenario())
+    # Deferred more often than max_attempts allows, and still run to completion
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
+    assert job["result"] == {"runs": 4}
+    assert queue.stats()["deferred"] == 3
+    assert queue.retried == 0
+
+
+def test_running_job_is_not_rerun_by_a_sibling_worker(state_path):
+    calls = []
+
+    async def slow(payload):
+        calls.append(payload)
+        await asyncio.sleep(0.3)
+        return {}
+
+    async def scenario():
+        first = JobQueue(slow, path=state_path, workers=1, poll_interval=0.01, lease=0.15)
+        job = await first.submit({"n": 1})
+        await first.start()
+        await asyncio.sleep(0.05)
+        # A second worker process starts while the job runs (renewed lease)
+        sibling = JobQueue(slow, path=state_path, workers=1, poll_interval=0.01, lease=0.15)
+        await sibling.start()
+        done = await wait_for_status(first, job["id"])
+        await sibling.stop()
+        await first.stop()
+        return done
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
+    assert len(calls) == 1
+
+
+def test_job_of_a_dead_worker_is_reclaimed_after_its_lease(state_path):
+    async def scenario():
+        dead = JobQueue(echo, path=state_path, lease=0.05)
+        job = await dead.submit({"n": 1})
+        assert dead._claim()[0] == job["id"]  # claimed, then the process "dies"
+
+        survivor = JobQueue(echo, path=state_path, workers=1, poll_interval=0.01, lease=0.05)
+        assert survivor._claim() is None  # lease still held
+        await asyncio.sleep(0.06)
+        await survivor.start()
+        finished = await wait_for_status(survivor, job["id"])
+        await survivor.stop()
+        # The dead worker can no longer record an outcome for the job
+        assert not dead._finish(job["id"], "failed", error="late")
+        return finished
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+    assert job["result"] == {"echo": {"n": 1}}
+
+
+def test_stop_requeues_the_jobs_it_was_running(state_path):
+    async def hang(payload):
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        queue = JobQueue(hang, path=state_path, workers=1, poll_interval=0.01)
+        job = await queue.submit({})
+        await queue.start()
+        await wait_for_status(queue, job["id"], statuses=("running",))
+        await queue.stop()
+        return await queue.get(job["id"])
+
+    assert asyncio.run(scenario())["status"] == "queued"
+
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "gopher://example.com/",
+    "http://127.0.0.1:8080/hook",
+    "http://10.0.0.5/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/hook",
+    "http://0.0.0.0/hook",
+    "/relative/path",
+])
+def test_callback_urls_to_internal_addresses_are_refused(url):
+    with pytest.raises(ValueError):
+        check_callback_url(url)
+
+
+def test_callback_urls_to_public_hosts_are_accepted():
+    check_callback_url("https://hooks.example.com/done")
+    check_callback_url("http://8.8.8.8/hook")
+
+
+def test_callback_allowlist_is_exclusive():
+    check_callback_url("http://internal-hooks:9000/done", {"internal-hooks"})
+    with pytest.raises(ValueError):
+        check_callback_url("https://hooks.example.com/done", {"internal-hooks"})
+
+
+def test_submit_refuses_internal_callbacks(state_path):
+    async def scenario():
+        queue = JobQueue(echo, path=state_path)
+        with pytest.raises(ValueError):
+            await queue.submit({}, callback_url="http://127.0.0.1/x")
+        assert queue.stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_jobs_endpoint_refuses_internal_callbacks(client):
+    response = asyncio.run(client.request(
+        "POST", "/jobs", {"items": [{"text": TEXT}], "callback_url": "http://127.0.0.1/hook"}
+    ))
+    assert response.status == 422
+    assert "not a public address" in response.json()["detail"]
+
+
+def test_submitted_job_runs_to_completion(client, main_module, monkeypatch):
+    # The lifespan builds its own service and shuts it down on exit
+    monkeypatch.setattr(main_module, "_summarizer", None)
+
+    async def scenario():
+        async with main_module.app.router.lifespan_context(main_module.app):
+            submitted = await client.request("POST", "/jobs", {"items": [{"text": TEXT + "Job test."}]})
+            assert submitted.status == 202
+            job_id = submitted.json()["id"]
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                job = (await client.request("GET", f"/jobs/{job_id}")).json()
+                if job["status"] in ("succeeded", "failed"):
+                    return job
+                await asyncio.sleep(0.02)
+            raise AssertionError(f"job {job_id} stayed {job['status']}")
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "succeeded"
+    assert job["result"]["succeeded"] == 1
+    assert asyncio.run(client.request("GET", "/jobs/unknown")).status == 404
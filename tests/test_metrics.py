@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+from services.metrics import REGISTRY, MetricsRegistry
+
+
+def test_scrape_reports_request_latency_and_component_stats(client):
+    async def scenario():
+        await client.request("GET", "/health")
+        return await client.request("GET", "/metrics")
+
+    response = asyncio.run(scenario())
+    assert response.status == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.body.decode()
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert "summarizer_jobs_queue_depth" in text
+
+
+def test_scrape_collects_component_stats_off_the_event_loop(client, monkeypatch):
+    threads = []
+
+    def collector():
+        threads.append(threading.get_ident())
+        return [("test_collector_calls", "test collector", {(): len(threads)})]
+
+    monkeypatch.setattr(REGISTRY, "_collectors", REGISTRY._collectors + [collector])
+
+    async def scenario():
+        return threading.get_ident(), await client.request("GET", "/metrics")
+
+    loop_thread, response = asyncio.run(scenario())
+    assert "test_collector_calls 1" in response.body.decode()
+    assert threads and loop_thread not in threads
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_escaped_total", "Labels with special characters")
+    counter.inc(route='say "hi"\\now\nthen')
+    assert 'test_escaped_total{route="say \\"hi\\"\\\\now\\nthen"} 1' in registry.render()
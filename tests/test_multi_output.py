@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+from services.backends import FakeBackend, GenerationResult
+from services.multi_output import parse_sections, response_schema
+from services.tokens import TokenEstimator
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+OUTPUTS = ["concise", "bullet", "key_points"]
+
+
+def test_well_formed_response_is_parsed_and_formatted():
+    raw = json.dumps({
+        "concise": "  Revenue grew.  ",
+        "bullet": ["- Revenue up", "* Costs flat"],
+        "key_points": ["1. Revenue", "2) Costs", "Outlook", "Extra"],
+    })
+    sections, invalid = parse_sections(raw, OUTPUTS, num_points=3)
+    assert invalid == []
+    assert sections == {
+        "concise": "Revenue grew.",
+        "bullet": "- Revenue up\n- Costs flat",
+        "key_points": "1. Revenue\n2. Costs\n3. Outlook",
+    }
+
+
+def test_fenced_json_and_newline_separated_items_are_accepted():
+    raw = '```json\n{"concise": "Short.", "bullet": "- one\\n- two", "key_points": ["A"]}\n```'
+    sections, invalid = parse_sections(raw, OUTPUTS, num_points=5)
+    assert invalid == []
+    assert sections["bullet"] == "- one\n- two"
+
+
+def test_missing_and_invalid_sections_are_reported():
+    raw = json.dumps({"concise": "", "bullet": ["", "  - "], "detailed": 42})
+    sections, invalid = parse_sections(raw, OUTPUTS + ["detailed"], num_points=5)
+    assert sections == {}
+    assert invalid == ["concise", "bullet", "key_points", "detailed"]
+
+
+@pytest.mark.parametrize("raw", ["not json", "[1, 2]", '{"concise": "cut off'])
+def test_malformed_responses_invalidate_every_section(raw):
+    assert parse_sections(raw, OUTPUTS, num_points=5) == ({}, OUTPUTS)
+
+
+def test_schema_requires_every_output():
+    schema = response_schema(OUTPUTS)
+    assert schema["required"] == OUTPUTS
+    assert schema["properties"]["bullet"]["type"] == "ARRAY"
+    assert schema["properties"]["concise"]["type"] == "STRING"
+
+
+class PartialBackend(FakeBackend):
+    """Answers the multi-output prompt without a bullet section; single-style calls succeed"""
+
+    def generate(self, prompt, max_tokens, temperature, timeout=None, source_text=None, response_schema=None,
+                 prefix=None):
+        if response_schema is not None:
+            text = json.dumps({"concise": "Revenue grew.", "key_points": ["Revenue", "Costs"]})
+            return GenerationResult(text, input_tokens=100, output_tokens=20)
+        return GenerationResult("- Revenue grew\n- Costs stayed flat", input_tokens=40, output_tokens=8)
+
+
+@pytest.fixture
+def partial_backend(summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "backend", PartialBackend(latency_ms=1, model_name="partial"))
+    monkeypatch.setattr(summarizer, "tokens", TokenEstimator())
+
+
+def test_one_call_serves_every_output(client):
+    response = asyncio.run(client.request("POST", "/summarize/multi", {"text": TEXT + "All outputs."}))
+    body = response.json()
+    assert response.status == 200
+    assert set(body["outputs"]) == set(OUTPUTS)
+    assert body["fallback_outputs"] == []
+    assert body["attempts"] == 1
+
+
+def test_invalid_section_is_regenerated_and_its_usage_added(client, partial_backend):
+    response = asyncio.run(client.request("POST", "/summarize/multi", {"text": TEXT + "Partial outputs."}))
+    body = response.json()
+    assert response.status == 200
+    assert body["fallback_outputs"] == ["bullet"]
+    assert body["outputs"]["concise"] == "Revenue grew."
+    assert body["outputs"]["key_points"] == "1. Revenue\n2. Costs"
+    assert body["outputs"]["bullet"].startswith("- Revenue grew")
+    assert body["attempts"] == 2
+    # The multi-output call plus the one call that regenerated the bullet section
+    assert body["usage"] == {"input_tokens": 140, "output_tokens": 28}
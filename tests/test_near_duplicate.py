@@ -0,0 +1,80 @@
+import asyncio
+import random
+
+from services.near_duplicate import NearDuplicateIndex
+
+SCOPE = ("fake", "summarize_text", (("style", "concise"),))
+
+
+def article(seed: int, words: int = 400) -> str:
+    vocabulary = [f"word{index}" for index in range(2000)]
+    generator = random.Random(seed)
+    return " ".join(generator.choice(vocabulary) for _ in range(words))
+
+
+def edited(text: str) -> str:
+    """The same text with one word changed"""
+    words = text.split()
+    words[len(words) // 2] = "edited"
+    return " ".join(words)
+
+
+def test_near_identical_text_matches_and_different_text_does_not():
+    index = NearDuplicateIndex(threshold=0.9)
+    original = article(1)
+    index.add(index.sketch(original), SCOPE, {"success": True, "summary": "first"})
+
+    match = index.lookup(index.sketch(edited(original)), SCOPE)
+    assert match is not None
+    result, similarity = match
+    assert result["summary"] == "first"
+    assert similarity >= 0.9
+
+    assert index.lookup(index.sketch(article(2)), SCOPE) is None
+    assert index.stats()["hits"] == 1
+
+
+def test_entries_only_match_within_their_scope():
+    index = NearDuplicateIndex()
+    text = article(3)
+    index.add(index.sketch(text), SCOPE, {"summary": "concise"})
+    other_scope = ("fake", "summarize_text", (("style", "detailed"),))
+    assert index.lookup(index.sketch(text), other_scope) is None
+
+
+def test_index_is_bounded_by_bytes():
+    index = NearDuplicateIndex(max_bytes=20000)
+    large_result = {"summary": "s" * 4000}
+    for seed in range(20):
+        index.add(index.sketch(article(seed)), SCOPE, large_result)
+    stats = index.stats()
+    assert stats["bytes"] <= 20000
+    assert 0 < stats["entries"] < 20
+    assert stats["evictions"] == 20 - stats["entries"]
+    # The most recent entry survives, the oldest was evicted
+    assert index.lookup(index.sketch(article(19)), SCOPE) is not None
+    assert index.lookup(index.sketch(article(0)), SCOPE) is None
+
+
+def test_index_is_bounded_by_entries():
+    index = NearDuplicateIndex(max_entries=3)
+    for seed in range(5):
+        index.add(index.sketch(article(seed)), SCOPE, {"summary": str(seed)})
+    assert index.stats()["entries"] == 3
+    assert index.stats()["evictions"] == 2
+
+
+def test_reused_result_reports_zero_usage(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "near_duplicates", NearDuplicateIndex())
+    text = article(42)
+
+    async def scenario():
+        first = await client.request("POST", "/summarize", {"text": text})
+        second = await client.request("POST", "/summarize", {"text": edited(text)})
+        return first.json(), second.json()
+
+    first, second = asyncio.run(scenario())
+    assert first["usage"]["input_tokens"] > 0
+    assert second["near_duplicate"]["similarity"] >= 0.9
+    assert second["summary"] == first["summary"]
+    assert second["usage"] == {"input_tokens": 0, "output_tokens": 0}
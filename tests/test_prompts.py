@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services.backends import GeminiBackend
+from services.prompts import ContextCache, PromptRegistry
+
+PREFIX = "Follow these instructions carefully. " * 20
+
+
+def custom(body: str) -> dict:
+    return {"summary.concise": {"v2": {"prefix": "Summarize briefly.\n\n", "body": body}}}
+
+
+def test_fingerprint_changes_when_template_text_changes_without_a_new_version():
+    first = PromptRegistry(custom("{text}"), {"summary.concise": "v2"})
+    edited = PromptRegistry(custom("Text:\n{text}"), {"summary.concise": "v2"})
+    assert first.fingerprint != edited.fingerprint
+    assert first.fingerprint == PromptRegistry(custom("{text}"), {"summary.concise": "v2"}).fingerprint
+
+
+def test_fingerprint_follows_the_selected_version():
+    default = PromptRegistry(custom("{text}"))
+    selected = PromptRegistry(custom("{text}"), {"summary.concise": "v2"})
+    assert default.fingerprint == PromptRegistry().fingerprint
+    assert default.fingerprint != selected.fingerprint
+
+
+def test_examples_become_part_of_the_prefix():
+    registry = PromptRegistry(
+        {"key_points": {"v2": {"body": "{num_points} points:\n{text}",
+                               "examples": [{"input": "A long text", "output": "1. A point"}]}}},
+        {"key_points": "v2"}
+    )
+    prompt = registry.get("key_points").render(text="Body", num_points=3)
+    assert prompt.startswith("Example 1:\nText: A long text\nOutput: 1. A point")
+    assert prompt.endswith("3 points:\nBody")
+
+
+def test_invalid_templates_are_rejected_at_startup():
+    with pytest.raises(ValueError, match="unknown fields"):
+        PromptRegistry(custom("{text} for {audience}"))
+    with pytest.raises(ValueError, match="not defined"):
+        PromptRegistry(versions={"summary.concise": "v9"})
+
+
+class NotFound(Exception):
+    code = 404
+
+
+class StubSDK:
+    """Stand-in for google.generativeai: records each call and which cached content it used"""
+
+    def __init__(self):
+        self.calls = []
+        self.contents = {}
+        self.expired = set()
+        self.types = SimpleNamespace(GenerationConfig=dict)
+        self.caching = SimpleNamespace(CachedContent=SimpleNamespace(create=self.create))
+        self.GenerativeModel = SimpleNamespace(from_cached_content=lambda name: StubModel(self, name))
+
+    def create(self, model, contents, ttl):
+        name = f"cachedContents/{len(self.contents) + 1}"
+        self.contents[name] = "".join(contents)
+        return SimpleNamespace(name=name)
+
+
+class StubModel:
+    def __init__(self, sdk, cached_content=None):
+        self.sdk = sdk
+        self.cached_content = cached_content
+
+    def generate_content(self, text, generation_config=None, request_options=None):
+        self.sdk.calls.append((self.cached_content, text))
+        if self.cached_content in self.sdk.expired:
+            raise NotFound("404 CachedContent not found")
+        cached = len(self.sdk.contents[self.cached_content]) // 4 if self.cached_content else 0
+        usage = SimpleNamespace(prompt_token_count=cached + len(text) // 4, candidates_token_count=2,
+                                cached_content_token_count=cached)
+        return SimpleNamespace(text="A summary.", usage_metadata=usage)
+
+
+def sdk_backend(min_tokens=100):
+    sdk = StubSDK()
+    backend = GeminiBackend("stub", context_cache=ContextCache(min_tokens=min_tokens))
+    backend._genai = sdk
+    backend._model = StubModel(sdk)
+    return backend, sdk
+
+
+def test_sdk_backend_sends_a_cached_prefix_once():
+    backend, sdk = sdk_backend()
+    for body in ("First text", "Second text"):
+        result = backend.generate(PREFIX + body, max_tokens=20, temperature=0.3, prefix=PREFIX)
+        assert result.text == "A summary."
+
+    assert sdk.contents == {"cachedContents/1": PREFIX}
+    assert sdk.calls == [("cachedContents/1", "First text"), ("cachedContents/1", "Second text")]
+    stats = backend.context_cache.stats()
+    assert (stats["created"], stats["hits"], stats["cached_input_tokens"]) == (1, 1, 2 * (len(PREFIX) // 4))
+
+
+def test_sdk_backend_resends_the_full_prompt_when_the_cache_expired_upstream():
+    backend, sdk = sdk_backend()
+    backend.generate(PREFIX + "First text", max_tokens=20, temperature=0.3, prefix=PREFIX)
+    sdk.expired.add("cachedContents/1")
+
+    backend.generate(PREFIX + "Second text", max_tokens=20, temperature=0.3, prefix=PREFIX)
+    assert sdk.calls[-2:] == [("cachedContents/1", "Second text"), (None, PREFIX + "Second text")]
+
+    backend.generate(PREFIX + "Third text", max_tokens=20, temperature=0.3, prefix=PREFIX)
+    assert sdk.calls[-1] == ("cachedContents/2", "Third text")
+
+
+def test_sdk_backend_sends_short_prefixes_in_full():
+    backend, sdk = sdk_backend(min_tokens=4096)
+    backend.generate(PREFIX + "Text", max_tokens=20, temperature=0.3, prefix=PREFIX)
+    assert sdk.contents == {}
+    assert sdk.calls == [(None, PREFIX + "Text")]
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from services.rate_limit import AdaptiveConcurrency, RateLimiter, RateLimitExceeded
+
+
+def test_aimd_halves_on_overload_and_grows_on_success():
+    concurrency = AdaptiveConcurrency(initial=8, minimum=1, maximum=16)
+    concurrency.on_overload()
+    assert concurrency.limit == 4
+    for _ in range(4):
+        concurrency.on_success()
+    assert concurrency.limit == pytest.approx(5, abs=0.1)
+    for _ in range(10):
+        concurrency.on_overload()
+    assert concurrency.limit == 1
+    assert concurrency.backoffs == 11
+
+
+def test_aimd_limit_never_exceeds_maximum():
+    concurrency = AdaptiveConcurrency(initial=4, maximum=4)
+    for _ in range(100):
+        concurrency.on_success()
+    assert concurrency.limit == 4
+
+
+def test_waiter_gives_up_with_rate_limit_exceeded():
+    async def scenario():
+        concurrency = AdaptiveConcurrency(initial=1)
+        await concurrency.acquire(timeout=1.0)
+        with pytest.raises(RateLimitExceeded):
+            await concurrency.acquire(timeout=0.01)
+        concurrency.release()
+        await concurrency.acquire(timeout=0.01)
+        assert concurrency.stats()["in_flight"] == 1
+
+    asyncio.run(scenario())
+
+
+async def _serve_in_order(concurrency: AdaptiveConcurrency, waiters: list) -> list:
+    """Queue (flow, weight) waiters behind one held slot and return the flows in the order served"""
+    order = []
+
+    async def wait(flow, weight):
+        await concurrency.acquire(timeout=5.0, flow=flow, weight=weight)
+        order.append(flow)
+        await asyncio.sleep(0)
+        concurrency.release()
+
+    await concurrency.acquire(timeout=1.0)
+    tasks = []
+    for flow, weight in waiters:
+        tasks.append(asyncio.create_task(wait(flow, weight)))
+        await asyncio.sleep(0)
+    concurrency.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_a_burst_cannot_starve_another_flow():
+    concurrency = AdaptiveConcurrency(initial=1, maximum=1)
+    waiters = [("bulk", 1.0)] * 10 + [("interactive", 1.0)]
+    order = asyncio.run(_serve_in_order(concurrency, waiters))
+    # The late waiter is served after at most one of the ten queued before it
+    assert order.index("interactive") <= 1
+
+
+def test_weights_share_slots_in_proportion():
+    concurrency = AdaptiveConcurrency(initial=1, maximum=1)
+    waiters = [("light", 1.0)] * 6 + [("heavy", 2.0)] * 6
+    order = asyncio.run(_serve_in_order(concurrency, waiters))
+    first_six = order[:6]
+    assert first_six.count("heavy") == 4
+    assert first_six.count("light") == 2
+
+
+def test_single_flow_is_fifo():
+    concurrency = AdaptiveConcurrency(initial=1, maximum=1)
+    served = []
+
+    async def scenario():
+        await concurrency.acquire(timeout=1.0)
+
+        async def wait(index):
+            await concurrency.acquire(timeout=5.0, flow="only")
+            served.append(index)
+            concurrency.release()
+
+        tasks = []
+        for index in range(5):
+            tasks.append(asyncio.create_task(wait(index)))
+            await asyncio.sleep(0)
+        concurrency.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert served == [0, 1, 2, 3, 4]
+
+
+def test_rate_limiter_rejects_reservations_past_the_timeout():
+    async def scenario():
+        limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000000)
+        await limiter.acquire(10, timeout=0)
+        await limiter.acquire(10, timeout=0)
+        with pytest.raises(RateLimitExceeded) as caught:
+            await limiter.acquire(10, timeout=0)
+        assert caught.value.retry_after > 0
+        assert limiter.stats()["rejected"] == 1
+
+    asyncio.run(scenario())
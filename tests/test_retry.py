@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from services.admission import Overloaded
+from services.backends import GenerationError
+from services.rate_limit import RateLimitExceeded, is_rate_limit_error
+from services.retry import DeadlineExceeded, call_with_retries, error_status, is_transient_error
+
+
+@pytest.mark.parametrize("message, status", [
+    ("503 UNAVAILABLE: The model is overloaded", 503),
+    ("  429 Resource has been exhausted", 429),
+    ("Invalid connection string 1500321", None),
+    ("Quota project 4291 not found", None),
+    ("Prompt of 5030 characters was blocked", None),
+    ("Field 'max_output_tokens' must be at most 500", None),
+])
+def test_error_status_reads_only_a_leading_status(message, status):
+    assert error_status(RuntimeError(message)) == status
+
+
+def test_error_status_prefers_the_status_attribute():
+    assert error_status(GenerationError("model unavailable", status=502)) == 502
+    assert error_status(RateLimitExceeded(retry_after=1.0)) == 429
+    assert error_status(DeadlineExceeded(5.0, 2)) == 504
+    assert error_status(Overloaded(retry_after=1.0)) == 503
+
+
+@pytest.mark.parametrize("error, transient", [
+    (TimeoutError("read timed out"), True),
+    (ConnectionResetError("peer reset"), True),
+    (GenerationError("unavailable", status=503), True),
+    (GenerationError("bad request", status=400), False),
+    (RuntimeError("500 Internal error"), True),
+    (ValueError("Request carries 500 tokens"), False),
+    (RuntimeError("Invalid connection string 1500321"), False),
+    (RateLimitExceeded(retry_after=2.0), True),
+    (Overloaded(retry_after=2.0), True),
+])
+def test_is_transient_error(error, transient):
+    assert is_transient_error(error) is transient
+
+
+def test_rate_limit_errors_are_recognised_by_status():
+    assert is_rate_limit_error(RateLimitExceeded(retry_after=1.0))
+    assert is_rate_limit_error(GenerationError("Resource exhausted", status=429))
+    assert not is_rate_limit_error(RuntimeError("Quota project 4291 not found"))
+
+
+def test_transient_failures_are_retried_until_success():
+    calls = []
+
+    async def attempt(remaining):
+        calls.append(remaining)
+        if len(calls) < 3:
+            raise GenerationError("unavailable", status=503)
+        return "ok"
+
+    result, attempts = asyncio.run(call_with_retries(attempt, deadline=5.0, max_attempts=3, base_delay=0.001))
+    assert (result, attempts) == ("ok", 3)
+
+
+def test_permanent_failures_are_not_retried():
+    calls = 0
+
+    async def attempt(remaining):
+        nonlocal calls
+        calls += 1
+        raise GenerationError("invalid argument", status=400)
+
+    with pytest.raises(GenerationError) as caught:
+        asyncio.run(call_with_retries(attempt, deadline=5.0, max_attempts=3, base_delay=0.001))
+    assert calls == 1
+    assert caught.value.attempts == 1
+
+
+def test_deadline_bounds_all_attempts():
+    async def attempt(remaining):
+        await asyncio.sleep(remaining + 1)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(call_with_retries(attempt, deadline=0.05, max_attempts=3, base_delay=0.001))
+
+
+def test_upstream_timeouts_are_retried_while_the_deadline_allows():
+    calls = []
+
+    async def attempt(remaining):
+        calls.append(remaining)
+        if len(calls) == 1:
+            raise TimeoutError("504 Deadline Exceeded (fake backend)")
+        return "ok"
+
+    result, attempts = asyncio.run(call_with_retries(attempt, deadline=5.0, max_attempts=3, base_delay=0.001))
+    assert (result, attempts) == ("ok", 2)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from services.backends import FakeBackend
+from services.routing import ModelRouter
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+
+def pool(**primary) -> ModelRouter:
+    return ModelRouter([
+        FakeBackend(latency_ms=1, model_name="flash", **primary),
+        FakeBackend(latency_ms=1, model_name="pro"),
+    ])
+
+
+def names(backends) -> list:
+    return [backend.model_name for backend in backends]
+
+
+def test_requests_are_routed_by_style_and_input_length():
+    router = ModelRouter(
+        [FakeBackend(model_name="flash"), FakeBackend(model_name="lite"), FakeBackend(model_name="pro")],
+        long_input_tokens=1000
+    )
+    assert names(router.candidates("concise", 10)) == ["flash", "lite", "pro"]
+    assert names(router.candidates("detailed", 10)) == ["pro", "flash", "lite"]
+    assert names(router.candidates("concise", 5000)) == ["pro", "flash", "lite"]
+    assert router.name == "flash+lite+pro"
+
+
+def test_models_over_the_latency_slo_move_behind_the_others():
+    router = ModelRouter([FakeBackend(model_name="flash"), FakeBackend(model_name="pro")], latency_slo=0.5)
+    for _ in range(20):
+        router.record("flash", 2.0)
+        router.record("pro", 0.1)
+    assert names(router.candidates("concise")) == ["pro", "flash"]
+    assert router.stats()["latency_p95_seconds"]["flash"] == pytest.approx(2.0)
+
+
+def test_router_needs_a_backend():
+    with pytest.raises(ValueError):
+        ModelRouter([])
+
+
+def test_transient_failure_fails_over_to_the_next_model(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "router", pool(error_rate=1.0))
+    response = asyncio.run(client.request("POST", "/summarize", {"text": TEXT + "Failover."}))
+    assert response.status == 200
+    body = response.json()
+    assert body["model"] == "pro"
+    assert body["attempts"] == 2
+
+    stats = summarizer.router.stats()
+    assert stats["calls"] == {"flash": 1, "pro": 1}
+    assert stats["errors"] == {"flash": 1}
+    assert stats["failovers"] == {"flash": 1}
+    assert stats["served"] == {"pro": 1}
+
+
+def test_healthy_primary_serves_without_failover(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "router", pool())
+    body = asyncio.run(client.request("POST", "/summarize", {"text": TEXT + "Primary."})).json()
+    assert (body["model"], body["attempts"]) == ("flash", 1)
+    assert summarizer.router.stats()["failovers"] == {}
+
+
+def test_permanent_errors_do_not_fail_over(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "router", pool(error_rate=1.0, error_message="400 Invalid argument (fake backend)"))
+    response = asyncio.run(client.request("POST", "/summarize", {"text": TEXT + "Permanent."}))
+    assert response.status == 500
+    assert summarizer.router.stats()["calls"] == {"flash": 1}
+
+
+def test_detailed_summaries_go_to_the_largest_model(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer, "router", pool())
+    body = asyncio.run(client.request("POST", "/summarize", {"text": TEXT + "Detailed.", "style": "detailed"})).json()
+    assert body["model"] == "pro"
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.cache import create_cache_from_env
+from services.rate_limit import RateLimitExceeded
+from services.shared_state import SharedRateLimiter, SharedSingleFlight, call_store
+
+
+def test_call_store_runs_blocking_stores_off_the_event_loop():
+    async def scenario():
+        loop_thread = threading.get_ident()
+        in_executor = await call_store(True, threading.get_ident)
+        inline = await call_store(False, threading.get_ident)
+        return loop_thread, in_executor, inline
+
+    loop_thread, in_executor, inline = asyncio.run(scenario())
+    assert in_executor != loop_thread
+    assert inline == loop_thread
+
+
+def test_rate_limit_buckets_are_shared_between_processes(state_path):
+    async def scenario():
+        first = SharedRateLimiter(state_path, requests_per_minute=3, tokens_per_minute=1000000)
+        second = SharedRateLimiter(state_path, requests_per_minute=3, tokens_per_minute=1000000)
+        for limiter in (first, second, first):
+            await limiter.acquire(10, timeout=0)
+        with pytest.raises(RateLimitExceeded):
+            await second.acquire(10, timeout=0)
+        assert first.stats()["requests_available"] < 1
+
+    asyncio.run(scenario())
+
+
+def shared_flights(path: str, cache: dict, lease: float = 60.0, processes: int = 2) -> tuple:
+    """Coalescers on one database, as worker processes would have"""
+    flights = []
+    for owner in (f"worker-{index}" for index in range(1, processes + 1)):
+        flight = SharedSingleFlight(path, lookup=cache.get, lease=lease, poll_interval=0.01, max_poll_interval=0.02)
+        flight.owner = owner
+        flights.append(flight)
+    return tuple(flights)
+
+
+def test_identical_calls_in_two_processes_run_once(state_path):
+    cache = {}
+    leader, follower = shared_flights(state_path, cache)
+    calls = []
+
+    def work(name):
+        async def run():
+            calls.append(name)
+            await asyncio.sleep(0.1)
+            cache["key"] = {"summary": "from the leader"}
+            return cache["key"]
+        return run
+
+    async def scenario():
+        first = asyncio.create_task(leader.do("key", work("leader")))
+        await asyncio.sleep(0.02)
+        second = await follower.do("key", work("follower"))
+        return await first, second
+
+    (first, first_shared), (second, second_shared) = asyncio.run(scenario())
+    assert calls == ["leader"]
+    assert second == first == {"summary": "from the leader"}
+    assert (first_shared, second_shared) == (False, True)
+    assert follower.stats()["remote_coalesced"] == 1
+    assert leader.stats()["in_flight_all_processes"] == 0
+
+
+def test_lease_is_renewed_while_a_long_call_runs(state_path):
+    cache = {}
+    leader, follower = shared_flights(state_path, cache, lease=0.15)
+    calls = []
+
+    def work(name, seconds):
+        async def run():
+            calls.append(name)
+            await asyncio.sleep(seconds)
+            cache["key"] = {"summary": name}
+            return cache["key"]
+        return run
+
+    async def scenario():
+        first = asyncio.create_task(leader.do("key", work("leader", 0.5)))
+        await asyncio.sleep(0.02)
+        second = await follower.do("key", work("follower", 0.0))
+        await first
+        return second
+
+    result, shared = asyncio.run(scenario())
+    # The call outlived its lease several times over; renewal kept the follower waiting
+    assert calls == ["leader"]
+    assert (result, shared) == ({"summary": "leader"}, True)
+
+
+def test_follower_runs_the_call_when_the_leader_fails(state_path):
+    cache = {}
+    leader, follower = shared_flights(state_path, cache)
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("503 upstream unavailable")
+
+    async def succeeding():
+        return {"summary": "follower"}
+
+    async def scenario():
+        first = asyncio.create_task(leader.do("key", failing))
+        await asyncio.sleep(0.01)
+        second = await follower.do("key", succeeding)
+        with pytest.raises(RuntimeError):
+            await first
+        return second
+
+    assert asyncio.run(scenario()) == ({"summary": "follower"}, False)
+
+
+def test_waiter_finds_a_result_stored_just_before_the_lease_is_released(state_path):
+    cache = {}
+    leader, follower = shared_flights(state_path, cache)
+    assert leader._claim("key")
+    lookups = []
+
+    def lookup(key):
+        lookups.append(key)
+        if len(lookups) == 1:
+            # The leader finishes between this lookup and the follower's next lease check
+            cache[key] = {"summary": "from the leader"}
+            leader._release(key)
+            return None
+        return cache.get(key)
+
+    follower.lookup = lookup
+    calls = []
+
+    async def work():
+        calls.append("follower")
+        return {"summary": "recomputed"}
+
+    assert asyncio.run(follower.do("key", work)) == ({"summary": "from the leader"}, True)
+    assert calls == []
+
+
+def test_only_one_waiter_reruns_a_failed_call(state_path):
+    cache = {}
+    leader, first, second = shared_flights(state_path, cache, processes=3)
+    assert leader._claim("key")
+    calls = []
+
+    def work(name):
+        async def run():
+            calls.append(name)
+            await asyncio.sleep(0.1)
+            cache["key"] = {"summary": name}
+            return cache["key"]
+        return run
+
+    async def scenario():
+        waiters = asyncio.gather(first.do("key", work("first")), second.do("key", work("second")))
+        await asyncio.sleep(0.05)
+        leader._release("key")  # the leader failed: no result was stored
+        return await waiters
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results[0][0] == results[1][0] == {"summary": calls[0]}
+
+
+def test_memory_cache_is_refused_with_shared_state(monkeypatch):
+    monkeypatch.setenv("SHARED_STATE", "sqlite")
+    monkeypatch.setenv("SUMMARY_CACHE_BACKEND", "memory")
+    with pytest.raises(ValueError, match="SUMMARY_CACHE_BACKEND=memory"):
+        create_cache_from_env()
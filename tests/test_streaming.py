@@ -0,0 +1,46 @@
+import asyncio
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+
+def test_stream_sends_chunks_then_done(client):
+    response = asyncio.run(client.request("POST", "/summarize/stream", {"text": TEXT + "Stream test."}))
+    assert response.status == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = response.events()
+    assert len(events) > 2
+    assert {name for name, _ in events[:-1]} == {"chunk"}
+    name, done = events[-1]
+    assert name == "done"
+    assert done["success"]
+    assert done["usage"]["output_tokens"] > 0
+    assert "".join(data["text"] for _, data in events[:-1]).startswith("Fake summary")
+
+
+def test_context_and_key_point_streams_end_with_done(client):
+    async def scenario():
+        return (
+            await client.request("POST", "/summarize/context/stream", {"text": TEXT, "context": "investors"}),
+            await client.request("POST", "/summarize/keypoints/stream", {"text": TEXT, "num_points": 3}),
+        )
+
+    context, key_points = asyncio.run(scenario())
+    assert context.events()[-1][0] == key_points.events()[-1][0] == "done"
+    assert context.events()[-1][1]["context"] == "investors"
+    assert key_points.events()[-1][1]["num_points_requested"] == 3
+
+
+def test_upstream_failure_ends_the_stream_with_an_error_event(client, summarizer, monkeypatch):
+    monkeypatch.setattr(summarizer.backend, "error_message", "400 Invalid argument (fake backend)")
+    monkeypatch.setattr(summarizer.backend, "error_rate", 1.0)
+    response = asyncio.run(client.request("POST", "/summarize/stream", {"text": TEXT + "Stream failure."}))
+    assert response.status == 200
+    name, error = response.events()[-1]
+    assert name == "error"
+    assert not error["success"]
+    assert "400" in error["error"]
+
+
+def test_oversized_context_is_rejected_before_any_work(client):
+    response = asyncio.run(client.request("POST", "/summarize/context/stream", {"text": TEXT, "context": "x" * 1001}))
+    assert response.status == 422
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from services.rate_limit import AdaptiveConcurrency, RateLimiter, RateLimitExceeded
+from services.tenants import SharedTenantRegistry, Tenant, TenantRegistry, current_tenant, hash_api_key
+
+TEXT = "The quarterly report shows that revenue grew by ten percent while costs stayed flat. " * 4
+
+
+@pytest.fixture
+def tenants(summarizer, monkeypatch):
+    registry = TenantRegistry(
+        {"app": Tenant("app", requests_per_minute=2)},
+        {hash_api_key("app-key"): "app"}
+    )
+    monkeypatch.setattr(summarizer, "tenants", registry)
+    return registry
+
+
+def test_tenants_are_authenticated_limited_and_charged(client, tenants):
+    async def scenario():
+        headers = {"X-API-Key": "app-key"}
+        return (
+            await client.request("POST", "/summarize", {"text": TEXT + "Tenant test."}),
+            await client.request("POST", "/summarize", {"text": TEXT + "Tenant test."}, headers={"X-API-Key": "wrong"}),
+            await client.request("POST", "/summarize", {"text": TEXT + "Tenant test."}, headers=headers),
+            await client.request("POST", "/summarize", {"text": TEXT + "Tenant two."},
+                                 headers={"Authorization": "Bearer app-key"}),
+            await client.request("POST", "/summarize", {"text": TEXT + "Tenant three."}, headers=headers),
+            await client.request("GET", "/usage", headers=headers),
+            await client.request("GET", "/health"),
+        )
+
+    missing, wrong, first, second, limited, usage, health = asyncio.run(scenario())
+    assert missing.status == wrong.status == 401
+    assert first.status == second.status == 200
+    assert limited.status == 429
+    assert int(limited.headers["retry-after"]) >= 1
+    # Reads are answered while the quota is used up
+    assert usage.status == 200
+    assert usage.json()["requests_admitted"] == 2
+    assert usage.json()["requests_rejected"] == 1
+    assert usage.json()["upstream_calls"] == 2
+    assert usage.json()["input_tokens"] > 0
+    assert health.status == 200
+
+
+def test_tenant_quotas_and_usage_are_shared_between_processes(state_path):
+    def registry():
+        return SharedTenantRegistry(
+            state_path, {"app": Tenant("app", requests_per_minute=2, tokens_per_minute=1000)}, {"digest": "app"}
+        )
+
+    first, second = registry(), registry()
+    first.admit(first.tenants["app"])
+    first.record_call("app")
+    second.admit(second.tenants["app"])
+    second.record_call("app")
+    second.record_usage("app", 100, 20)
+    with pytest.raises(RateLimitExceeded):
+        first.admit(first.tenants["app"])
+
+    usage = first.usage("app")
+    assert usage["requests_admitted"] == 2
+    assert usage["requests_rejected"] == 1
+    assert usage["upstream_calls"] == 2
+    assert (usage["input_tokens"], usage["output_tokens"]) == (100, 20)
+    assert usage["requests_available"] < 1
+    assert usage["tokens_available"] == 880
+    assert second.stats()["upstream_calls"] == {"app": 2}
+
+
+def test_upstream_quota_is_handed_out_in_weighted_fair_order(summarizer, monkeypatch):
+    registry = TenantRegistry({"bulk": Tenant("bulk"), "app": Tenant("app")}, {"bulk-digest": "bulk", "app-digest": "app"})
+    monkeypatch.setattr(summarizer, "tenants", registry)
+    monkeypatch.setattr(summarizer, "concurrency", AdaptiveConcurrency(initial=1, maximum=1))
+    limiter = RateLimiter(requests_per_minute=1200, tokens_per_minute=1000000000)
+    limiter.requests.tokens = 0  # the shared quota is the bottleneck: one call every 50 ms
+    monkeypatch.setattr(summarizer, "rate_limiter", limiter)
+    started = []
+
+    async def call(tenant):
+        current_tenant.set(tenant)
+        async with summarizer._upstream_slot("prompt", 10):
+            started.append(tenant)
+
+    async def scenario():
+        calls = []
+        for tenant in ["bulk"] * 8 + ["app"]:
+            calls.append(asyncio.create_task(call(tenant)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*calls)
+
+    asyncio.run(scenario())
+    # The late interactive call does not wait for the whole burst's quota
+    assert started.index("app") <= 2
+    assert registry.usage("app")["upstream_calls"] == 1
+    assert registry.usage("bulk")["upstream_calls"] == 8
+
+
+def test_calls_that_never_start_are_not_charged(summarizer, monkeypatch):
+    registry = TenantRegistry({"app": Tenant("app")}, {"app-digest": "app"})
+    monkeypatch.setattr(summarizer, "tenants", registry)
+    monkeypatch.setattr(summarizer, "concurrency", AdaptiveConcurrency(initial=1, maximum=1))
+    monkeypatch.setattr(summarizer, "rate_limit_max_wait", 0.05)
+
+    async def scenario():
+        current_tenant.set("app")
+        await summarizer.concurrency.acquire(timeout=1.0)  # the only slot is busy
+        with pytest.raises(RateLimitExceeded):
+            async with summarizer._upstream_slot("prompt", 10):
+                pass
+
+    asyncio.run(scenario())
+    assert registry.usage("app")["upstream_calls"] == 0
+
+
+def test_batch_tenants_cannot_submit_interactive_jobs(client, summarizer, monkeypatch):
+    registry = TenantRegistry(
+        {"bulk": Tenant("bulk", priority="batch"), "app": Tenant("app")},
+        {hash_api_key("bulk-key"): "bulk", hash_api_key("app-key"): "app"}
+    )
+    monkeypatch.setattr(summarizer, "tenants", registry)
+
+    async def scenario():
+        payload = {"items": [{"text": TEXT + "Job priority."}], "priority": "interactive"}
+        return (await client.request("POST", "/jobs", payload, headers={"X-API-Key": "bulk-key"}),
+                await client.request("POST", "/jobs", payload, headers={"X-API-Key": "app-key"}))
+
+    bulk, app = asyncio.run(scenario())
+    assert bulk.status == app.status == 202
+    assert bulk.json()["priority"] == "batch"
+    assert app.json()["priority"] == "interactive"
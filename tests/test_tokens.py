@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from services.tokens import TokenEstimator
+
+
+def paragraph(name: str) -> str:
+    return " ".join(f"{name} sentence {index} reports the figures for the quarter." for index in range(6))
+
+
+@pytest.fixture
+def small_context(summarizer, monkeypatch):
+    """Fresh estimator (so calibration from other tests does not leak in) and a count of model calls"""
+    monkeypatch.setattr(summarizer, "tokens", TokenEstimator())
+    calls = []
+    generate = summarizer.backend.generate
+
+    def counting_generate(prompt, *args, **kwargs):
+        calls.append(prompt)
+        return generate(prompt, *args, **kwargs)
+
+    monkeypatch.setattr(summarizer.backend, "generate", counting_generate)
+    return calls
+
+
+def test_estimate_rounds_up_and_is_never_zero():
+    estimator = TokenEstimator(chars_per_token=4.0)
+    assert estimator.estimate("") == 1
+    assert estimator.estimate("abcd") == 1
+    assert estimator.estimate("abcde") == 2
+
+
+def test_observe_moves_the_ratio_toward_reported_usage():
+    estimator = TokenEstimator(chars_per_token=4.0, smoothing=0.5)
+    estimator.observe("x" * 50, 5)  # too short to say anything about the tokenizer
+    assert estimator.stats() == {"chars_per_token": 4.0, "observations": 0}
+
+    estimator.observe("x" * 600, 100)
+    assert estimator.chars_per_token == pytest.approx(5.0)
+    estimator.observe("x" * 600, 1)  # clamped to the maximum ratio
+    assert estimator.chars_per_token == pytest.approx(6.5)
+    assert estimator.stats()["observations"] == 2
+
+
+def test_prompt_over_the_context_is_rejected_without_a_model_call(client, summarizer, small_context, monkeypatch):
+    monkeypatch.setattr(summarizer, "context_tokens", 300)
+    response = asyncio.run(client.request("POST", "/summarize", {"text": paragraph("over") * 2, "mode": "single"}))
+    assert response.status == 413
+    assert "exceeds the model context of 300 tokens" in response.json()["detail"]
+    assert small_context == []
+
+
+def test_auto_mode_fits_chunks_and_their_output_in_a_small_context(client, summarizer, small_context, monkeypatch):
+    monkeypatch.setattr(summarizer, "context_tokens", 500)
+    text = " ".join(paragraph(f"budget{index}") for index in range(5))
+    response = asyncio.run(client.request("POST", "/summarize", {"text": text, "mode": "auto"}))
+    assert response.status == 200
+    body = response.json()
+    assert body["mode"] == "hierarchical"
+    assert body["chunks"] > 1
+    # Chunks went out with their 256 output tokens, so each prompt is well under the context
+    assert max(summarizer.tokens.estimate(prompt) for prompt in small_context) <= 500 - 256
+
+
+def test_context_too_small_for_any_chunk_fails_fast(client, summarizer, small_context, monkeypatch):
+    monkeypatch.setattr(summarizer, "context_tokens", 100)
+    text = "\n\n".join(paragraph(f"tiny{index}") for index in range(5))
+    response = asyncio.run(client.request("POST", "/summarize", {"text": text, "mode": "auto"}))
+    assert response.status == 413
+    assert "256 output tokens" in response.json()["detail"]
+    assert "chunks failed" not in response.json()["detail"]
+    assert small_context == []